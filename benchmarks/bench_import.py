@@ -0,0 +1,58 @@
+"""Benchmarks CLI startup and import times, and fails when they regress.
+
+Each scenario runs in a fresh interpreter, so nothing is cached between runs.
+Run from the repository root:
+
+    python -m benchmarks.bench_import --repeat 5 --max-seconds 0.5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules whose import is slow enough that cheap commands must not load them.
+HEAVY_MODULES = ['folium', 'pyproj', 'geopandas', 'pyogrio', 'matplotlib', 'pandas']
+
+# (name, Python statement) pairs; the statement runs in a new interpreter.
+SCENARIOS = [
+    ('cli --help', "import sys; sys.argv = ['main.py', '--help']\n"
+                   "from src.cli import main\n"
+                   "try:\n    main()\nexcept SystemExit:\n    pass"),
+    ('import src.cli', "import src.cli"),
+    ('import src.pipeline', "import src.pipeline"),
+    ('import src.visualization', "import src.visualization"),
+]
+
+def time_statement(statement, repeat):
+    """Returns the median wall time of running `statement` in a fresh interpreter, and the heavy modules it loaded."""
+    script = statement + f"\nimport sys\nprint([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result.stdout.strip().splitlines()[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup and module import times.")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per scenario; the median is reported.")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Fail if the CLI --help startup takes longer than this.")
+    args = parser.parse_args()
+
+    baseline, _ = time_statement("pass", args.repeat)
+    print(f"Interpreter startup: {baseline:.3f}s")
+    print(f"{'scenario':<26} {'seconds':>8}  heavy modules loaded")
+    results = {}
+    for name, statement in SCENARIOS:
+        elapsed, loaded = time_statement(statement, args.repeat)
+        results[name] = elapsed
+        print(f"{name:<26} {elapsed:>8.3f}  {loaded}")
+
+    if args.max_seconds is not None and results['cli --help'] > args.max_seconds:
+        print(f"Regression: CLI startup took {results['cli --help']:.3f}s (limit {args.max_seconds:.3f}s).")
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Benchmarks parallel_process_power_plants on 1/2/4/8 workers.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel --plants 500000 --workers 1 2 4 8
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import make_synthetic_power_plants
+from src.parallel import parallel_process_power_plants
+
+def time_parallel(raw_gdf, workers, partition_by, repeat):
+    """Returns the best wall time of parallel_process_power_plants over `repeat` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        gdf = raw_gdf.copy()
+        start = time.perf_counter()
+        parallel_process_power_plants(gdf, workers=workers, partition_by=partition_by)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the parallel processing pipeline.")
+    parser.add_argument('--plants', type=int, default=200000, help="Number of synthetic plants.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8], help="Worker counts to compare.")
+    parser.add_argument('--partition-by', choices=['rows', 'state'], default='rows')
+    parser.add_argument('--crs', default='EPSG:3857',
+                        help="CRS of the synthetic input, so the reprojection step is exercised.")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per worker count; the best is reported.")
+    args = parser.parse_args()
+
+    raw_gdf = make_synthetic_power_plants(args.plants).to_crs(args.crs)
+    print(f"{args.plants} plants, partitioned by {args.partition_by}")
+    print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        elapsed = time_parallel(raw_gdf, workers, args.partition_by, args.repeat)
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Benchmarks the load, process, analyze and map stages on synthetic EIA-schema GeoJSON.
+
+Each stage is timed and its peak memory (resident set growth over the stage)
+is recorded for every dataset size. Results are written as JSON and can be
+compared with a previous run, failing when a stage got slower or bigger than
+the allowed threshold. The synthetic files are generated from a fixed seed and
+kept in --data-dir, so no network access is needed and later runs reuse them.
+Run from the repository root:
+
+    python -m benchmarks.bench_pipeline --sizes 10k 100k --output benchmarks/results/current.json
+    python -m benchmarks.bench_pipeline --sizes 10k 100k --baseline benchmarks/results/main.json --threshold 0.2
+
+The 1M and 10M sizes need several GB of memory for the in-memory stages.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from src.analysis import analyze_power_plant_density
+from src.data_ingestion import load_local_geojson
+from src.data_processing import SELECTED_COLUMNS, process_power_plants_data
+from src.instrumentation import PeakMemory
+from src.visualization import create_power_plant_map
+
+def parse_size(text):
+    """Parses a plant count such as 10000, 10k or 1M."""
+    text = text.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+def run_stages(file_path, output_dir, skip_map=False):
+    """Runs the pipeline once on a GeoJSON file and returns {stage: {'seconds', 'peak_mb'}}."""
+    results = {}
+
+    def measure(stage, func, *args, **kwargs):
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            value = func(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+        results[stage] = {'seconds': elapsed, 'peak_mb': memory.peak_bytes / 2**20}
+        return value
+
+    gdf = measure('load', load_local_geojson, file_path, columns=SELECTED_COLUMNS)
+    gdf = measure('process', process_power_plants_data, gdf, inplace=True)
+    measure('analyze', analyze_power_plant_density, gdf)
+    if not skip_map:
+        measure('map', create_power_plant_map, gdf, output_path=os.path.join(output_dir, 'bench_map.html'))
+    return results
+
+def ensure_synthetic_file(num_plants, data_dir, seed):
+    """Returns the path of a synthetic GeoJSON file, generating it on first use.
+
+    Generation runs in a child process so that its allocations don't skew the
+    memory measurements of this one.
+    """
+    file_path = os.path.join(data_dir, f'synthetic_{num_plants}_{seed}.geojson')
+    if not os.path.exists(file_path):
+        print(f"Generating {num_plants} synthetic plants in {file_path}...")
+        script = ("from benchmarks.synthetic import write_synthetic_geojson; "
+                  f"write_synthetic_geojson({file_path + '.tmp'!r}, {num_plants}, seed={seed})")
+        subprocess.run([sys.executable, '-c', script], check=True)
+        os.replace(file_path + '.tmp', file_path)
+    return file_path
+
+def benchmark_size(num_plants, data_dir, seed, repeat, skip_map):
+    """Returns the best time and peak memory of each stage over `repeat` runs."""
+    file_path = ensure_synthetic_file(num_plants, data_dir, seed)
+    best = {}
+    for _ in range(repeat):
+        for stage, measured in run_stages(file_path, data_dir, skip_map).items():
+            if stage not in best:
+                best[stage] = measured
+            else:
+                best[stage] = {key: min(best[stage][key], measured[key]) for key in measured}
+    return best
+
+def git_commit():
+    """Returns the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def find_regressions(results, baseline, threshold, min_seconds=0.05, min_mb=5.0):
+    """Lists the stages that are more than `threshold` (a fraction) slower or bigger than the baseline.
+
+    Differences below min_seconds / min_mb are treated as noise.
+    """
+    regressions = []
+    for size, stages in results['sizes'].items():
+        for stage, measured in stages.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(stage)
+            if previous is None:
+                continue
+            for key, floor in (('seconds', min_seconds), ('peak_mb', min_mb)):
+                old, new = previous[key], measured[key]
+                if new - old > floor and new > old * (1 + threshold):
+                    regressions.append(f"{size} plants, {stage}: {key} {old:.3f} -> {new:.3f}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic data.")
+    parser.add_argument('--sizes', nargs='+', default=['10k', '100k'],
+                        help="Plant counts to benchmark, e.g. 10k 100k 1M 10M (default: 10k 100k).")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic generator.")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per size; the best of each metric is kept.")
+    parser.add_argument('--data-dir', default=os.path.join('data', 'benchmarks'),
+                        help="Where the synthetic GeoJSON files are generated and reused.")
+    parser.add_argument('--skip-map', action='store_true', help="Don't benchmark the map stage.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    parser.add_argument('--baseline', help="Compare with the results JSON of a previous run.")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown or memory growth as a fraction of the baseline (default: 0.25).")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sizes': {},
+    }
+    # An untimed run on a tiny file initializes the libraries' lazy state and memory pools.
+    run_stages(ensure_synthetic_file(100, args.data_dir, args.seed), args.data_dir, args.skip_map)
+
+    print(f"{'plants':>10} {'stage':>8} {'seconds':>10} {'peak MB':>10}")
+    for size in args.sizes:
+        num_plants = parse_size(size)
+        stages = benchmark_size(num_plants, args.data_dir, args.seed, args.repeat, args.skip_map)
+        results['sizes'][str(num_plants)] = stages
+        for stage, measured in stages.items():
+            print(f"{num_plants:>10} {stage:>8} {measured['seconds']:>10.3f} {measured['peak_mb']:>10.1f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions against {args.baseline} (threshold {args.threshold:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}.")
+
+if __name__ == "__main__":
+    main()
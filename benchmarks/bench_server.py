@@ -0,0 +1,141 @@
+"""Benchmarks the latency of the serve mode's endpoints with a local asyncio client.
+
+A server is started in a background thread over synthetic plants (or an
+already running one is targeted with --url). The same randomized mix of
+density, bbox, radius and tile requests is sent twice over keep-alive
+connections: the first pass is answered by the queries, the second mostly
+from the response cache. Run from the repository root:
+
+    python -m benchmarks.bench_server --plants 100k --requests 2000 --concurrency 8
+    python -m benchmarks.bench_server --url http://127.0.0.1:8000 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.bench_pipeline import parse_size
+from benchmarks.synthetic import make_synthetic_power_plants
+
+def make_targets(num_requests, seed=0):
+    """Returns a reproducible mix of (endpoint, request target) pairs over the continental US."""
+    rng = np.random.default_rng(seed)
+    targets = []
+    for kind in rng.choice(['density', 'bbox', 'radius', 'tile'], size=num_requests, p=[0.1, 0.3, 0.3, 0.3]):
+        lon, lat = rng.uniform(-124, -68), rng.uniform(26, 48)
+        if kind == 'density':
+            by = rng.choice(['state', 'primsource', 'state,primsource'])
+            targets.append((kind, f"/density?by={by}"))
+        elif kind == 'bbox':
+            size = rng.uniform(0.1, 2.0)
+            targets.append((kind, f"/plants?bbox={lon:.3f},{lat:.3f},{lon + size:.3f},{lat + size:.3f}&limit=500"))
+        elif kind == 'radius':
+            targets.append((kind, f"/plants?lon={lon:.3f}&lat={lat:.3f}&radius_km={rng.uniform(5, 100):.1f}"
+                                  f"&limit=500"))
+        else:
+            zoom = int(rng.integers(4, 13))
+            x = int((lon + 180) / 360 * (1 << zoom))
+            y = int((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * (1 << zoom))
+            targets.append((kind, f"/tiles/{zoom}/{x}/{y}.geojson"))
+    return targets
+
+async def _client(host, port, queue, latencies):
+    """Sends requests from the queue over one keep-alive connection, recording each latency."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            kind, target = queue.get_nowait()
+            start = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+            head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1')
+            length = int(head.lower().split('content-length:')[1].split('\r\n')[0])
+            await reader.readexactly(length)
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+async def run_pass(host, port, targets, concurrency):
+    """Sends all targets over `concurrency` connections; returns per-endpoint latencies and the wall time."""
+    queue = asyncio.Queue()
+    for item in targets:
+        queue.put_nowait(item)
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, queue, latencies) for _ in range(concurrency)))
+    return latencies, time.perf_counter() - start
+
+def summarize(latencies):
+    """Returns the count and p50/p95/p99 latency in milliseconds per endpoint and overall."""
+    latencies = dict(latencies, all=[value for values in latencies.values() for value in values])
+    summary = {}
+    for kind, values in latencies.items():
+        p50, p95, p99 = np.percentile(np.array(values) * 1000.0, [50, 95, 99])
+        summary[kind] = {'requests': len(values), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+    return summary
+
+def start_local_server(num_plants, cache_mb):
+    """Serves synthetic processed plants from a background thread; returns (host, port, startup seconds)."""
+    from src.data_processing import process_power_plants_data
+    from src.instrumentation import configure_instrumentation
+    from src.server import PlantServer, PlantService
+
+    configure_instrumentation(enabled=False)
+    start = time.perf_counter()
+    gdf = process_power_plants_data(make_synthetic_power_plants(num_plants), inplace=True)
+    server = PlantServer(PlantService(gdf), cache_bytes=int(cache_mb * 2**20))
+    startup = time.perf_counter() - start
+
+    bound = {}
+    ready = threading.Event()
+
+    async def run():
+        bound['address'] = await server.start('127.0.0.1', 0)
+        ready.set()
+        await server.serve_forever()
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    ready.wait()
+    return (*bound['address'], startup)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serve mode latency with a local client.")
+    parser.add_argument('--plants', default='100k', help="Synthetic plants to serve, e.g. 10k or 1M (default: 100k).")
+    parser.add_argument('--url', help="Benchmark an already running server instead, e.g. http://127.0.0.1:8000.")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per pass (default: 2000).")
+    parser.add_argument('--concurrency', type=int, default=8, help="Concurrent keep-alive connections (default: 8).")
+    parser.add_argument('--cache-mb', type=float, default=64, help="Response cache size of the local server.")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the request mix.")
+    parser.add_argument('--output', help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port, startup = start_local_server(parse_size(args.plants), args.cache_mb)
+        print(f"Indexed {parse_size(args.plants)} synthetic plants in {startup:.2f}s; serving on {host}:{port}")
+
+    targets = make_targets(args.requests, args.seed)
+    results = {}
+    print(f"{'pass':<6} {'endpoint':<8} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name in ('cold', 'cached'):
+        latencies, elapsed = asyncio.run(run_pass(host, port, targets, args.concurrency))
+        summary = summarize(latencies)
+        results[name] = {'seconds': elapsed, 'requests_per_second': len(targets) / elapsed, 'endpoints': summary}
+        for kind, measured in summary.items():
+            print(f"{name:<6} {kind:<8} {measured['requests']:>8} {measured['p50_ms']:>8.2f} "
+                  f"{measured['p95_ms']:>8.2f} {measured['p99_ms']:>8.2f}")
+        print(f"{name:<6} {len(targets) / elapsed:.0f} requests/s")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import geopandas
+import numpy as np
+import pandas as pd
+import pyogrio
+
+# Approximate state centers (longitude, latitude), used to scatter synthetic plants.
+STATE_CENTERS = {
+    'AL': (-86.8, 32.8), 'AR': (-92.4, 34.9), 'AZ': (-111.7, 34.3), 'CA': (-119.4, 37.2),
+    'CO': (-105.5, 39.0), 'CT': (-72.7, 41.6), 'DE': (-75.5, 39.0), 'FL': (-81.7, 28.6),
+    'GA': (-83.4, 32.7), 'IA': (-93.5, 42.1), 'ID': (-114.6, 44.4), 'IL': (-89.2, 40.0),
+    'IN': (-86.3, 39.9), 'KS': (-98.4, 38.5), 'KY': (-85.3, 37.5), 'LA': (-92.0, 31.1),
+    'MA': (-71.8, 42.3), 'MD': (-76.8, 39.0), 'ME': (-69.2, 45.4), 'MI': (-84.7, 43.7),
+    'MN': (-94.3, 46.3), 'MO': (-92.5, 38.4), 'MS': (-89.7, 32.7), 'MT': (-109.6, 47.0),
+    'NC': (-79.4, 35.6), 'ND': (-100.5, 47.5), 'NE': (-99.8, 41.5), 'NH': (-71.6, 43.7),
+    'NJ': (-74.7, 40.2), 'NM': (-106.1, 34.4), 'NV': (-116.6, 39.3), 'NY': (-75.5, 42.9),
+    'OH': (-82.8, 40.3), 'OK': (-97.5, 35.6), 'OR': (-120.6, 43.9), 'PA': (-77.8, 40.9),
+    'RI': (-71.5, 41.7), 'SC': (-80.9, 33.9), 'SD': (-100.2, 44.4), 'TN': (-86.4, 35.9),
+    'TX': (-99.3, 31.5), 'UT': (-111.7, 39.3), 'VA': (-78.8, 37.5), 'VT': (-72.7, 44.1),
+    'WA': (-120.5, 47.4), 'WI': (-89.8, 44.6), 'WV': (-80.6, 38.6), 'WY': (-107.6, 43.0),
+}
+
+# Primary sources with their relative frequency and MW column, roughly following the EIA mix.
+PRIMARY_SOURCES = {
+    'solar': (0.40, 'Solar_MW'),
+    'natural gas': (0.18, 'NG_MW'),
+    'wind': (0.12, 'Wind_MW'),
+    'hydroelectric': (0.11, 'Hydro_MW'),
+    'petroleum': (0.05, 'Crude_MW'),
+    'biomass': (0.05, 'Bio_MW'),
+    'batteries': (0.04, 'Bat_MW'),
+    'coal': (0.02, 'Coal_MW'),
+    'geothermal': (0.01, 'Geo_MW'),
+    'pumped storage': (0.005, 'HydroPS_MW'),
+    'nuclear': (0.005, 'Nuclear_MW'),
+    'other': (0.01, 'Other_MW'),
+}
+
+SECTORS = ['Electric Utility', 'IPP Non-CHP', 'IPP CHP', 'Commercial Non-CHP', 'Industrial CHP']
+
+def make_synthetic_power_plants(num_plants, seed=0, first_plant_code=1):
+    """Builds a raw GeoDataFrame with the EIA power plant schema and realistic value ranges."""
+    rng = np.random.default_rng(seed)
+
+    states = np.array(list(STATE_CENTERS))
+    state_idx = rng.integers(0, len(states), num_plants)
+    centers = np.array(list(STATE_CENTERS.values()))[state_idx]
+    longitude = centers[:, 0] + rng.normal(0, 1.5, num_plants)
+    latitude = centers[:, 1] + rng.normal(0, 1.0, num_plants)
+
+    source_names = list(PRIMARY_SOURCES)
+    weights = np.array([PRIMARY_SOURCES[name][0] for name in source_names])
+    source_idx = rng.choice(len(source_names), num_plants, p=weights / weights.sum())
+    total_mw = np.round(rng.lognormal(2.5, 1.5, num_plants), 1)
+
+    plant_code = np.arange(first_plant_code, first_plant_code + num_plants)
+    data = {
+        'OBJECTID': plant_code,
+        'Plant_Code': plant_code,
+        'Plant_Name': pd.Series(plant_code).map('Plant {}'.format),
+        'Utility_ID': rng.integers(1, 60000, num_plants),
+        'Utility_Na': pd.Series(rng.integers(1, 5000, num_plants)).map('Utility {}'.format),
+        'sector_nam': np.array(SECTORS)[rng.integers(0, len(SECTORS), num_plants)],
+        'Street_Add': pd.Series(rng.integers(1, 9999, num_plants)).map('{} Main St'.format),
+        'City': pd.Series(rng.integers(1, 2000, num_plants)).map('City {}'.format),
+        'County': pd.Series(rng.integers(1, 100, num_plants)).map('County {}'.format),
+        'State': states[state_idx],
+        'Zip': rng.integers(10000, 99999, num_plants),
+        'PrimSource': np.array(source_names)[source_idx],
+        'source_des': np.array(source_names)[source_idx],
+        'tech_desc': np.array(source_names)[source_idx],
+        'Install_MW': np.round(total_mw * rng.uniform(1.0, 1.2, num_plants), 1),
+        'Total_MW': total_mw,
+    }
+    for name in source_names:
+        column = PRIMARY_SOURCES[name][1]
+        data[column] = np.where(np.array(source_names)[source_idx] == name, total_mw, 0.0)
+    data['Source'] = np.full(num_plants, 'EIA-860, EIA-860M and EIA-923')
+    data['Period'] = np.full(num_plants, 202406)
+    data['Longitude'] = longitude
+    data['Latitude'] = latitude
+
+    # Leave a few gaps so the cleaning stage has missing values to fill.
+    gdf = geopandas.GeoDataFrame(data, geometry=geopandas.points_from_xy(longitude, latitude), crs="EPSG:4326")
+    missing = rng.random(num_plants) < 0.01
+    gdf.loc[missing, 'County'] = None
+    gdf.loc[missing, 'Total_MW'] = np.nan
+    return gdf
+
+def write_synthetic_geojson(file_path, num_plants, seed=0, chunk_size=1_000_000):
+    """Writes a synthetic EIA-schema power plant GeoJSON file and returns its path.
+
+    Plants are generated and appended `chunk_size` at a time, so files far larger
+    than memory (e.g. 10M plants) can be written. Each chunk has its own seed
+    derived from `seed`, and plant codes stay unique across chunks.
+    """
+    for start in range(0, max(num_plants, 1), chunk_size):
+        count = min(chunk_size, num_plants - start)
+        chunk_seed = seed if start == 0 else [seed, start // chunk_size]
+        gdf = make_synthetic_power_plants(count, seed=chunk_seed, first_plant_code=start + 1)
+        pyogrio.write_dataframe(gdf, file_path, driver='GeoJSON', append=start > 0)
+    return file_path
@@ -1,15 +1,178 @@
-import geopandas
+import logging
+import numpy as np
+import pandas as pd
 
+from src.instrumentation import instrument
+from src.plant_store import PlantStore
+
+logger = logging.getLogger(__name__)
+
+@instrument
 def analyze_power_plant_density(gdf):
-    """Calculates the number of power plants in each state."""
-    print("Performing geospatial analysis: Power plant density...")
+    """Calculates the number of power plants in each state.
+
+    Accepts a GeoDataFrame or a PlantStore, whose state codes are counted directly.
+    """
+    logger.info("Performing geospatial analysis: Power plant density...")
+
+    if isinstance(gdf, PlantStore):
+        if 'state' not in gdf.dictionaries:
+            logger.error("'state' column not found for density analysis.")
+            return None
+        codes = gdf.codes('state')
+        states = gdf.categories('state')
+        counts = np.bincount(codes[codes >= 0], minlength=len(states))
+        present = np.flatnonzero(counts)
+        return pd.DataFrame({'state': pd.Categorical(states[present], categories=states),
+                             'plant_count': counts[present]})
 
     # Group by state and count the number of power plants.
     if 'state' in gdf.columns:
-        state_density = gdf.groupby('state').size().reset_index(name='plant_count')
-        print("Power plant count by state (first 5 rows):")
-        print(state_density.head())
+        state_density = gdf.groupby('state', observed=True).size().reset_index(name='plant_count')
+        logger.debug("Power plant count by state (first 5 rows):\n%s", state_density.head())
         return state_density
     else:
-        print("'state' column not found for density analysis.")
+        logger.error("'state' column not found for density analysis.")
         return None
+
+def partial_power_plant_density(gdf):
+    """Counts power plants per state for one batch, as a mergeable partial state.
+
+    The result is a Series of counts indexed by plain state strings, so partials
+    from batches with different categorical codes can be merged safely.
+    """
+    counts = gdf.groupby('state', observed=True).size()
+    return pd.Series(counts.to_numpy(), index=counts.index.astype(str), name='plant_count')
+
+def merge_density_partials(left, right):
+    """Merges two partial density states into one."""
+    return left.add(right, fill_value=0)
+
+def density_from_partial(partial):
+    """Converts a merged partial density state into the analyze_power_plant_density format."""
+    return (
+        partial.astype('int64')
+        .sort_index()
+        .rename_axis('state')
+        .reset_index(name='plant_count')
+    )
+
+def analyze_power_plant_density_stream(batches):
+    """Calculates the number of power plants in each state from a stream of batches.
+
+    Only the running per-state counts are kept between batches, so memory stays
+    bounded by the batch size. The result matches analyze_power_plant_density.
+    """
+    logger.info("Performing streaming geospatial analysis: Power plant density...")
+    with instrument('analyze_power_plant_density_stream') as stage:
+        stage.rows_in = 0
+        total = pd.Series(dtype='int64', name='plant_count')
+        for batch in batches:
+            if 'state' not in batch.columns:
+                logger.error("'state' column not found for density analysis.")
+                return None
+            stage.rows_in += len(batch)
+            total = merge_density_partials(total, partial_power_plant_density(batch))
+
+        state_density = density_from_partial(total)
+        stage.rows_out = len(state_density)
+    logger.debug("Power plant count by state (first 5 rows):\n%s", state_density.head())
+    return state_density
+
+# Capacity columns that are totals rather than fuels, so they are left out of the fuel mix.
+TOTAL_MW_COLUMNS = ['total_mw', 'install_mw']
+
+# Upper bound on the number of possible key combinations for direct bincount grouping,
+# both overall and per grouped row.
+MAX_DENSE_GROUPS = 1 << 24
+DENSE_GROUPS_PER_ROW = 4
+
+# Largest combined group id before the codes seen so far are renumbered.
+MAX_GROUP_ID = np.iinfo(np.int64).max
+
+def _encode_group_key(values):
+    """Returns integer codes (-1 for missing) and the distinct values of one group key."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(dtype=np.int64), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=False)
+    return codes.astype(np.int64), uniques
+
+@instrument
+def aggregate_power_plants(gdf, by='state'):
+    """Computes many metrics per group in a single grouped pass.
+
+    `by` is a column name or a list of them (e.g. 'state', ['state', 'primsource']).
+    For each group the result holds plant_count; the sum, mean and max of total_mw;
+    the summed capacity of every fuel *_mw column; and each fuel's share of the
+    group's fuel capacity (<fuel>_share). Group keys are encoded as categorical
+    codes and combined into one integer id, so small key spaces are grouped
+    without sorting the rows; key spaces much larger than the rows are first
+    compacted to the ids present. Rows with a missing key are dropped.
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    missing = [key for key in keys if key not in gdf.columns]
+    if missing:
+        logger.error("Group key columns not found for aggregation: %s", missing)
+        return None
+
+    # Combine the per-key codes into a single mixed-radix group id.
+    encoded = [_encode_group_key(gdf[key]) for key in keys]
+    valid = np.ones(len(gdf), dtype=bool)
+    for codes, _ in encoded:
+        valid &= codes >= 0
+    key_codes = [codes[valid] for codes, _ in encoded]
+    group_id = np.zeros(int(valid.sum()), dtype=np.int64)
+    num_combinations = 1
+    for codes, (_, uniques) in zip(key_codes, encoded):
+        radix = max(len(uniques), 1)
+        if num_combinations > MAX_GROUP_ID // radix:
+            # Renumber the combinations seen so far so the combined id can't overflow.
+            group_id, seen = pd.factorize(group_id, sort=False)
+            num_combinations = max(len(seen), 1)
+        group_id = group_id * radix + codes
+        num_combinations *= radix
+
+    # Key spaces that are small next to the rows are grouped directly by id; larger ones
+    # are compacted to the ids actually present first, so bincount never allocates
+    # arrays for the whole cartesian product of the keys.
+    if num_combinations <= min(MAX_DENSE_GROUPS, DENSE_GROUPS_PER_ROW * max(len(group_id), 1)):
+        num_groups = num_combinations
+        dense_id = group_id
+    else:
+        dense_id, group_ids = pd.factorize(group_id, sort=False)
+        num_groups = len(group_ids)
+
+    count = np.bincount(dense_id, minlength=num_groups)
+    present = np.flatnonzero(count)
+
+    # All rows of a group share its keys, so any one row of each group gives them.
+    representative = np.empty(num_groups, dtype=np.int64)
+    representative[dense_id] = np.arange(len(dense_id))
+    rows = representative[present]
+    result = {key: np.asarray(uniques)[codes[rows]] for key, codes, (_, uniques) in zip(keys, key_codes, encoded)}
+    result['plant_count'] = count[present]
+
+    mw_columns = [col for col in gdf.columns if col.endswith('_mw')]
+    sums = {col: np.bincount(dense_id, weights=np.nan_to_num(gdf[col].to_numpy(dtype=np.float64)[valid]),
+                             minlength=num_groups)[present]
+            for col in mw_columns}
+
+    if 'total_mw' in gdf.columns:
+        total_mw = np.nan_to_num(gdf['total_mw'].to_numpy(dtype=np.float64)[valid], nan=-np.inf)
+        max_mw = np.full(num_groups, -np.inf)
+        np.maximum.at(max_mw, dense_id, total_mw)
+        result['total_mw'] = sums['total_mw']
+        result['mean_mw'] = sums['total_mw'] / result['plant_count']
+        result['max_mw'] = max_mw[present]
+
+    fuel_columns = [col for col in mw_columns if col not in TOTAL_MW_COLUMNS]
+    for col in mw_columns:
+        if col != 'total_mw':
+            result[col] = sums[col]
+    if fuel_columns:
+        fuel_total = np.sum([sums[col] for col in fuel_columns], axis=0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for col in fuel_columns:
+                result[f"{col}_share"] = np.where(fuel_total > 0, sums[col] / fuel_total, 0.0)
+
+    return pd.DataFrame(result).sort_values(keys, ignore_index=True)
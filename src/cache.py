@@ -0,0 +1,113 @@
+import geopandas
+import hashlib
+import json
+import logging
+import os
+
+from src.data_ingestion import load_local_geojson
+from src.data_processing import SELECTED_COLUMNS, process_power_plants_data
+from src.instrumentation import instrument
+from src.parallel import parallel_process_power_plants
+from src.pipeline import CACHE_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+# Bump when the processed output changes so existing caches are rebuilt.
+CACHE_FORMAT_VERSION = 2
+
+def hash_file(file_path, chunk_size=1 << 20):
+    """Computes the SHA-256 digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_cache_paths(file_path, cache_dir=CACHE_DIRECTORY):
+    """Returns the GeoParquet and metadata paths used to cache a source file."""
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return (
+        os.path.join(cache_dir, f"{base_name}.parquet"),
+        os.path.join(cache_dir, f"{base_name}.cache.json"),
+    )
+
+def _read_cache_metadata(metadata_path):
+    """Reads the cache metadata file, returning None if it is missing or unreadable."""
+    try:
+        with open(metadata_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache_metadata(metadata_path, metadata):
+    """Writes the cache metadata file atomically."""
+    tmp_path = metadata_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, metadata_path)
+
+def is_cache_valid(file_path, cache_dir=CACHE_DIRECTORY):
+    """Checks whether the cached copy of a source file is still up to date.
+
+    The cache must have been built from the same source path. A matching size and
+    mtime is then trusted without reading the source. If either differs, the
+    content hash decides, so a touched but unchanged file still hits.
+    """
+    cache_path, metadata_path = get_cache_paths(file_path, cache_dir)
+    metadata = _read_cache_metadata(metadata_path)
+    if metadata is None or not os.path.exists(cache_path):
+        return False
+    if metadata.get('version') != CACHE_FORMAT_VERSION or metadata.get('columns') != SELECTED_COLUMNS:
+        return False
+    # Sources with the same file name share cache paths, so the cache must come from this one.
+    if metadata.get('source') != os.path.abspath(file_path):
+        return False
+
+    stat = os.stat(file_path)
+    if metadata.get('size') == stat.st_size and metadata.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if metadata.get('size') != stat.st_size or metadata.get('sha256') != hash_file(file_path):
+        return False
+
+    # The contents are unchanged, so record the new mtime to keep the fast path.
+    metadata['mtime_ns'] = stat.st_mtime_ns
+    _write_cache_metadata(metadata_path, metadata)
+    return True
+
+@instrument
+def load_processed_power_plants(file_path, cache_dir=CACHE_DIRECTORY, rebuild=False, workers=1):
+    """Returns the processed power plant GeoDataFrame, using a GeoParquet cache when possible.
+
+    On a cache miss (or when rebuild is True) the GeoJSON is loaded and processed,
+    across `workers` processes if more than one, and the result is written to
+    cache_dir. Later calls memory-map the cached copy and skip both parsing and cleaning.
+    """
+    cache_path, metadata_path = get_cache_paths(file_path, cache_dir)
+
+    if not rebuild and os.path.exists(file_path) and is_cache_valid(file_path, cache_dir):
+        logger.info("Loading processed data from cache: %s", cache_path)
+        return geopandas.read_parquet(cache_path, memory_map=True)
+
+    gdf = load_local_geojson(file_path, columns=SELECTED_COLUMNS)
+    if gdf is None:
+        return None
+    if workers > 1:
+        gdf, _ = parallel_process_power_plants(gdf, workers=workers)
+    else:
+        gdf = process_power_plants_data(gdf, inplace=True)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    stat = os.stat(file_path)
+    tmp_path = cache_path + '.tmp'
+    gdf.to_parquet(tmp_path)
+    os.replace(tmp_path, cache_path)
+    _write_cache_metadata(metadata_path, {
+        'source': os.path.abspath(file_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': hash_file(file_path),
+        'columns': SELECTED_COLUMNS,
+        'version': CACHE_FORMAT_VERSION,
+    })
+    logger.info("Wrote processed data cache to %s", cache_path)
+    return gdf
@@ -0,0 +1,166 @@
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.layout_engine import TightLayoutEngine
+
+from src.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+# Labels of the value columns produced by analyze_power_plant_density and aggregate_power_plants.
+VALUE_LABELS = {
+    'plant_count': 'Number of Power Plants',
+    'total_mw': 'Total Capacity (MW)',
+    'mean_mw': 'Mean Capacity (MW)',
+    'max_mw': 'Largest Plant (MW)',
+}
+
+@dataclass
+class ChartSpec:
+    """One bar chart to render: bar labels and heights, axis text and the output file.
+
+    The output format (e.g. PNG or SVG) follows the extension of output_path.
+    """
+    output_path: str
+    labels: list
+    values: list
+    title: str
+    xlabel: str = ''
+    ylabel: str = ''
+
+def _value_label(column):
+    return VALUE_LABELS.get(column, column.replace('_', ' '))
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '_', str(value).lower()).strip('_') or 'unknown'
+
+def density_chart_spec(density_df, output_path='reports/power_plant_density.png'):
+    """Returns the spec of the per-state plant count chart from analyze_power_plant_density."""
+    density_df = density_df.sort_values(by='plant_count', ascending=False)
+    return ChartSpec(
+        output_path=output_path,
+        labels=density_df['state'].astype(str).tolist(),
+        values=density_df['plant_count'].tolist(),
+        title='Number of Power Plants by State',
+        xlabel='State',
+        ylabel='Number of Power Plants',
+    )
+
+def build_chart_specs(frame, category='state', value='plant_count', split_by=None,
+                      output_dir='reports/charts', formats=('png',), top=None):
+    """Plans one bar chart of `value` by `category` per group of an aggregated frame.
+
+    `frame` is typically the output of aggregate_power_plants, e.g. with
+    by=['primsource', 'state'] and split_by='primsource' for one state chart per
+    fuel. Without split_by a single chart is planned. Bars are sorted by value
+    and limited to the `top` largest. One spec is returned per group and format.
+    """
+    groups = [(None, frame)] if split_by is None else frame.groupby(split_by, observed=True, sort=True)
+    specs = []
+    for group, rows in groups:
+        rows = rows.sort_values(value, ascending=False)
+        if top is not None:
+            rows = rows.head(top)
+        title = f"{_value_label(value)} by {category.replace('_', ' ').title()}"
+        name = f"{value}_by_{category}"
+        if group is not None:
+            title += f" ({group})"
+            name += f"_{_slug(group)}"
+        for extension in formats:
+            specs.append(ChartSpec(
+                output_path=os.path.join(output_dir, f"{name}.{extension.lstrip('.')}"),
+                labels=rows[category].astype(str).tolist(),
+                values=rows[value].tolist(),
+                title=title,
+                xlabel=category.replace('_', ' ').title(),
+                ylabel=_value_label(value),
+            ))
+    return specs
+
+class BarChartRenderer:
+    """Renders bar charts one after another on a single reused Agg figure.
+
+    Only the bars are replaced between charts. The axes and their tick objects
+    are kept, and the tight-layout margins are computed once per label and value
+    width and then reused, so each chart costs little more than one draw.
+    """
+
+    def __init__(self, figsize=(12, 6), dpi=100):
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax = self.fig.add_subplot()
+        self._bars = None
+        self._margins = {}
+
+    def render(self, spec):
+        """Draws one ChartSpec and saves it to its output path."""
+        ax = self.ax
+        if self._bars is not None:
+            self._bars.remove()
+            ax.relim()
+        positions = np.arange(len(spec.values))
+        self._bars = ax.bar(positions, spec.values, color='C0')
+        ax.set_xticks(positions, spec.labels, rotation=90)
+        ax.set_xlim(-0.6, len(spec.values) - 0.4)
+        ax.set_xlabel(spec.xlabel)
+        ax.set_ylabel(spec.ylabel)
+        ax.set_title(spec.title)
+
+        # Margins only depend on how wide the tick labels are, so they are computed once per width.
+        key = (max((len(label) for label in spec.labels), default=0),
+               len(f"{max(spec.values, default=0):,.0f}"), bool(spec.xlabel), bool(spec.title))
+        if key not in self._margins:
+            # Run the engine once instead of fig.tight_layout(), which leaves a layout
+            # engine set on the figure and makes every savefig draw twice.
+            TightLayoutEngine().execute(self.fig)
+            params = self.fig.subplotpars
+            self._margins[key] = {'left': params.left, 'right': params.right,
+                                  'bottom': params.bottom, 'top': params.top}
+        else:
+            self.fig.subplots_adjust(**self._margins[key])
+
+        os.makedirs(os.path.dirname(spec.output_path) or '.', exist_ok=True)
+        self.fig.savefig(spec.output_path)
+        return spec.output_path
+
+    def close(self):
+        """Releases the figure and everything drawn on it."""
+        self.fig.clear()
+        self._bars = None
+
+def _render_specs(specs, figsize=(12, 6), dpi=100):
+    """Renders specs with one BarChartRenderer and returns their paths."""
+    renderer = BarChartRenderer(figsize, dpi)
+    try:
+        return [renderer.render(spec) for spec in specs]
+    finally:
+        renderer.close()
+
+@instrument
+def render_bar_charts(specs, workers=1, figsize=(12, 6), dpi=100):
+    """Renders many bar charts, reusing one figure per process, and returns the written paths.
+
+    Figures are created through the object-oriented Agg API rather than pyplot,
+    so nothing is registered in global state and every figure is released when
+    rendering ends. With workers > 1 the specs are split into contiguous chunks
+    rendered in a process pool.
+    """
+    specs = list(specs)
+    if not specs:
+        return []
+    workers = max(1, min(workers, len(specs)))
+    logger.info("Rendering %d charts with %d worker(s)...", len(specs), workers)
+    if workers == 1:
+        return _render_specs(specs, figsize, dpi)
+
+    bounds = np.linspace(0, len(specs), workers + 1).astype(int)
+    chunks = [specs[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_render_specs, chunks, [figsize] * workers, [dpi] * workers)
+        return [path for paths in results for path in paths]
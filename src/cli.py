@@ -0,0 +1,230 @@
+import argparse
+import configparser
+import logging
+import os
+
+from src.instrumentation import (configure_instrumentation, configure_logging, write_metrics_json,
+                                 write_prometheus_textfile)
+
+logger = logging.getLogger(__name__)
+
+# Only the standard library (and src.instrumentation, which uses nothing else) is imported
+# at module level, so `--help` and runs whose stages are up to date start quickly.
+# Each command imports what it needs.
+SETTINGS_PATH = os.path.join('config', 'settings.ini')
+
+DEFAULT_SETTINGS = {
+    'data_path': 'data/',
+    'raw_file': 'raw/power_plants.geojson',
+    'reports_path': 'reports/',
+    'workers': '1',
+    'batch_size': '50000',
+}
+
+# Pipeline stages run by each command.
+COMMAND_TARGETS = {
+    'ingest': ['process'],
+    'analyze': ['analyze'],
+    'chart': ['chart'],
+    'map': ['map'],
+    'all': ['chart', 'map'],
+    'serve': ['process'],
+}
+
+def load_settings(path=SETTINGS_PATH):
+    """Reads the [settings] section of an INI file on top of the defaults."""
+    parser = configparser.ConfigParser(defaults=DEFAULT_SETTINGS)
+    parser.read(path)
+    if not parser.has_section('settings'):
+        parser.add_section('settings')
+    section = parser['settings']
+    return {
+        'data_path': section.get('data_path'),
+        'raw_file': section.get('raw_file'),
+        'reports_path': section.get('reports_path'),
+        'workers': section.getint('workers'),
+        'batch_size': section.getint('batch_size'),
+    }
+
+def _add_run_options(parser, suppress_defaults=False):
+    """Adds the options shared by all commands.
+
+    They are accepted both before and after the command name; on the
+    subcommand parsers the defaults are suppressed so they don't override
+    values given before the command.
+    """
+    def default(value):
+        return argparse.SUPPRESS if suppress_defaults else value
+
+    parser.add_argument('--config', default=default(SETTINGS_PATH),
+                        help=f"Settings file (default: {SETTINGS_PATH}).")
+    parser.add_argument('--data-path', default=default(None),
+                        help="Data directory holding raw/ and processed/ (overrides the settings file).")
+    parser.add_argument('--reports-path', default=default(None),
+                        help="Directory the chart and map are written to (overrides the settings file).")
+    parser.add_argument('--rebuild-cache', action='store_true', default=default(False),
+                        help="Re-parse the raw GeoJSON and recompute every stage instead of reusing stored results.")
+    parser.add_argument('--workers', type=int, default=default(None),
+                        help="Number of worker processes used to process the data.")
+    parser.add_argument('--stream', action='store_true', default=default(False),
+                        help="Process the GeoJSON in fixed-size batches to bound memory use. "
+                             "Only the density chart is produced in this mode.")
+    parser.add_argument('--batch-size', type=int, default=default(None),
+                        help="Number of features per batch in streaming mode.")
+    parser.add_argument('--cluster', action='store_true', default=default(False),
+                        help="Show pre-aggregated plant clusters on the map at low zoom levels.")
+    parser.add_argument('--map-tiles', action='store_true', default=default(False),
+                        help="Write map clusters and plants as static tiles under the reports directory "
+                             "instead of embedding them in the HTML.")
+    parser.add_argument('--density-overlay', action='store_true', default=default(False),
+                        help="Add a capacity-weighted kernel density surface of total_mw to the map as an image layer.")
+    parser.add_argument('--incremental', action='store_true', default=default(False),
+                        help="Diff the data against the previous snapshot and only refresh the outputs that changed.")
+    parser.add_argument('-v', '--verbose', action='count', default=default(0),
+                        help="Log more detail; stage metrics are logged by default.")
+    parser.add_argument('-q', '--quiet', action='count', default=default(0),
+                        help="Only log warnings and errors.")
+    parser.add_argument('--log-format', choices=['text', 'json'], default=default('text'),
+                        help="Log as plain text or as one JSON object per line (default: text).")
+    parser.add_argument('--metrics-json', default=default(None),
+                        help="Write per-stage timings, rows, memory and I/O to this JSON file.")
+    parser.add_argument('--metrics-prom', default=default(None),
+                        help="Write per-stage metrics to this Prometheus textfile (e.g. for node_exporter).")
+    parser.add_argument('--profile-dir', default=default(None),
+                        help="Dump a cProfile profile of each top-level stage into this directory.")
+
+def build_parser():
+    """Builds the command-line parser with the ingest/analyze/chart/map/all commands."""
+    parser = argparse.ArgumentParser(description="Geospatial analysis of U.S. power plant infrastructure.")
+    _add_run_options(parser)
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    descriptions = {
+        'ingest': "Load and process the raw GeoJSON into the processed data cache.",
+        'analyze': "Compute and print the per-state plant counts.",
+        'chart': "Render the per-state density bar chart.",
+        'map': "Render the interactive plant map.",
+        'all': "Render both the chart and the map (the default).",
+        'serve': "Load the processed plants once and answer density, plant and tile queries over HTTP.",
+    }
+    for name, description in descriptions.items():
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        _add_run_options(subparser, suppress_defaults=True)
+        if name == 'serve':
+            subparser.add_argument('--host', default='127.0.0.1', help="Address to listen on (default: 127.0.0.1).")
+            subparser.add_argument('--port', type=int, default=8000, help="Port to listen on (default: 8000).")
+            subparser.add_argument('--cache-mb', type=float, default=64,
+                                   help="Size of the in-memory response cache in MB (default: 64).")
+    return parser
+
+def resolve_paths(settings, args):
+    """Returns the raw file, reports, processed and stage cache paths for a run."""
+    data_path = args.data_path or settings['data_path']
+    processed_path = os.path.join(data_path, 'processed')
+    return {
+        'raw_file': os.path.join(data_path, settings['raw_file']),
+        'reports': args.reports_path or settings['reports_path'],
+        'processed': processed_path,
+        'stages': os.path.join(processed_path, 'stages'),
+    }
+
+def run_stream(file_path, reports_path, batch_size):
+    """Cleans and aggregates one batch at a time and renders only the chart."""
+    from src.analysis import analyze_power_plant_density_stream
+    from src.data_ingestion import iter_geojson_batches
+    from src.data_processing import SELECTED_COLUMNS, process_power_plants_batches
+    from src.visualization import plot_power_plant_density
+
+    batches = iter_geojson_batches(file_path, batch_size=batch_size, columns=SELECTED_COLUMNS)
+    density_results = analyze_power_plant_density_stream(process_power_plants_batches(batches))
+    if density_results is None:
+        logger.error("Analysis failed.")
+        return
+    plot_power_plant_density(density_results, os.path.join(reports_path, 'power_plant_density.png'))
+    logger.info("Streaming analysis complete.")
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    command = args.command or 'all'
+    if args.stream and command not in ('chart', 'all'):
+        parser.error("--stream only produces the chart; use it with 'chart' or 'all'.")
+    if args.incremental and command != 'all':
+        parser.error("--incremental refreshes both the chart and the map; use it with 'all'.")
+
+    configure_logging(args.verbose - args.quiet, args.log_format)
+    configure_instrumentation(profile_dir=args.profile_dir)
+    try:
+        run_command(command, args)
+    finally:
+        if args.metrics_json:
+            write_metrics_json(args.metrics_json)
+        if args.metrics_prom:
+            write_prometheus_textfile(args.metrics_prom)
+
+def run_command(command, args):
+    """Runs one CLI command with parsed arguments."""
+    settings = load_settings(args.config)
+    paths = resolve_paths(settings, args)
+    workers = args.workers or settings['workers']
+    batch_size = args.batch_size or settings['batch_size']
+    file_path = paths['raw_file']
+    missing_message = f"Failed to load power plant data. Please ensure '{file_path}' exists."
+
+    logger.info("Geospatial Analysis of Energy Infrastructure project started.")
+    os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
+    os.makedirs(paths['reports'], exist_ok=True)
+
+    if args.stream:
+        if not os.path.exists(file_path):
+            logger.error(missing_message)
+        else:
+            # The map needs every plant in memory, so it is skipped.
+            run_stream(file_path, paths['reports'], batch_size)
+        return
+
+    from src.pipeline import build_power_plant_pipeline
+
+    # Only the stages behind the requested outputs run, and unchanged ones are read back from disk.
+    map_kwargs = {'cluster': args.cluster,
+                  'tiles_dir': os.path.join(paths['reports'], 'tiles') if args.map_tiles else None,
+                  'density_columns': ['total_mw'] if args.density_overlay else None}
+    pipeline = build_power_plant_pipeline(file_path, reports_dir=paths['reports'], cache_dir=paths['stages'],
+                                          workers=workers, map_kwargs=map_kwargs, rebuild=args.rebuild_cache)
+
+    if args.incremental:
+        from src.incremental import incremental_refresh
+
+        # Only re-aggregate and re-render what changed since the previous snapshot.
+        processed_gdf = pipeline.run('process', force=args.rebuild_cache)['process']
+        if processed_gdf is None:
+            logger.error(missing_message)
+            return
+        density_results = incremental_refresh(
+            processed_gdf,
+            chart_path=os.path.join(paths['reports'], 'power_plant_density.png'),
+            map_path=os.path.join(paths['reports'], 'power_plants_map.html'),
+            snapshot_path=os.path.join(paths['processed'], 'snapshot.parquet'),
+            density_path=os.path.join(paths['processed'], 'density.csv'),
+            map_kwargs=map_kwargs)
+        if density_results is not None:
+            logger.info("Incremental refresh complete.")
+        else:
+            logger.error("Analysis failed.")
+        return
+
+    outputs = pipeline.run(*COMMAND_TARGETS[command], force=args.rebuild_cache)
+    if any(output is None for output in outputs.values()):
+        logger.error("Analysis failed. %s", missing_message)
+    elif command == 'ingest':
+        logger.info("Processed %d power plants.", len(outputs['process']))
+    elif command == 'serve':
+        from src.server import serve
+
+        # Per-request stages would otherwise be measured and kept for the lifetime of the server.
+        configure_instrumentation(enabled=False)
+        serve(outputs['process'], host=args.host, port=args.port, cache_bytes=int(args.cache_mb * 2**20))
+    elif command == 'analyze':
+        # The counts are the command's output, so they go to stdout rather than the log.
+        print(outputs['analyze'].to_string(index=False))
+    else:
+        logger.info("Visualizations generated.")
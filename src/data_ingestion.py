@@ -1,28 +1,80 @@
 import geopandas
+import logging
 import os
+import pyarrow  # noqa: F401 (features are read through GDAL's columnar Arrow stream)
+import pyogrio
+import pyogrio.raw
 
-def load_local_geojson(file_path):
-    """Loads a GeoJSON file into a GeoDataFrame."""
-    print(f"Attempting to load GeoJSON data from: {file_path}")
+from src.data_processing import standardize_column_name
+from src.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_source_columns(file_path, columns):
+    """Maps standardized column names (e.g. 'total_mw') to the field names stored in the file."""
+    wanted = {standardize_column_name(col) for col in columns}
+    fields = pyogrio.read_info(file_path)['fields']
+    return [field for field in fields if standardize_column_name(field) in wanted]
+
+@instrument
+def load_local_geojson(file_path, columns=None, bbox=None, where=None):
+    """Loads a GeoJSON file into a GeoDataFrame.
+
+    The optional filters are pushed down to the reader so unused attributes and
+    features are never decoded:
+
+    - columns: standardized column names to keep (e.g. SELECTED_COLUMNS).
+    - bbox: (minx, miny, maxx, maxy) in the file's CRS; features outside are skipped.
+    - where: an OGR SQL WHERE clause on the raw field names, e.g. "State = 'CA'".
+    """
+    logger.info("Attempting to load GeoJSON data from: %s", file_path)
     try:
-        gdf = geopandas.read_file(file_path)
-        print(f"Successfully loaded data from {file_path}")
+        if columns is not None:
+            columns = resolve_source_columns(file_path, columns)
+        gdf = geopandas.read_file(
+            file_path,
+            engine='pyogrio',
+            columns=columns,
+            bbox=bbox,
+            where=where,
+            use_arrow=True,
+        )
+        logger.info("Successfully loaded %d features from %s", len(gdf), file_path)
         return gdf
     except Exception as e:
-        print(f"Error loading GeoJSON data from {file_path}: {e}")
+        logger.error("Error loading GeoJSON data from %s: %s", file_path, e)
         return None
 
+def iter_geojson_batches(file_path, batch_size=50000, columns=None, bbox=None, where=None):
+    """Yields a GeoJSON file as GeoDataFrames of at most batch_size features.
+
+    Only one batch is held in memory at a time, so peak memory is bounded by the
+    batch size rather than the file size. Filters behave as in load_local_geojson.
+    """
+    logger.info("Streaming GeoJSON data from: %s in batches of %d", file_path, batch_size)
+    if columns is not None:
+        columns = resolve_source_columns(file_path, columns)
+
+    with pyogrio.raw.open_arrow(file_path, columns=columns, bbox=bbox, where=where,
+                                batch_size=batch_size, use_pyarrow=True) as (meta, reader):
+        for batch in reader:
+            gdf = geopandas.GeoDataFrame.from_arrow(batch)
+            if gdf.geometry.name != 'geometry':
+                gdf = gdf.rename_geometry('geometry')
+            yield gdf
+
 # This allows the script to be run directly for testing.
 if __name__ == "__main__":
     # The raw data is expected to be in the data/raw directory.
     data_dir = "..\data\raw"
     file_name = "power_plants.geojson"
     file_path = os.path.join(os.path.dirname(__file__), data_dir, file_name)
-    
+
     if os.path.exists(file_path):
         gdf = load_local_geojson(file_path)
         if gdf is not None:
             print(f"Loaded GeoDataFrame with {len(gdf)} features.")
             print(gdf.head())
     else:
-        print(f"File not found: {file_path}. Please ensure it's downloaded manually.")
\ No newline at end of file
+        print(f"File not found: {file_path}. Please ensure it's downloaded manually.")
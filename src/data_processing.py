@@ -1,92 +1,133 @@
-import geopandas
+import logging
 import pandas as pd
 
-def process_power_plants_data(gdf):
-    """Cleans and prepares the power plant GeoDataFrame for analysis."""
-    print("Processing power plant data...")
-
-    # Standardize column names to a consistent format (e.g., lowercase_with_underscores).
-    original_columns = gdf.columns
-    new_columns = []
-    for col in original_columns:
-        new_col = col.replace(' ', '_').replace('.', '_').lower()
-        new_columns.append(new_col)
-    gdf.columns = new_columns
-    print("Standardized column names.")
-
-    # Handle any missing values.
-    print("Missing values before handling:")
-    missing_values = gdf.isnull().sum()
-    print(missing_values[missing_values > 0])
-
-    # A simple strategy for now: fill missing numbers with 0 and text with 'Unknown'.
-    # This might need to be adjusted depending on the data.
-    for col in gdf.columns:
-        if gdf[col].dtype in ['int64', 'float64']:
-            gdf[col] = gdf[col].fillna(0)
-        elif gdf[col].dtype == 'object':
-            gdf[col] = gdf[col].fillna('Unknown')
-    print("Filled missing values.")
-
-    # Ensure all capacity columns are numeric.
+from src.instrumentation import instrument
+from src.projection import add_projected_columns, reproject_points
+
+logger = logging.getLogger(__name__)
+
+# The subset of columns used by the analysis and visualization stages.
+SELECTED_COLUMNS = [
+    'plant_code',
+    'plant_name',
+    'utility_id',
+    'utility_na',
+    'sector_nam',
+    'street_add',
+    'city',
+    'county',
+    'state',
+    'zip',
+    'primsource',
+    'source_des',
+    'tech_desc',
+    'install_mw',
+    'total_mw',
+    'bat_mw',
+    'bio_mw',
+    'coal_mw',
+    'geo_mw',
+    'hydro_mw',
+    'hydrops_mw',
+    'ng_mw',
+    'nuclear_mw',
+    'crude_mw',
+    'solar_mw',
+    'wind_mw',
+    'other_mw',
+    'source',
+    'period',
+    'longitude',
+    'latitude',
+    'geometry'
+]
+
+def standardize_column_name(col):
+    """Converts a raw column name to a consistent lowercase_with_underscores format."""
+    return col.replace(' ', '_').replace('.', '_').lower()
+
+# Low-cardinality text columns stored as categoricals, and integer codes stored as int32.
+CATEGORICAL_COLUMNS = ['state', 'primsource', 'sector_nam', 'tech_desc']
+INT32_COLUMNS = ['plant_code', 'utility_id']
+
+@instrument
+def process_power_plants_data(gdf, inplace=False, projections=None):
+    """Cleans and prepares the power plant GeoDataFrame for analysis.
+
+    Columns are subset before cleaning, missing values are filled in a single pass
+    and the result is downcast to compact dtypes (float32 capacities, categorical
+    text codes and int32 identifiers). With inplace=True the input GeoDataFrame is
+    modified and returned instead of copied. `projections` optionally maps column
+    prefixes to CRSs (see src.projection.PROJECTIONS), adding projected
+    <prefix>_x/<prefix>_y coordinate columns.
+    """
+    logger.info("Processing power plant data...")
+
+    # Standardize column names to a consistent format (e.g., lowercase_with_underscores)
+    # and select the subset of columns for the analysis before any cleaning, so dropped
+    # columns are never touched.
+    # Both paths return the columns in SELECTED_COLUMNS order.
+    rename_map = {col: standardize_column_name(col) for col in gdf.columns}
+    order = {col: i for i, col in enumerate(SELECTED_COLUMNS)}
+    selected_raw = sorted((col for col in gdf.columns if rename_map[col] in order),
+                          key=lambda col: order[rename_map[col]])
+    if inplace:
+        gdf.drop(columns=[col for col in gdf.columns if col not in selected_raw], inplace=True)
+        gdf.rename(columns=rename_map, inplace=True)
+        if list(gdf.columns) != [rename_map[col] for col in selected_raw]:
+            # Move the columns into place one by one; the active geometry column is left
+            # where it is (popping it would drop the GeoDataFrame's geometry) and ends up last.
+            attributes = [rename_map[col] for col in selected_raw if rename_map[col] != 'geometry']
+            for position, col in enumerate(attributes):
+                gdf.insert(position, col, gdf.pop(col))
+    else:
+        gdf = gdf[selected_raw].rename(columns=rename_map)
+    logger.debug("Standardized column names and selected relevant features.")
+
+    # Ensure all capacity columns are numeric. Only columns that aren't already numeric
+    # need to be parsed; the block cast to float32 happens below.
     mw_columns = [col for col in gdf.columns if '_mw' in col]
     for col in mw_columns:
-        if col in gdf.columns:
-            gdf[col] = pd.to_numeric(gdf[col], errors='coerce').fillna(0)
-    print("Converted MW columns to numeric.")
+        if not pd.api.types.is_numeric_dtype(gdf[col]):
+            gdf[col] = pd.to_numeric(gdf[col], errors='coerce')
+
+    # Fill missing numbers with 0 and text with 'Unknown', using a single fill map.
+    fill_values = {col: 0 for col in gdf.select_dtypes(include='number').columns}
+    fill_values.update({col: 'Unknown' for col in gdf.select_dtypes(include=['object', 'string']).columns})
+
+    # Downcast to compact dtypes in one block operation.
+    dtypes = {col: 'float32' for col in mw_columns}
+    dtypes.update({col: 'category' for col in CATEGORICAL_COLUMNS if col in gdf.columns})
+    dtypes.update({col: 'int32' for col in INT32_COLUMNS
+                   if col in gdf.columns and pd.api.types.is_numeric_dtype(gdf[col])})
+
+    if inplace:
+        gdf.fillna(fill_values, inplace=True)
+        if dtypes:
+            gdf[list(dtypes)] = gdf[list(dtypes)].astype(dtypes)
+    else:
+        gdf = gdf.fillna(fill_values).astype(dtypes)
+    logger.debug("Filled missing values and converted columns to compact dtypes.")
 
     # Check if the coordinate reference system (CRS) is set to EPSG:4326.
     if gdf.crs is None or gdf.crs.to_epsg() != 4326:
-        print(f"Original CRS: {gdf.crs}. Converting to EPSG:4326...")
-        gdf = gdf.to_crs(epsg=4326)
-        print("CRS converted to EPSG:4326.")
+        logger.info("Original CRS: %s. Converting to EPSG:4326...", gdf.crs)
+        gdf = reproject_points(gdf, 'EPSG:4326', inplace=inplace)
+        logger.debug("CRS converted to EPSG:4326.")
     else:
-        print(f"CRS is already EPSG:4326 ({gdf.crs}). No conversion needed.")
-
-    # Select a subset of columns for the analysis.
-    selected_columns = [
-        'plant_code',
-        'plant_name',
-        'utility_id',
-        'utility_na',
-        'sector_nam',
-        'street_add',
-        'city',
-        'county',
-        'state',
-        'zip',
-        'primsource',
-        'source_des',
-        'tech_desc',
-        'install_mw',
-        'total_mw',
-        'bat_mw',
-        'bio_mw',
-        'coal_mw',
-        'geo_mw',
-        'hydro_mw',
-        'hydrops_mw',
-        'ng_mw',
-        'nuclear_mw',
-        'crude_mw',
-        'solar_mw',
-        'wind_mw',
-        'other_mw',
-        'source',
-        'period',
-        'longitude',
-        'latitude',
-        'geometry'
-    ]
-    # Make sure to only keep columns that actually exist in the GeoDataFrame.
-    selected_columns = [col for col in selected_columns if col in gdf.columns]
-    gdf = gdf[selected_columns]
-    print("Selected relevant features.")
+        logger.debug("CRS is already EPSG:4326 (%s). No conversion needed.", gdf.crs)
+
+    if projections and 'longitude' in gdf.columns and 'latitude' in gdf.columns:
+        gdf = add_projected_columns(gdf, projections, inplace=True)
+        logger.debug("Added projected coordinates: %s.", ', '.join(projections))
 
     return gdf
 
+def process_power_plants_batches(batches):
+    """Cleans and reprojects each GeoDataFrame batch from a stream independently."""
+    for batch in batches:
+        yield process_power_plants_data(batch, inplace=True)
+
 def inspect_gdf_columns(gdf):
-    """A helper function to print the columns of a GeoDataFrame."""
-    print("GeoDataFrame Columns:")
-    for col in gdf.columns:
-        print(f"- {col}")
+    """A helper function to log the columns of a GeoDataFrame."""
+    logger.info("GeoDataFrame Columns:\n%s", '\n'.join(f"- {col}" for col in gdf.columns))
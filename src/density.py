@@ -0,0 +1,325 @@
+import io
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+
+from src.instrumentation import instrument
+from src.map_tiles import mercator_fractions
+
+SQRT3 = np.sqrt(3.0)
+
+def get_mw_columns(gdf):
+    """Returns the capacity columns (total_mw and the per-fuel *_mw columns) of a frame."""
+    return [col for col in gdf.columns if col.endswith('_mw')]
+
+@dataclass
+class DensityGrid:
+    """Plant counts and capacity sums for the occupied cells of one grid resolution.
+
+    Cells are identified by integer (cell_i, cell_j) coordinates: column/row for
+    square grids and axial (q, r) coordinates for hexagonal grids. Only occupied
+    cells are stored, as parallel arrays; `weights` has one column per name in
+    `weight_columns`.
+    """
+    kind: str
+    resolution: float
+    cell_i: np.ndarray
+    cell_j: np.ndarray
+    center_lon: np.ndarray
+    center_lat: np.ndarray
+    count: np.ndarray
+    weights: np.ndarray
+    weight_columns: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.count)
+
+    def values(self, column=None):
+        """Returns the plant counts, or the summed capacity of one weight column."""
+        if column is None:
+            return self.count
+        return self.weights[:, self.weight_columns.index(column)]
+
+    def to_frame(self):
+        """Returns the grid as a DataFrame with one row per occupied cell."""
+        frame = pd.DataFrame({
+            'cell_i': self.cell_i,
+            'cell_j': self.cell_j,
+            'center_lon': self.center_lon,
+            'center_lat': self.center_lat,
+            'plant_count': self.count,
+        })
+        for i, column in enumerate(self.weight_columns):
+            frame[column] = self.weights[:, i]
+        return frame
+
+    def to_raster(self, column=None):
+        """Returns a dense 2D array (rows = latitude, origin at the bottom) and its extent.
+
+        The extent is (min_lon, max_lon, min_lat, max_lat), ready for imshow with
+        origin='lower'. Only square grids can be rasterized.
+        """
+        if self.kind != 'square':
+            raise ValueError("Only square grids can be converted to a raster.")
+        raster = np.zeros((self.cell_j.max() - self.cell_j.min() + 1,
+                           self.cell_i.max() - self.cell_i.min() + 1))
+        raster[self.cell_j - self.cell_j.min(), self.cell_i - self.cell_i.min()] = self.values(column)
+        extent = (
+            self.cell_i.min() * self.resolution - 180.0,
+            (self.cell_i.max() + 1) * self.resolution - 180.0,
+            self.cell_j.min() * self.resolution - 90.0,
+            (self.cell_j.max() + 1) * self.resolution - 90.0,
+        )
+        return raster, extent
+
+def _square_cells(lon, lat, resolution):
+    """Assigns points to square lon/lat cells of `resolution` degrees."""
+    cell_i = np.floor((lon + 180.0) / resolution).astype(np.int64)
+    cell_j = np.floor((lat + 90.0) / resolution).astype(np.int64)
+    return cell_i, cell_j
+
+def _square_centers(cell_i, cell_j, resolution):
+    return (cell_i + 0.5) * resolution - 180.0, (cell_j + 0.5) * resolution - 90.0
+
+def _hex_cells(lon, lat, resolution):
+    """Assigns points to pointy-top hexagons whose centers are `resolution` degrees apart.
+
+    Uses axial coordinates with cube rounding, as in H3-style hexagonal indexes.
+    """
+    size = resolution / SQRT3
+    q = (SQRT3 / 3.0 * lon - lat / 3.0) / size
+    r = (2.0 / 3.0 * lat) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int64), rr.astype(np.int64)
+
+def _hex_centers(cell_i, cell_j, resolution):
+    size = resolution / SQRT3
+    return size * SQRT3 * (cell_i + cell_j / 2.0), size * 1.5 * cell_j
+
+def hexagon_vertices(grid):
+    """Returns the (n_cells, 6, 2) lon/lat vertices of a hexagonal grid's cells."""
+    size = grid.resolution / SQRT3
+    angles = np.radians(60.0 * np.arange(6) + 30.0)
+    lon = grid.center_lon[:, None] + size * np.cos(angles)[None, :]
+    lat = grid.center_lat[:, None] + size * np.sin(angles)[None, :]
+    return np.stack([lon, lat], axis=-1)
+
+CELL_FUNCTIONS = {
+    'square': (_square_cells, _square_centers),
+    'hex': (_hex_cells, _hex_centers),
+}
+
+@instrument
+def grid_density(gdf, resolutions, kind='square', weight_columns=None):
+    """Bins plants into a square or hexagonal lon/lat grid at one or more resolutions.
+
+    For each resolution (in degrees), computes the plant count and the capacity
+    sums of every *_mw column per occupied cell, using bincount over integer cell
+    ids. The coordinates and capacity matrix are extracted once and shared by all
+    resolutions. Returns a dict mapping each resolution to a DensityGrid.
+    """
+    if kind not in CELL_FUNCTIONS:
+        raise ValueError(f"Unknown grid kind: {kind}")
+    assign_cells, cell_centers = CELL_FUNCTIONS[kind]
+    if isinstance(resolutions, (int, float)):
+        resolutions = [resolutions]
+    if weight_columns is None:
+        weight_columns = get_mw_columns(gdf)
+
+    valid = gdf['longitude'].notna().to_numpy() & gdf['latitude'].notna().to_numpy()
+    lon = gdf['longitude'].to_numpy(dtype=np.float64)[valid]
+    lat = gdf['latitude'].to_numpy(dtype=np.float64)[valid]
+    weights = np.nan_to_num(gdf[weight_columns].to_numpy(dtype=np.float64)[valid])
+
+    grids = {}
+    for resolution in resolutions:
+        cell_i, cell_j = assign_cells(lon, lat, resolution)
+        keys = (cell_i << 32) ^ (cell_j & 0xFFFFFFFF)
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        n_cells = len(unique_keys)
+        sums = np.empty((n_cells, len(weight_columns)))
+        for i in range(len(weight_columns)):
+            sums[:, i] = np.bincount(inverse, weights=weights[:, i], minlength=n_cells)
+        cells_i, cells_j = cell_i[first], cell_j[first]
+        center_lon, center_lat = cell_centers(cells_i, cells_j, resolution)
+        grids[resolution] = DensityGrid(
+            kind=kind,
+            resolution=resolution,
+            cell_i=cells_i,
+            cell_j=cells_j,
+            center_lon=center_lon,
+            center_lat=center_lat,
+            count=np.bincount(inverse, minlength=n_cells),
+            weights=sums,
+            weight_columns=list(weight_columns),
+        )
+    return grids
+
+# Kilometers per degree of latitude (and of longitude at the equator).
+KM_PER_DEGREE = 111.32
+
+# Default kernel bandwidth of the capacity density surface.
+DEFAULT_BANDWIDTH_KM = 50.0
+
+# The Gaussian kernel is truncated at this many bandwidths.
+KERNEL_TRUNCATE = 4.0
+
+@dataclass
+class DensitySurface:
+    """Capacity-weighted kernel density rasters in MW per km², one layer per column.
+
+    The grid is regular in Web Mercator, so the rasters can be overlaid on a web
+    map between `bounds` (min_lon, min_lat, max_lon, max_lat) without
+    reprojection. `layers` is shaped (columns, rows, cols) with row 0 at the
+    north edge, as in an image. `cell_km` is the cell size at the center latitude.
+    """
+    bounds: tuple
+    bandwidth_km: float
+    cell_km: float
+    columns: list
+    layers: np.ndarray
+
+    def layer(self, column='total_mw'):
+        """Returns the density raster of one column."""
+        return self.layers[self.columns.index(column)]
+
+    def cell_areas(self):
+        """Returns the ground area in km² of the cells of each row, as a (rows, 1) column."""
+        min_lon, min_lat, max_lon, max_lat = self.bounds
+        rows, cols = self.layers.shape[1:]
+        _, top = mercator_fractions([min_lon], [max_lat])
+        _, bottom = mercator_fractions([min_lon], [min_lat])
+        row_y = top[0] + (np.arange(rows) + 0.5) * (bottom[0] - top[0]) / rows
+        row_lat = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row_y))))
+        cell_degrees = (max_lon - min_lon) / cols
+        return ((cell_degrees * KM_PER_DEGREE * np.cos(np.radians(row_lat))) ** 2)[:, None]
+
+    def to_rgba(self, column='total_mw', cmap='YlOrRd', scale='sqrt', max_alpha=0.85):
+        """Colors one layer as an RGBA image whose opacity grows with the density.
+
+        With scale='sqrt' (or 'log') weaker concentrations stay visible next to
+        the largest ones; 'linear' maps the density directly.
+        """
+        import matplotlib
+
+        values = self.layer(column).astype(np.float64)
+        if scale == 'sqrt':
+            values = np.sqrt(values)
+        elif scale == 'log':
+            values = np.log1p(values / max(values.max(), 1e-12) * 1000.0)
+        elif scale != 'linear':
+            raise ValueError(f"Unknown density scale: {scale}")
+        peak = values.max()
+        normalized = values / peak if peak > 0 else values
+        rgba = matplotlib.colormaps[cmap](normalized)
+        rgba[..., 3] = np.clip(normalized * 4.0, 0.0, 1.0) * max_alpha
+        return (rgba * 255).astype(np.uint8)
+
+    def to_png(self, column='total_mw', **kwargs):
+        """Returns one layer as PNG bytes; keyword arguments are passed to to_rgba()."""
+        from matplotlib.image import imsave
+
+        buffer = io.BytesIO()
+        imsave(buffer, self.to_rgba(column, **kwargs), format='png')
+        return buffer.getvalue()
+
+    def save_png(self, path, column='total_mw', **kwargs):
+        """Writes one layer as a PNG overlay image."""
+        with open(path, 'wb') as f:
+            f.write(self.to_png(column, **kwargs))
+
+    def save(self, path):
+        """Writes every layer and the grid description as a compressed .npz file."""
+        np.savez_compressed(path, layers=self.layers, bounds=np.asarray(self.bounds),
+                            bandwidth_km=self.bandwidth_km, cell_km=self.cell_km,
+                            columns=np.asarray(self.columns, dtype=str))
+
+    @classmethod
+    def load(cls, path):
+        """Loads a surface written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(bounds=tuple(data['bounds'].tolist()), bandwidth_km=float(data['bandwidth_km']),
+                       cell_km=float(data['cell_km']), columns=data['columns'].tolist(), layers=data['layers'])
+
+def _surface_bounds(lon, lat, bandwidth_km):
+    """Returns the points' extent padded by the kernel's reach, within Web Mercator's limits."""
+    pad_lat = KERNEL_TRUNCATE * bandwidth_km / KM_PER_DEGREE
+    pad_lon = pad_lat / max(np.cos(np.radians(np.abs(lat).max())), 0.1)
+    return (max(lon.min() - pad_lon, -180.0), max(lat.min() - pad_lat, -85.0),
+            min(lon.max() + pad_lon, 180.0), min(lat.max() + pad_lat, 85.0))
+
+@instrument
+def kernel_density_surface(gdf, columns=None, bandwidth_km=DEFAULT_BANDWIDTH_KM, width=1024, bounds=None):
+    """Computes capacity-weighted Gaussian kernel density rasters of plants.
+
+    Each of `columns` (default ['total_mw']; pass the fuel *_mw columns for
+    per-fuel stacks) becomes one layer. Plants are linearly binned onto a
+    `width`-column Web Mercator grid over `bounds` (default: the plants' extent
+    plus the kernel's reach), and the grid is convolved with the kernel by FFT,
+    so the cost grows with the number of cells rather than plants times cells.
+    The bandwidth is converted to cells at the center latitude, and values are
+    divided by each row's ground cell area, so a layer sums (times cell_areas())
+    to the column's total capacity. `gdf` can also be a PlantStore.
+    """
+    # Imported here so that importing src.density (and src.visualization) doesn't load scipy.
+    from scipy.signal import fftconvolve
+
+    columns = ['total_mw'] if columns is None else list(columns)
+    lon = gdf['longitude'].to_numpy(dtype=np.float64)
+    lat = gdf['latitude'].to_numpy(dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    lon, lat = lon[valid], lat[valid]
+    weights = np.column_stack([np.nan_to_num(gdf[col].to_numpy(dtype=np.float64)[valid]) for col in columns])
+    if bounds is None:
+        bounds = _surface_bounds(lon, lat, bandwidth_km) if len(lon) else (-125.0, 24.0, -66.0, 50.0)
+    min_lon, min_lat, max_lon, max_lat = bounds
+
+    # The grid: square cells in Web Mercator, `width` of them across the bounds.
+    (left,), (top,) = mercator_fractions([min_lon], [max_lat])
+    (right,), (bottom,) = mercator_fractions([max_lon], [min_lat])
+    cell = (right - left) / width
+    height = max(1, int(np.ceil((bottom - top) / cell)))
+    bottom = top + height * cell
+    bounds = (float(min_lon), float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * bottom))))),
+              float(max_lon), float(max_lat))
+    center_lat = (bounds[1] + max_lat) / 2.0
+    cell_km = cell * 360.0 * KM_PER_DEGREE * np.cos(np.radians(center_lat))
+
+    # Linear binning: each plant's weight is split between the four nearest cell centers.
+    x, y = mercator_fractions(lon, lat)
+    px = (x - left) / cell - 0.5
+    py = (y - top) / cell - 0.5
+    i0, j0 = np.floor(px).astype(np.int64), np.floor(py).astype(np.int64)
+    fx, fy = px - i0, py - j0
+    flat, shares = [], []
+    for di, dj, share in ((0, 0, (1 - fx) * (1 - fy)), (1, 0, fx * (1 - fy)),
+                          (0, 1, (1 - fx) * fy), (1, 1, fx * fy)):
+        i, j = i0 + di, j0 + dj
+        inside = (i >= 0) & (i < width) & (j >= 0) & (j < height)
+        flat.append(j[inside] * width + i[inside])
+        shares.append((share, inside))
+    flat = np.concatenate(flat)
+    binned = np.empty((len(columns), height, width))
+    for c in range(len(columns)):
+        binned_weights = np.concatenate([weights[inside, c] * share[inside] for share, inside in shares])
+        binned[c] = np.bincount(flat, weights=binned_weights, minlength=height * width).reshape(height, width)
+
+    # A normalized Gaussian kernel in cells, applied to every layer in one FFT convolution.
+    sigma = bandwidth_km / cell_km
+    radius = max(1, int(np.ceil(KERNEL_TRUNCATE * sigma)))
+    offsets = np.arange(-radius, radius + 1)
+    kernel_1d = np.exp(-0.5 * (offsets / sigma) ** 2)
+    kernel = np.outer(kernel_1d, kernel_1d)
+    kernel /= kernel.sum()
+    smoothed = np.clip(fftconvolve(binned, kernel[None], mode='same', axes=(1, 2)), 0.0, None)
+
+    surface = DensitySurface(bounds=bounds, bandwidth_km=bandwidth_km, cell_km=float(cell_km), columns=columns,
+                             layers=smoothed)
+    surface.layers = (smoothed / surface.cell_areas()[None]).astype(np.float32)
+    return surface
@@ -0,0 +1,159 @@
+import geopandas
+import logging
+import os
+import pandas as pd
+
+from src.analysis import (analyze_power_plant_density, density_from_partial, merge_density_partials,
+                          partial_power_plant_density)
+from src.instrumentation import instrument
+from src.pipeline import CACHE_DIRECTORY
+from src.visualization import MAP_COLUMNS, create_power_plant_map, plot_power_plant_density, update_map_tiles
+
+logger = logging.getLogger(__name__)
+
+# Rows are matched across EIA releases on these columns.
+SNAPSHOT_KEY = ['plant_code']
+
+# Columns left out of the row hashes: the release stamp changes with every release,
+# so comparing it would mark every plant as changed.
+UNHASHED_COLUMNS = ['period']
+
+# The previous processed snapshot and its density results, kept for the next refresh.
+SNAPSHOT_PATH = os.path.join(CACHE_DIRECTORY, 'snapshot.parquet')
+DENSITY_PATH = os.path.join(CACHE_DIRECTORY, 'density.csv')
+
+def _row_hashes(gdf, value_columns):
+    """Hashes the attribute values of each row; coordinates are covered by longitude/latitude."""
+    return pd.util.hash_pandas_object(gdf[value_columns], index=False).to_numpy()
+
+@instrument
+def diff_snapshots(old, new, key=None):
+    """Finds the added, removed and changed plants between two processed snapshots.
+
+    Rows are matched on `key` (default: plant_code) and compared by a hash of
+    their shared attribute columns, leaving out the release `period`. Returns a dict of
+    GeoDataFrames: 'added' and 'changed_new' from the new snapshot, 'removed' and
+    'changed_old' from the old one.
+    """
+    key = [col for col in (key or SNAPSHOT_KEY) if col in old.columns and col in new.columns]
+    if not key:
+        raise ValueError("Snapshots share no key columns to match rows on.")
+    value_columns = [col for col in old.columns
+                     if col in new.columns and col not in key and col not in UNHASHED_COLUMNS
+                     and col != old.geometry.name]
+
+    old_keys = old[key].reset_index(drop=True).assign(
+        _old_row=range(len(old)), _old_hash=_row_hashes(old, value_columns))
+    new_keys = new[key].reset_index(drop=True).assign(
+        _new_row=range(len(new)), _new_hash=_row_hashes(new, value_columns))
+    merged = old_keys.merge(new_keys, on=key, how='outer', indicator=True)
+
+    both = merged[merged['_merge'] == 'both']
+    changed = both[both['_old_hash'] != both['_new_hash']]
+    return {
+        'added': new.iloc[merged.loc[merged['_merge'] == 'right_only', '_new_row'].astype(int)],
+        'removed': old.iloc[merged.loc[merged['_merge'] == 'left_only', '_old_row'].astype(int)],
+        'changed_old': old.iloc[changed['_old_row'].astype(int)],
+        'changed_new': new.iloc[changed['_new_row'].astype(int)],
+    }
+
+def is_empty_diff(diff):
+    """Checks whether a diff from diff_snapshots contains no changes."""
+    return all(len(rows) == 0 for rows in diff.values())
+
+def _density_partial(density_df):
+    """Converts analyze_power_plant_density results back into a mergeable partial state."""
+    return pd.Series(density_df['plant_count'].to_numpy(), index=density_df['state'].astype(str))
+
+def apply_density_delta(density_df, diff):
+    """Updates per-state plant counts from analyze_power_plant_density with a snapshot diff.
+
+    Only the added, removed and changed rows are aggregated, so the cost is
+    proportional to the size of the change. States whose count drops to zero are removed.
+    """
+    current = _density_partial(density_df)
+    for name, sign in (('added', 1), ('changed_new', 1), ('removed', -1), ('changed_old', -1)):
+        if len(diff[name]):
+            current = merge_density_partials(current, sign * partial_power_plant_density(diff[name]))
+    return density_from_partial(current[current > 0])
+
+def map_diff(diff, map_kwargs=None):
+    """Narrows a diff to the rows that change what the map draws.
+
+    Changed plants are kept only if a map column (or one of the map's density
+    columns) differs; added and removed plants always change the map.
+    """
+    density_columns = (map_kwargs or {}).get('density_columns') or []
+    old, new = diff['changed_old'], diff['changed_new']
+    columns = [col for col in dict.fromkeys(MAP_COLUMNS + list(density_columns))
+               if col in old.columns and col in new.columns]
+    differs = _row_hashes(old, columns) != _row_hashes(new, columns)
+    return {**diff, 'changed_old': old[differs], 'changed_new': new[differs]}
+
+def refresh_map(processed_gdf, diff, map_path, map_kwargs=None):
+    """Re-renders the map for a diff from map_diff.
+
+    With static tiles on the canvas backend, only the tiles containing the old
+    and new locations of the diff's plants are rewritten, and the page is rendered
+    against the updated tile index; otherwise the whole map is rebuilt.
+    """
+    map_kwargs = map_kwargs or {}
+    tiles_dir = map_kwargs.get('tiles_dir')
+    tile_index = None
+    if tiles_dir is not None and map_kwargs.get('backend', 'canvas') == 'canvas':
+        moved = pd.concat([diff[name][['longitude', 'latitude']] for name in diff])
+        tile_index = update_map_tiles(processed_gdf, tiles_dir, moved['longitude'], moved['latitude'],
+                                      map_kwargs.get('max_cluster_zoom', 8))
+        if tile_index is None:
+            logger.info("Tile colors or settings changed. Rewriting all map tiles.")
+    create_power_plant_map(processed_gdf, output_path=map_path, tile_index=tile_index, **map_kwargs)
+
+def save_snapshot(gdf, density_df, snapshot_path=SNAPSHOT_PATH, density_path=DENSITY_PATH):
+    """Stores the processed snapshot and its density results for the next refresh."""
+    os.makedirs(os.path.dirname(snapshot_path) or '.', exist_ok=True)
+    gdf.to_parquet(snapshot_path)
+    density_df.to_csv(density_path, index=False)
+
+@instrument
+def incremental_refresh(processed_gdf, chart_path='reports/power_plant_density.png',
+                        map_path='reports/power_plants_map.html', snapshot_path=SNAPSHOT_PATH,
+                        density_path=DENSITY_PATH, map_kwargs=None):
+    """Refreshes the density results, chart and map from the changes since the last snapshot.
+
+    Without a previous snapshot everything is computed from scratch. Otherwise the
+    stored density counts are patched with the diff, the chart is re-rendered only
+    if the counts changed, and the map only if a plant changed in a column the map
+    draws (see refresh_map). Returns the (possibly unchanged) density results.
+    """
+    map_kwargs = map_kwargs or {}
+    if not (os.path.exists(snapshot_path) and os.path.exists(density_path)):
+        logger.info("No previous snapshot found. Running a full analysis.")
+        density_df = analyze_power_plant_density(processed_gdf)
+        if density_df is None:
+            return None
+        plot_power_plant_density(density_df, chart_path)
+        create_power_plant_map(processed_gdf, output_path=map_path, **map_kwargs)
+        save_snapshot(processed_gdf, density_df, snapshot_path, density_path)
+        return density_df
+
+    previous_gdf = geopandas.read_parquet(snapshot_path)
+    previous_density = pd.read_csv(density_path, keep_default_na=False)
+    diff = diff_snapshots(previous_gdf, processed_gdf)
+    logger.info("Snapshot diff: %d added, %d removed, %d changed.",
+                len(diff['added']), len(diff['removed']), len(diff['changed_new']))
+    if is_empty_diff(diff):
+        logger.info("No changes since the previous snapshot. Outputs are up to date.")
+        return previous_density
+
+    density_df = apply_density_delta(previous_density, diff)
+    if not density_df.equals(density_from_partial(_density_partial(previous_density))):
+        plot_power_plant_density(density_df, chart_path)
+    else:
+        logger.info("Density counts unchanged. Skipping the chart.")
+    changes = map_diff(diff, map_kwargs)
+    if is_empty_diff(changes):
+        logger.info("No map columns changed. Skipping the map.")
+    else:
+        refresh_map(processed_gdf, changes, map_path, map_kwargs)
+    save_snapshot(processed_gdf, density_df, snapshot_path, density_path)
+    return density_df
@@ -0,0 +1,299 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+# Only the standard library is used here, so every module can import this cheaply.
+logger = logging.getLogger(__name__)
+
+# Set by configure_instrumentation; records accumulate until reset_metrics().
+_settings = {'profile_dir': None, 'sample_memory': True, 'memory_interval': 0.005, 'enabled': True}
+_records = []
+_local = threading.local()
+
+@dataclass
+class StageMetrics:
+    """Resource usage of one call to an instrumented stage.
+
+    rows_in/rows_out are None when the stage's input or output has no rows;
+    bytes_read/bytes_written are None where the OS doesn't report process I/O.
+    """
+    stage: str
+    wall_seconds: float
+    cpu_seconds: float
+    rows_in: int = None
+    rows_out: int = None
+    peak_memory_bytes: int = None
+    bytes_read: int = None
+    bytes_written: int = None
+
+def configure_instrumentation(profile_dir=None, sample_memory=True, memory_interval=0.005, enabled=True):
+    """Sets where cProfile dumps of top-level stages go and whether peak memory is sampled.
+
+    With enabled=False stages are neither measured nor recorded, e.g. for the
+    per-request calls of a long-running server.
+    """
+    _settings.update(profile_dir=profile_dir, sample_memory=sample_memory, memory_interval=memory_interval,
+                     enabled=enabled)
+
+def current_rss():
+    """Returns the resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Without /proc, fall back to the lifetime peak (kilobytes on Linux, bytes on macOS).
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+def io_counters():
+    """Returns the (bytes read, bytes written) of this process so far, or (None, None)."""
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+class PeakMemory:
+    """Samples the resident set size in a background thread and records its peak growth."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak_bytes = 0
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._peak = max(self._peak, current_rss())
+
+    def __enter__(self):
+        self._start = self._peak = current_rss()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._done.set()
+        self._thread.join()
+        self.peak_bytes = max(self._peak, current_rss()) - self._start
+        return False
+
+def count_rows(value):
+    """Returns the number of rows of a frame or array (or of the first item of a tuple), else None."""
+    if isinstance(value, tuple) and value:
+        value = value[0]
+    shape = getattr(value, 'shape', None)
+    return int(shape[0]) if shape else None
+
+class StageTimer:
+    """Measures one call of a stage; created by instrument().
+
+    As a context manager it yields itself, so the block can set rows_in,
+    rows_out, bytes_read or bytes_written when it knows better than the
+    process-wide counters.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+        self.bytes_read = None
+        self.bytes_written = None
+
+    def __enter__(self):
+        self._active = _settings['enabled']
+        if not self._active:
+            return self
+        self._depth = getattr(_local, 'depth', 0)
+        _local.depth = self._depth + 1
+        self._profiler = None
+        if _settings['profile_dir'] and self._depth == 0:
+            # Only the outermost stage is profiled; nested stages appear in its profile.
+            self._profiler = cProfile.Profile()
+        self._memory = PeakMemory(_settings['memory_interval']) if _settings['sample_memory'] else None
+        if self._memory is not None:
+            self._memory.__enter__()
+        self._io_start = io_counters()
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self._active:
+            return False
+        if self._profiler is not None:
+            self._profiler.disable()
+        wall = time.perf_counter() - self._wall_start
+        cpu = time.process_time() - self._cpu_start
+        io_end = io_counters()
+        if self._memory is not None:
+            self._memory.__exit__(*exc_info)
+        _local.depth = self._depth
+
+        metrics = StageMetrics(
+            stage=self.name,
+            wall_seconds=wall,
+            cpu_seconds=cpu,
+            rows_in=self.rows_in,
+            rows_out=self.rows_out,
+            peak_memory_bytes=self._memory.peak_bytes if self._memory is not None else None,
+            bytes_read=self.bytes_read,
+            bytes_written=self.bytes_written,
+        )
+        if None not in self._io_start and None not in io_end:
+            if metrics.bytes_read is None:
+                metrics.bytes_read = io_end[0] - self._io_start[0]
+            if metrics.bytes_written is None:
+                metrics.bytes_written = io_end[1] - self._io_start[1]
+        _records.append(metrics)
+        logger.info(format_metrics(metrics), extra={'metrics': asdict(metrics)})
+
+        if self._profiler is not None:
+            os.makedirs(_settings['profile_dir'], exist_ok=True)
+            self._profiler.dump_stats(os.path.join(_settings['profile_dir'], f"{self.name}.prof"))
+        return False
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with StageTimer(name) as stage:
+                stage.rows_in = count_rows(args[0]) if args else None
+                result = func(*args, **kwargs)
+                stage.rows_out = count_rows(result)
+            return result
+        return wrapper
+
+def instrument(name=None):
+    """Records wall time, CPU time, rows in/out, peak memory growth and I/O bytes of a stage.
+
+    Usable as a decorator (`@instrument` or `@instrument('name')`), in which case
+    rows are counted from the first argument and the return value, or as a
+    context manager (`with instrument('name') as stage:`).
+    """
+    if callable(name):
+        return StageTimer(None)(name)
+    return StageTimer(name)
+
+def format_metrics(metrics):
+    """Formats a StageMetrics record as a one-line summary."""
+    parts = [f"{metrics.stage}: {metrics.wall_seconds:.3f}s wall, {metrics.cpu_seconds:.3f}s CPU"]
+    if metrics.rows_in is not None or metrics.rows_out is not None:
+        parts.append(f"rows {metrics.rows_in if metrics.rows_in is not None else '-'} -> "
+                     f"{metrics.rows_out if metrics.rows_out is not None else '-'}")
+    if metrics.peak_memory_bytes is not None:
+        parts.append(f"peak memory +{metrics.peak_memory_bytes / 2**20:.1f} MB")
+    if metrics.bytes_read is not None:
+        parts.append(f"read {metrics.bytes_read / 2**20:.1f} MB")
+    if metrics.bytes_written is not None:
+        parts.append(f"written {metrics.bytes_written / 2**20:.1f} MB")
+    return ', '.join(parts)
+
+def get_metrics():
+    """Returns the StageMetrics recorded so far, in completion order."""
+    return list(_records)
+
+def reset_metrics():
+    """Discards the recorded metrics."""
+    _records.clear()
+
+def summarize_metrics(records=None):
+    """Totals the metrics per stage: summed times, rows and bytes, and the largest peak memory."""
+    summary = {}
+    for record in _records if records is None else records:
+        totals = summary.setdefault(record.stage, {'calls': 0})
+        totals['calls'] += 1
+        for key, value in asdict(record).items():
+            if key == 'stage' or value is None:
+                continue
+            if key == 'peak_memory_bytes':
+                totals[key] = max(totals.get(key, 0), value)
+            else:
+                totals[key] = totals.get(key, 0) + value
+    return summary
+
+def _write_atomically(path, text):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_metrics_json(path, records=None):
+    """Writes every recorded call and the per-stage totals as JSON."""
+    records = _records if records is None else records
+    report = {
+        'stages': summarize_metrics(records),
+        'calls': [asdict(record) for record in records],
+    }
+    _write_atomically(path, json.dumps(report, indent=2))
+
+# Prometheus metric name, help text and StageMetrics field for the textfile report.
+PROMETHEUS_METRICS = [
+    ('power_plants_stage_calls_total', "Number of calls to each pipeline stage.", 'calls'),
+    ('power_plants_stage_wall_seconds', "Wall-clock time spent in each pipeline stage.", 'wall_seconds'),
+    ('power_plants_stage_cpu_seconds', "CPU time spent in each pipeline stage.", 'cpu_seconds'),
+    ('power_plants_stage_rows_in', "Rows passed into each pipeline stage.", 'rows_in'),
+    ('power_plants_stage_rows_out', "Rows returned by each pipeline stage.", 'rows_out'),
+    ('power_plants_stage_peak_memory_bytes', "Largest resident memory growth during a stage call.",
+     'peak_memory_bytes'),
+    ('power_plants_stage_read_bytes', "Bytes read by the process during each pipeline stage.", 'bytes_read'),
+    ('power_plants_stage_written_bytes', "Bytes written by the process during each pipeline stage.",
+     'bytes_written'),
+]
+
+def write_prometheus_textfile(path, records=None):
+    """Writes the per-stage totals in the Prometheus text format, e.g. for node_exporter's textfile collector."""
+    summary = summarize_metrics(records)
+    lines = []
+    for metric, help_text, key in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for stage, totals in summary.items():
+            if key in totals:
+                lines.append(f'{metric}{{stage="{stage}"}} {totals[key]}')
+    _write_atomically(path, '\n'.join(lines) + '\n')
+
+class JsonLogFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line, including any stage metrics."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if hasattr(record, 'metrics'):
+            entry['metrics'] = record.metrics
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+# Log level per verbosity: -1 warnings only, 0 progress and stage metrics, 1 or more adds details.
+VERBOSITY_LEVELS = {-1: logging.WARNING, 0: logging.INFO, 1: logging.DEBUG}
+
+def configure_logging(verbosity=0, log_format='text', stream=None):
+    """Sends the project's log messages to stderr (or `stream`) at the given verbosity.
+
+    Stage metrics are logged at INFO, so quiet mode (-1) shows only warnings and errors.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == 'json':
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(message)s'))
+    root = logging.getLogger('src')
+    root.handlers[:] = [handler]
+    root.setLevel(VERBOSITY_LEVELS[max(-1, min(verbosity, 1))])
+    root.propagate = False
@@ -0,0 +1,103 @@
+import base64
+import json
+import numpy as np
+import os
+import pandas as pd
+
+# Tile size in screen pixels, as used by Leaflet and most web maps.
+TILE_SIZE = 256
+
+def encode_base64(data):
+    """Encodes raw bytes as an ASCII base64 string for embedding in the map's HTML."""
+    return base64.b64encode(data).decode('ascii')
+
+def encode_typed_array(values, dtype):
+    """Encodes a NumPy array as base64 so the browser can view it as a typed array."""
+    return encode_base64(np.ascontiguousarray(values, dtype=dtype).tobytes())
+
+def mercator_fractions(lon, lat):
+    """Projects lon/lat to Web Mercator coordinates scaled to [0, 1] (y grows southwards)."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)
+    x = (lon + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lat))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return np.clip(x, 0.0, 1.0 - 1e-12), np.clip(y, 0.0, 1.0 - 1e-12)
+
+def _group_cells(cell_x, cell_y, weights):
+    """Sums each weight array per distinct (cell_x, cell_y) pair.
+
+    The pairs are packed into one int64 key and grouped with np.unique, so the
+    cells come back sorted by (cell_x, cell_y).
+    """
+    keys = (cell_x.astype(np.int64) << 32) | cell_y.astype(np.int64)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    sums = {name: np.bincount(inverse, weights=values, minlength=len(unique_keys))
+            for name, values in weights.items()}
+    return unique_keys >> 32, unique_keys & 0xFFFFFFFF, sums
+
+def build_cluster_levels(lon, lat, total_mw, max_zoom=8, cell_pixels=64):
+    """Pre-aggregates plants into a grid of cell_pixels-wide cells for zoom levels 0..max_zoom.
+
+    The finest level is built from the points; every coarser level is built from
+    its child cells, so the whole hierarchy costs one pass over the data. Each level
+    is a DataFrame with the cell coordinates, plant count, summed total_mw and the
+    mean plant location of the cell.
+    """
+    x, y = mercator_fractions(lon, lat)
+    cells = (TILE_SIZE // cell_pixels) << max_zoom
+    cell_x = np.floor(x * cells).astype(np.int64)
+    cell_y = np.floor(y * cells).astype(np.int64)
+    weights = {
+        'count': np.ones(len(x)),
+        'total_mw': np.nan_to_num(np.asarray(total_mw, dtype=np.float64)),
+        'lon_sum': np.asarray(lon, dtype=np.float64),
+        'lat_sum': np.asarray(lat, dtype=np.float64),
+    }
+
+    levels = {}
+    for zoom in range(max_zoom, -1, -1):
+        cell_x, cell_y, weights = _group_cells(cell_x, cell_y, weights)
+        levels[zoom] = pd.DataFrame({
+            'cell_x': cell_x,
+            'cell_y': cell_y,
+            'count': weights['count'].astype(np.int64),
+            'total_mw': weights['total_mw'],
+            'longitude': weights['lon_sum'] / weights['count'],
+            'latitude': weights['lat_sum'] / weights['count'],
+        })
+        cell_x, cell_y = cell_x // 2, cell_y // 2
+    return dict(sorted(levels.items()))
+
+def encode_cluster_chunk(level):
+    """Encodes the clusters of one level (or one tile) as compact typed arrays."""
+    return {
+        'lat': encode_typed_array(level['latitude'], np.float32),
+        'lon': encode_typed_array(level['longitude'], np.float32),
+        'count': encode_typed_array(level['count'], np.uint32),
+        'mw': encode_typed_array(level['total_mw'], np.float32),
+    }
+
+def write_json(path, obj):
+    """Writes a compact JSON file, creating its directory if needed."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(obj, f, separators=(',', ':'))
+
+def write_cluster_tiles(levels, output_dir, cell_pixels=64):
+    """Writes each cluster level as static clusters/{z}/{x}/{y}.json tiles.
+
+    Returns the tile index, mapping 'clusters/{z}' to the list of 'x/y' tiles written.
+    """
+    cells_per_tile = TILE_SIZE // cell_pixels
+    tile_index = {}
+    for zoom, level in levels.items():
+        tile_x = level['cell_x'].to_numpy() // cells_per_tile
+        tile_y = level['cell_y'].to_numpy() // cells_per_tile
+        keys = []
+        for (tx, ty), tile in level.groupby([tile_x, tile_y], sort=False):
+            write_json(os.path.join(output_dir, 'clusters', str(zoom), str(tx), f"{ty}.json"),
+                       encode_cluster_chunk(tile))
+            keys.append(f"{tx}/{ty}")
+        tile_index[f"clusters/{zoom}"] = keys
+    return tile_index
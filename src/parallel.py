@@ -0,0 +1,105 @@
+import geopandas
+import logging
+import numpy as np
+import os
+import pandas as pd
+import pyarrow as pa
+from concurrent.futures import ProcessPoolExecutor
+
+from src.analysis import density_from_partial, merge_density_partials, partial_power_plant_density
+from src.data_processing import CATEGORICAL_COLUMNS, process_power_plants_data, standardize_column_name
+from src.instrumentation import instrument
+
+logger = logging.getLogger(__name__)
+
+def _table_to_ipc(table):
+    """Serializes an Arrow table into a single contiguous IPC stream buffer."""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def _ipc_to_table(buffer):
+    """Reads an Arrow table back from an IPC stream buffer without copying."""
+    return pa.ipc.open_stream(buffer).read_all()
+
+def _process_partition(buffer):
+    """Worker entry point: cleans, reprojects and aggregates one partition.
+
+    Partitions travel between processes as Arrow IPC buffers, which are copied as
+    raw bytes instead of pickling every Python object in a GeoDataFrame.
+    """
+    gdf = geopandas.GeoDataFrame.from_arrow(_ipc_to_table(buffer))
+    gdf = process_power_plants_data(gdf, inplace=True)
+    partial = partial_power_plant_density(gdf) if 'state' in gdf.columns else None
+    return _table_to_ipc(pa.table(gdf.to_arrow())), partial
+
+def partition_row_ranges(num_rows, num_partitions):
+    """Splits range(num_rows) into num_partitions contiguous (start, stop) ranges."""
+    bounds = np.linspace(0, num_rows, num_partitions + 1).astype(int)
+    return [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+
+def partition_by_key(keys, num_partitions):
+    """Groups row indices so that every row with the same key lands in one partition.
+
+    Keys are assigned greedily, largest first, to the partition with the fewest rows.
+    """
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    counts = np.bincount(codes, minlength=len(uniques))
+    sizes = np.zeros(num_partitions, dtype=np.int64)
+    key_to_partition = np.empty(len(uniques), dtype=np.int64)
+    for code in np.argsort(counts)[::-1]:
+        target = int(np.argmin(sizes))
+        key_to_partition[code] = target
+        sizes[target] += counts[code]
+    row_partition = key_to_partition[codes]
+    return [np.flatnonzero(row_partition == i) for i in range(num_partitions) if sizes[i] > 0]
+
+@instrument
+def parallel_process_power_plants(gdf, workers=None, partition_by='rows'):
+    """Cleans, reprojects and aggregates a raw power plant GeoDataFrame across a process pool.
+
+    The frame is partitioned by contiguous row ranges (partition_by='rows') or by
+    state (partition_by='state'), and each partition is processed by
+    process_power_plants_data in its own worker. Returns the merged processed
+    GeoDataFrame and the per-state plant counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    logger.info("Processing power plant data in parallel with %d workers (partitioned by %s)...", workers, partition_by)
+
+    table = pa.table(gdf.to_arrow())
+    if partition_by == 'rows':
+        partitions = [table.slice(start, stop - start)
+                      for start, stop in partition_row_ranges(table.num_rows, workers)]
+    elif partition_by == 'state':
+        state_columns = [col for col in gdf.columns if standardize_column_name(col) == 'state']
+        if not state_columns:
+            logger.error("'state' column not found for partitioning.")
+            return None, None
+        partitions = [table.take(indices)
+                      for indices in partition_by_key(gdf[state_columns[0]].to_numpy(), workers)]
+    else:
+        raise ValueError(f"Unknown partitioning scheme: {partition_by}")
+
+    buffers = [_table_to_ipc(partition) for partition in partitions]
+    if workers == 1:
+        results = [_process_partition(buffer) for buffer in buffers]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_partition, buffers))
+
+    # Partitions carry their own category sets, so restore the categorical dtypes after merging.
+    frames = [geopandas.GeoDataFrame.from_arrow(_ipc_to_table(buffer)) for buffer, _ in results]
+    processed_gdf = pd.concat(frames, ignore_index=True)
+    categorical = [col for col in CATEGORICAL_COLUMNS if col in processed_gdf.columns]
+    processed_gdf = processed_gdf.astype({col: 'category' for col in categorical})
+
+    partials = [partial for _, partial in results if partial is not None]
+    density_results = None
+    if partials:
+        total = partials[0]
+        for partial in partials[1:]:
+            total = merge_density_partials(total, partial)
+        density_results = density_from_partial(total)
+    logger.info("Parallel processing complete.")
+    return processed_gdf, density_results
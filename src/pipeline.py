@@ -0,0 +1,268 @@
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import logging
+import os
+import pickle
+import sys
+from dataclasses import dataclass, field
+
+from src.instrumentation import count_rows, instrument
+
+logger = logging.getLogger(__name__)
+
+# Processed data, kept here rather than in src.cache so modules that only need the
+# path don't import the ingestion and processing chain.
+CACHE_DIRECTORY = 'data/processed'
+
+# Stored stage outputs, next to the processed data cache.
+# The heavy libraries are imported inside the stages and memo readers that need them,
+# so a run whose stages are up to date never imports geopandas, pyproj or folium.
+STAGE_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'stages')
+
+# Part of every stage key; bump it to invalidate all stored stage outputs at once.
+PIPELINE_FORMAT_VERSION = 1
+
+@dataclass
+class Stage:
+    """One step of the pipeline.
+
+    The stage function is called with the outputs of its `inputs` stages, in
+    order, plus `config` as keyword arguments. Stages that write a file declare
+    it as `output_path`, which is passed to the function as well. Root stages
+    declare the `source` file they read, so that changes to it invalidate them.
+    Stages with persist=False are recomputed instead of being stored on disk.
+    The source code of the stage function and of the `modules` that implement it
+    is part of the stage's key, so upgrading them invalidates stored outputs;
+    `version` can be bumped to do the same by hand.
+    """
+    name: str
+    func: callable
+    inputs: tuple = ()
+    config: dict = field(default_factory=dict)
+    source: str = None
+    output_path: str = None
+    persist: bool = True
+    modules: tuple = ()
+    version: int = 1
+
+def fingerprint_source(path):
+    """Identifies a source file version by its path, size and modification time."""
+    if not os.path.exists(path):
+        return f"{path}:missing"
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def describe_function(func):
+    """Names a stage function and hashes its source.
+
+    Arguments bound with functools.partial are left out of the key.
+    """
+    while isinstance(func, functools.partial):
+        func = func.func
+    try:
+        source = inspect.getsource(func)
+    except (OSError, TypeError):
+        source = ''
+    return f"{func.__module__}.{func.__qualname__}:{hashlib.sha256(source.encode()).hexdigest()[:16]}"
+
+def fingerprint_modules(names):
+    """Hashes the source files of modules by name, without importing them."""
+    digest = hashlib.sha256()
+    for name in names:
+        spec = importlib.util.find_spec(name)
+        if spec is None or not spec.origin or not os.path.isfile(spec.origin):
+            digest.update(f"{name}:missing".encode())
+            continue
+        with open(spec.origin, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+class Pipeline:
+    """A lazy, dependency-aware pipeline with on-disk memoization of stage outputs.
+
+    Each stage's key hashes its code, config, source file fingerprint and the
+    keys of its inputs, so it changes whenever anything upstream changes. When a
+    requested stage's stored output matches its key, it is returned without
+    running, or even loading, anything upstream. Only the stages behind the
+    requested targets ever run.
+    """
+
+    def __init__(self, stages, cache_dir=STAGE_CACHE_DIRECTORY):
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache_dir = cache_dir
+        self._keys = {}
+
+    def stage_key(self, name):
+        """Computes the memoization key of a stage from its definition and its inputs' keys."""
+        if name not in self._keys:
+            stage = self.stages[name]
+            parts = {
+                'name': stage.name,
+                'format_version': PIPELINE_FORMAT_VERSION,
+                'version': stage.version,
+                'func': describe_function(stage.func),
+                'modules': fingerprint_modules(stage.modules),
+                'config': stage.config,
+                'source': fingerprint_source(stage.source) if stage.source else None,
+                'output_path': stage.output_path,
+                'inputs': [self.stage_key(dep) for dep in stage.inputs],
+            }
+            encoded = json.dumps(parts, sort_keys=True, default=str).encode()
+            self._keys[name] = hashlib.sha256(encoded).hexdigest()
+        return self._keys[name]
+
+    def _memo_paths(self, name):
+        return os.path.join(self.cache_dir, f"{name}.json"), os.path.join(self.cache_dir, name)
+
+    def _load_memo(self, stage):
+        """Returns (True, output) if the stored output of a stage is up to date, else (False, None)."""
+        metadata_path, data_path = self._memo_paths(stage.name)
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return False, None
+        if metadata.get('key') != self.stage_key(stage.name):
+            return False, None
+
+        if stage.output_path is not None:
+            return os.path.exists(stage.output_path), stage.output_path
+        if metadata['format'] == 'geoparquet':
+            import geopandas
+            return True, geopandas.read_parquet(data_path, memory_map=True)
+        if metadata['format'] == 'parquet':
+            import pandas as pd
+            return True, pd.read_parquet(data_path, memory_map=True)
+        with open(data_path, 'rb') as f:
+            return True, pickle.load(f)
+
+    def _store_memo(self, stage, output):
+        """Stores a stage output (or, for file stages, a marker) together with its key."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        metadata_path, data_path = self._memo_paths(stage.name)
+        # Only frames can have been produced by a stage when pandas is not loaded yet.
+        pd = sys.modules.get('pandas')
+        geopandas = sys.modules.get('geopandas')
+        if stage.output_path is not None:
+            data_format = 'file'
+        elif geopandas is not None and isinstance(output, geopandas.GeoDataFrame):
+            data_format = 'geoparquet'
+            output.to_parquet(data_path)
+        elif pd is not None and isinstance(output, pd.DataFrame):
+            data_format = 'parquet'
+            output.to_parquet(data_path)
+        else:
+            data_format = 'pickle'
+            with open(data_path, 'wb') as f:
+                pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(metadata_path, 'w') as f:
+            json.dump({'key': self.stage_key(stage.name), 'format': data_format}, f)
+
+    def _resolve(self, name, results, force):
+        if name in results:
+            return results[name]
+        stage = self.stages[name]
+
+        if stage.persist and not force:
+            with instrument(f'{name}_memo') as timer:
+                hit, output = self._load_memo(stage)
+                timer.rows_out = count_rows(output)
+            if hit:
+                logger.info("Stage '%s' is up to date.", name)
+                results[name] = output
+                return output
+
+        inputs = [self._resolve(dep, results, force) for dep in stage.inputs]
+        missing = [dep for dep, value in zip(stage.inputs, inputs) if value is None]
+        if missing:
+            logger.warning("Skipping stage '%s': no output from %s.", name, missing)
+            results[name] = None
+            return None
+
+        logger.info("Running stage '%s'...", name)
+        kwargs = dict(stage.config)
+        if stage.output_path is not None:
+            kwargs['output_path'] = stage.output_path
+        output = stage.func(*inputs, **kwargs)
+        if stage.output_path is not None:
+            output = stage.output_path
+        if output is not None and stage.persist:
+            self._store_memo(stage, output)
+        results[name] = output
+        return output
+
+    def run(self, *targets, force=False):
+        """Runs only the stages needed for `targets` and returns their outputs by name.
+
+        With force=True every stage behind the targets is recomputed.
+        """
+        results = {}
+        for target in targets:
+            if target not in self.stages:
+                raise ValueError(f"Unknown pipeline stage: {target}")
+            self._resolve(target, results, force)
+        return {target: results[target] for target in targets}
+
+def process_stage(file_path, cache_dir=None, rebuild=False, workers=1):
+    from src.cache import load_processed_power_plants
+    return load_processed_power_plants(file_path, cache_dir=cache_dir or CACHE_DIRECTORY, rebuild=rebuild,
+                                       workers=workers)
+
+def analyze_stage(gdf):
+    from src.analysis import analyze_power_plant_density
+    return analyze_power_plant_density(gdf)
+
+def join_stage(gdf, polygon_path, id_column=None, by=(), cache_dir=None, workers=1):
+    from src.spatial_join import JOIN_CACHE_DIRECTORY, aggregate_by_polygon, spatial_join_power_plants
+    assignment = spatial_join_power_plants(gdf, polygon_path, id_column=id_column,
+                                           cache_dir=cache_dir or JOIN_CACHE_DIRECTORY, workers=workers)
+    if assignment is None:
+        return None
+    return aggregate_by_polygon(gdf, assignment, by=by)
+
+def chart_stage(density_df, output_path):
+    from src.visualization import plot_power_plant_density
+    return plot_power_plant_density(density_df, output_path)
+
+def map_stage(gdf, output_path, **map_kwargs):
+    from src.visualization import create_power_plant_map
+    return create_power_plant_map(gdf, output_path=output_path, **map_kwargs)
+
+def build_power_plant_pipeline(file_path, reports_dir='reports', cache_dir=STAGE_CACHE_DIRECTORY,
+                               workers=1, map_kwargs=None, polygon_layers=None, rebuild=False):
+    """Builds the process -> analyze -> chart/map pipeline for a raw GeoJSON file.
+
+    The process stage goes through the GeoParquet cache of src.cache, kept in the
+    parent of cache_dir, which validates the source by content and format
+    version, so it isn't stored a second time as a stage output. With
+    rebuild=True that cache is rebuilt as well. `workers` only affects speed,
+    so it is not part of the process stage's key.
+    `polygon_layers` maps names to join_stage settings ({'polygon_path': ...,
+    'id_column': ..., 'by': ...}) and adds a 'join_<name>' stage per layer that
+    aggregates the plants by the layer's polygons.
+    """
+    # The processed data cache and plant -> polygon assignments are kept next to the stage outputs.
+    processed_dir = os.path.dirname(os.path.normpath(cache_dir))
+    join_cache_dir = os.path.join(processed_dir, 'joins')
+    join_stages = [
+        Stage(f'join_{name}', functools.partial(join_stage, cache_dir=join_cache_dir, workers=workers),
+              inputs=('process',), config=dict(layer), source=layer['polygon_path'],
+              modules=('src.spatial_join', 'src.analysis'))
+        for name, layer in (polygon_layers or {}).items()
+    ]
+    return Pipeline([
+        Stage('process', functools.partial(process_stage, cache_dir=processed_dir, rebuild=rebuild,
+                                           workers=workers),
+              config={'file_path': file_path}, source=file_path, persist=False,
+              modules=('src.cache', 'src.data_ingestion', 'src.data_processing', 'src.parallel',
+                       'src.projection')),
+        Stage('analyze', analyze_stage, inputs=('process',), modules=('src.analysis',)),
+        Stage('chart', chart_stage, inputs=('analyze',), modules=('src.visualization', 'src.charts'),
+              output_path=os.path.join(reports_dir, 'power_plant_density.png')),
+        Stage('map', map_stage, inputs=('process',), config=dict(map_kwargs or {}),
+              modules=('src.visualization', 'src.map_tiles', 'src.density'),
+              output_path=os.path.join(reports_dir, 'power_plants_map.html')),
+    ] + join_stages, cache_dir=cache_dir)
@@ -0,0 +1,210 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default location of the stored arrays, next to the processed data cache (src.pipeline.CACHE_DIRECTORY).
+# geopandas is only imported to build GeoDataFrames, so reading a store stays light.
+STORE_PATH = os.path.join('data', 'processed', 'plant_store')
+
+MANIFEST_NAME = 'manifest.json'
+
+# Bump when the on-disk layout changes so older stores are rejected rather than misread.
+STORE_FORMAT_VERSION = 1
+
+def _smallest_code_dtype(num_values):
+    """Returns the smallest signed integer dtype holding codes 0..num_values-1 and -1 for missing."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_values <= np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _encode_strings(series):
+    """Dictionary-encodes a text or categorical column as (codes, values)."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), series.cat.categories
+    codes, values = pd.factorize(series, sort=False)
+    return codes.astype(_smallest_code_dtype(len(values))), values
+
+class PlantStore:
+    """Column store of processed power plants in contiguous NumPy arrays.
+
+    Numeric columns (longitude, latitude, the *_mw capacities, codes) are kept
+    as one array each; text columns are dictionary-encoded as integer codes
+    (-1 for missing) plus their distinct values. There is no geometry column:
+    points are rebuilt from longitude/latitude when a GeoDataFrame is needed.
+
+    save() writes one .npy file per array and a manifest, and load() maps them
+    back read-only, so every process that loads (or unpickles) the same store
+    shares one copy through the page cache.
+    """
+
+    def __init__(self, arrays, dictionaries=None, crs='EPSG:4326', path=None):
+        self.arrays = arrays
+        self.dictionaries = dictionaries or {}
+        self.crs = crs
+        self.path = path
+        lengths = {len(array) for array in arrays.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+
+    @classmethod
+    def from_geodataframe(cls, gdf):
+        """Builds a store from the output of process_power_plants_data.
+
+        Longitude and latitude come from their columns, or from the point
+        geometry when the columns are missing.
+        """
+        arrays = {}
+        dictionaries = {}
+        geometry_name = getattr(gdf, '_geometry_column_name', None)
+        for name in gdf.columns:
+            if name == geometry_name:
+                continue
+            series = gdf[name]
+            if pd.api.types.is_numeric_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+                if pd.api.types.is_float_dtype(series):
+                    # Nullable float columns become plain arrays with NaN for missing values.
+                    array = series.to_numpy(dtype=getattr(series.dtype, 'numpy_dtype', series.dtype), na_value=np.nan)
+                else:
+                    array = series.to_numpy()
+                arrays[name] = np.ascontiguousarray(array)
+            else:
+                codes, values = _encode_strings(series)
+                arrays[name] = np.ascontiguousarray(codes)
+                dictionaries[name] = pd.Index(values)
+
+        if geometry_name is not None and ('longitude' not in arrays or 'latitude' not in arrays):
+            import shapely
+            geometry = gdf.geometry.array
+            arrays['longitude'] = shapely.get_x(geometry)
+            arrays['latitude'] = shapely.get_y(geometry)
+
+        crs = gdf.crs.to_string() if getattr(gdf, 'crs', None) is not None else 'EPSG:4326'
+        return cls(arrays, dictionaries, crs)
+
+    def __len__(self):
+        return len(next(iter(self.arrays.values()))) if self.arrays else 0
+
+    def __reduce__(self):
+        # A mapped store is sent to other processes as its path, so they map the same files.
+        if self.path is not None:
+            return (type(self).load, (self.path,))
+        return (type(self), (self.arrays, self.dictionaries, self.crs))
+
+    @property
+    def columns(self):
+        return pd.Index(list(self.arrays))
+
+    @property
+    def shape(self):
+        return (len(self), len(self.arrays))
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def nbytes(self):
+        """Returns the size of the column arrays (not of the dictionary values) in bytes."""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def codes(self, name):
+        """Returns the integer codes of a dictionary-encoded column."""
+        return self.arrays[name]
+
+    def categories(self, name):
+        """Returns the distinct values of a dictionary-encoded column."""
+        return self.dictionaries[name]
+
+    def column(self, name):
+        """Returns one column as a pandas array without copying it.
+
+        Dictionary-encoded columns come back as a Categorical over the stored codes.
+        """
+        if name in self.dictionaries:
+            return pd.Categorical.from_codes(self.arrays[name], dtype=pd.CategoricalDtype(self.dictionaries[name]),
+                                             validate=False)
+        return self.arrays[name]
+
+    def __getitem__(self, name):
+        return pd.Series(self.column(name), name=name, copy=False)
+
+    def take(self, rows):
+        """Returns a new in-memory store holding the given rows (indices or a boolean mask)."""
+        rows = np.asarray(rows)
+        return type(self)({name: array[rows] for name, array in self.arrays.items()}, self.dictionaries, self.crs)
+
+    def to_frame(self, columns=None):
+        """Returns the columns as a DataFrame that shares the stored arrays.
+
+        Numeric columns and the codes of text columns are not copied, so a
+        frame over a mapped store stays backed by the mapped files.
+        """
+        names = list(self.arrays) if columns is None else [name for name in columns if name in self.arrays]
+        return pd.DataFrame({name: self.column(name) for name in names}, copy=False)
+
+    def to_geodataframe(self, columns=None):
+        """Returns a GeoDataFrame with point geometry built from longitude/latitude.
+
+        The attribute columns share the stored arrays as in to_frame(); only the
+        geometry is newly allocated.
+        """
+        import geopandas
+
+        geometry = geopandas.points_from_xy(self.arrays['longitude'], self.arrays['latitude'], crs=self.crs)
+        return geopandas.GeoDataFrame(self.to_frame(columns), geometry=geometry, copy=False)
+
+    def save(self, path=STORE_PATH):
+        """Writes one .npy file per column and a manifest to the directory `path`.
+
+        The manifest is written last, so a partially written store is never loaded.
+        """
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        columns = {}
+        for name, array in self.arrays.items():
+            # Replace rather than overwrite files, so processes mapping an older store keep valid pages.
+            array_path = os.path.join(path, f"{name}.npy")
+            with open(array_path + '.tmp', 'wb') as f:
+                np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+            os.replace(array_path + '.tmp', array_path)
+            columns[name] = {'dtype': array.dtype.str}
+            if name in self.dictionaries:
+                values_file = f"{name}.values.json"
+                with open(os.path.join(path, values_file), 'w') as f:
+                    json.dump([None if pd.isna(value) else str(value) for value in self.dictionaries[name]], f)
+                columns[name]['values'] = values_file
+
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': STORE_FORMAT_VERSION, 'rows': len(self), 'crs': self.crs,
+                       'columns': columns}, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+        logger.info("Wrote plant store with %d plants to %s", len(self), path)
+        return path
+
+    @classmethod
+    def load(cls, path=STORE_PATH, mmap=True):
+        """Loads a store written by save(), memory-mapping its arrays read-only by default."""
+        with open(os.path.join(path, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported plant store version {manifest.get('version')} in {path}")
+
+        arrays = {}
+        dictionaries = {}
+        for name, column in manifest['columns'].items():
+            arrays[name] = np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r' if mmap else None,
+                                   allow_pickle=False)
+            if 'values' in column:
+                with open(os.path.join(path, column['values'])) as f:
+                    dictionaries[name] = pd.Index(json.load(f))
+        return cls(arrays, dictionaries, manifest['crs'], path=path if mmap else None)
@@ -0,0 +1,116 @@
+import functools
+import numpy as np
+import pandas as pd
+
+# Projected coordinate systems used for distance and area work. 'utm' projects each
+# plant into the UTM zone containing it, so its coordinates are only comparable
+# between plants of the same zone (see add_projected_columns).
+PROJECTIONS = {
+    'equal_area': 'EPSG:5070',   # NAD83 / Conus Albers, equal-area for the contiguous U.S.
+    'web_mercator': 'EPSG:3857',
+    'utm': 'utm',
+}
+
+def normalize_crs(crs):
+    """Returns a hashable, canonical description of a CRS (EPSG code, string or pyproj CRS)."""
+    if isinstance(crs, (int, np.integer)):
+        return f"EPSG:{int(crs)}"
+    if isinstance(crs, str):
+        return crs.upper() if crs.lower().startswith('epsg:') else crs
+    epsg = crs.to_epsg()
+    return f"EPSG:{epsg}" if epsg is not None else crs.to_wkt()
+
+@functools.lru_cache(maxsize=None)
+def _cached_transformer(source_crs, target_crs):
+    from pyproj import Transformer
+    return Transformer.from_crs(source_crs, target_crs, always_xy=True)
+
+def get_transformer(source_crs, target_crs):
+    """Returns the pyproj Transformer between two CRSs, building it only once per pair.
+
+    Coordinates are always in (x, y) = (longitude, latitude) order.
+    """
+    return _cached_transformer(normalize_crs(source_crs), normalize_crs(target_crs))
+
+def utm_epsg(longitude, latitude):
+    """Returns the EPSG code of the WGS 84 UTM zone containing each point (0 where a coordinate is missing)."""
+    lon = np.asarray(longitude, dtype=np.float64)
+    lat = np.asarray(latitude, dtype=np.float64)
+    zone = np.clip((np.nan_to_num(lon) + 180.0) // 6.0 + 1, 1, 60).astype(np.int32)
+    epsg = np.where(lat >= 0, 32600, 32700).astype(np.int32) + zone
+    epsg[np.isnan(lon) | np.isnan(lat)] = 0
+    return epsg
+
+def transform_coordinates(x, y, source_crs, target_crs):
+    """Transforms coordinate arrays in one bulk call with a cached transformer.
+
+    Returns float64 (x, y) arrays; missing inputs stay NaN.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if normalize_crs(source_crs) == normalize_crs(target_crs):
+        return x.copy(), y.copy()
+    return get_transformer(source_crs, target_crs).transform(x, y)
+
+def add_projected_columns(gdf, projections=None, inplace=False):
+    """Adds projected <name>_x/<name>_y columns computed from the longitude/latitude columns.
+
+    `projections` maps a column prefix to a CRS (or 'utm'), defaulting to
+    PROJECTIONS. Only the coordinate arrays are transformed, so several
+    projections can sit side by side without touching the point geometry.
+    With 'utm', every plant is projected into its own zone, one bulk transform
+    per zone, and the zone's EPSG code is stored in a <name>_zone column.
+    """
+    if not inplace:
+        gdf = gdf.copy()
+    projections = PROJECTIONS if projections is None else projections
+    lon = gdf['longitude'].to_numpy(dtype=np.float64)
+    lat = gdf['latitude'].to_numpy(dtype=np.float64)
+    for name, crs in projections.items():
+        if crs == 'utm':
+            gdf[f'{name}_x'], gdf[f'{name}_y'], gdf[f'{name}_zone'] = _project_utm(lon, lat)
+        else:
+            gdf[f'{name}_x'], gdf[f'{name}_y'] = transform_coordinates(lon, lat, 'EPSG:4326', crs)
+    return gdf
+
+def _project_utm(lon, lat):
+    """Projects each point into its own UTM zone; returns x, y and the zone EPSG codes (NA where missing)."""
+    epsg = utm_epsg(lon, lat)
+    x = np.full(len(lon), np.nan)
+    y = np.full(len(lat), np.nan)
+    for code in np.unique(epsg[epsg != 0]):
+        in_zone = epsg == code
+        x[in_zone], y[in_zone] = transform_coordinates(lon[in_zone], lat[in_zone], 'EPSG:4326', int(code))
+    zone = pd.array(epsg, dtype='Int32')
+    zone[epsg == 0] = pd.NA
+    return x, y, zone
+
+def reproject_points(gdf, target_crs='EPSG:4326', inplace=False):
+    """Reprojects a GeoDataFrame's geometry, like to_crs, using a cached transformer.
+
+    Point geometries are transformed as two coordinate arrays and rebuilt in one
+    vectorized call; other geometry types fall back to GeoDataFrame.to_crs.
+    Nothing is rebuilt when the frame is already in the target CRS.
+    """
+    import geopandas
+    import shapely
+
+    if gdf.crs is None:
+        raise ValueError("Cannot reproject a GeoDataFrame without a CRS.")
+    if normalize_crs(gdf.crs) == normalize_crs(target_crs):
+        return gdf
+
+    geometry = gdf.geometry.array
+    is_point = shapely.get_type_id(geometry) == 0
+    if not (is_point | geometry.isna()).all():
+        converted = gdf.to_crs(target_crs, inplace=inplace)
+        return gdf if inplace else converted
+
+    x, y = transform_coordinates(shapely.get_x(geometry), shapely.get_y(geometry), gdf.crs, target_crs)
+    points = shapely.points(x, y)
+    points[~is_point] = None
+    reprojected = geopandas.GeoSeries(points, index=gdf.index, crs=target_crs, name=gdf.geometry.name)
+    if inplace:
+        gdf.set_geometry(reprojected, inplace=True)
+        return gdf
+    return gdf.set_geometry(reprojected)
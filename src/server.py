@@ -0,0 +1,379 @@
+import asyncio
+import collections
+import json
+import logging
+import math
+import time
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from src.analysis import aggregate_power_plants
+from src.map_tiles import TILE_SIZE, build_cluster_levels
+from src.plant_store import PlantStore
+from src.spatial_index import PlantIndex
+from src.visualization import get_capacity_codes, get_capacity_palette, get_type_colors
+
+logger = logging.getLogger(__name__)
+
+# Plant attributes returned by the plant list and tile endpoints, when present.
+PLANT_FIELDS = ['plant_code', 'plant_name', 'state', 'primsource', 'total_mw', 'longitude', 'latitude']
+
+# Default and largest number of plants returned by one plant list request.
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 50_000
+
+# Default size of the response cache.
+DEFAULT_CACHE_BYTES = 64 * 2**20
+
+# Number of recent request latencies kept for /stats.
+LATENCY_WINDOW = 10_000
+
+class RequestError(ValueError):
+    """A request that can't be answered, with the HTTP status to reply with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+class ResponseCache:
+    """LRU cache of encoded response bodies, bounded by their total size in bytes.
+
+    Adding a body evicts the least recently used ones until the cache fits in
+    max_bytes again; bodies larger than max_bytes are never stored.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the cached (content_type, body) for a key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, content_type, body):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self.size_bytes -= len(self._entries.pop(key)[1])
+        self._entries[key] = (content_type, body)
+        self.size_bytes += len(body)
+        while self.size_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self.size_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+def tile_bounds(z, x, y):
+    """Returns the (min_lon, min_lat, max_lon, max_lat) of a Web Mercator tile."""
+    n = 1 << z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return x / n * 360.0 - 180.0, latitude(y + 1), (x + 1) / n * 360.0 - 180.0, latitude(y)
+
+def _parse_floats(text, count, name, minimum=None):
+    try:
+        values = [float(value) for value in text.split(',')]
+    except ValueError:
+        values = []
+    # float() also accepts 'nan' and 'inf', which the spatial index can't search with.
+    if len(values) != count or not all(np.isfinite(values)):
+        raise RequestError(f"'{name}' must be {count} comma-separated finite numbers")
+    if minimum is not None and min(values) < minimum:
+        raise RequestError(f"'{name}' must be at least {minimum}")
+    return values
+
+class PlantService:
+    """Answers queries over the processed plants, loaded once and held in memory.
+
+    Plants are kept as a PlantStore, with a PlantIndex for bbox and radius
+    queries and the map's cluster levels for low-zoom tiles. handle() maps a
+    request path and query to a JSON response body.
+    """
+
+    def __init__(self, plants, max_cluster_zoom=8, cell_pixels=64):
+        self.store = plants if isinstance(plants, PlantStore) else PlantStore.from_geodataframe(plants)
+        lon, lat = self.store.arrays['longitude'], self.store.arrays['latitude']
+        self.rows = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+        primsource = self.store['primsource'].to_numpy()[self.rows] if 'primsource' in self.store.columns else None
+        self.index = PlantIndex(lon[self.rows], lat[self.rows], primsource=primsource)
+        self.fields = [field for field in PLANT_FIELDS if field in self.store.columns]
+
+        # The map's colors: a hex color per primsource and per capacity code.
+        self.type_colors = get_type_colors(self.store)
+        total_mw = self.store.arrays['total_mw'].astype(np.float64) if 'total_mw' in self.store.columns else None
+        if total_mw is not None:
+            # Missing capacities have the code after the last color (MISSING_CODE), mapped to None.
+            capacity_palette = np.array(get_capacity_palette() + [None], dtype=object)
+            codes = get_capacity_codes(total_mw, np.nanmin(total_mw), np.nanmax(total_mw))
+            self.capacity_colors = capacity_palette[codes]
+        else:
+            total_mw = np.zeros(len(self.store))
+            self.capacity_colors = np.full(len(self.store), None, dtype=object)
+
+        # Cluster cells per zoom, sorted by tile so a tile's cells are one contiguous slice.
+        self.max_cluster_zoom = max_cluster_zoom
+        self.clusters = {}
+        cells_per_tile = TILE_SIZE // cell_pixels
+        levels = build_cluster_levels(lon[self.rows], lat[self.rows], total_mw[self.rows], max_cluster_zoom,
+                                      cell_pixels)
+        for zoom, level in levels.items():
+            tile_x = level['cell_x'].to_numpy() // cells_per_tile
+            keys = (tile_x << 32) | (level['cell_y'].to_numpy() // cells_per_tile)
+            order = np.argsort(keys, kind='stable')
+            self.clusters[zoom] = (keys[order], level.iloc[order].reset_index(drop=True))
+
+        # Build the lazily created trees now rather than in the first requests.
+        self.index.bbox([[0.0, 0.0, 0.0, 0.0]])
+        self.index.radius([0.0], [0.0], 0.0)
+
+    def _records(self, index_rows, extra=None):
+        """Returns the plant attributes of index rows as a list of dicts."""
+        rows = self.rows[index_rows]
+        columns = {}
+        for field in self.fields:
+            if field in self.store.dictionaries:
+                codes = self.store.codes(field)[rows]
+                values = np.asarray(self.store.categories(field), dtype=object)[codes]
+                values[codes < 0] = None
+                columns[field] = values.tolist()
+            else:
+                values = self.store.arrays[field][rows]
+                if values.dtype == np.float32:
+                    # float32 capacities hold about 7 digits; rounding to kW drops the float32 noise from the JSON.
+                    values = np.round(values.astype(np.float64), 3)
+                columns[field] = values.tolist()
+                if values.dtype.kind == 'f' and np.isnan(values).any():
+                    # JSON has no NaN, so missing numbers become null.
+                    columns[field] = [None if value != value else value for value in columns[field]]
+        for name, values in (extra or {}).items():
+            columns[name] = values.tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def _limit(self, params):
+        try:
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise RequestError("'limit' must be an integer")
+        return max(0, min(limit, MAX_LIMIT))
+
+    def density(self, params):
+        """Plant counts and capacity metrics per group: /density?by=state,primsource.
+
+        The groups are those of aggregate_power_plants, whose plant_count per
+        state matches analyze_power_plant_density.
+        """
+        keys = params.get('by', 'state').split(',')
+        missing = [key for key in keys if key not in self.store.columns]
+        if missing:
+            raise RequestError(f"Unknown group columns: {', '.join(missing)}")
+        result = aggregate_power_plants(self.store, by=keys)
+        # Sums of float32 capacities carry float32 noise; round the metrics to kW like the plant records.
+        metrics = result.select_dtypes('floating').columns
+        result[metrics] = result[metrics].astype(np.float64).round(3)
+        return {'by': keys, 'groups': json.loads(result.to_json(orient='records'))}
+
+    def plants(self, params):
+        """Plants in a box (?bbox=minx,miny,maxx,maxy) or near a point (?lon=&lat=&radius_km=).
+
+        Both accept primsource and limit; radius results are sorted by distance.
+        """
+        primsource = params.get('primsource')
+        limit = self._limit(params)
+        if 'bbox' in params:
+            _, index_rows = self.index.bbox([_parse_floats(params['bbox'], 4, 'bbox')], primsource=primsource)
+            index_rows = np.sort(index_rows)
+            extra = {}
+        elif {'lon', 'lat', 'radius_km'} <= params.keys():
+            lon, lat = (_parse_floats(params[name], 1, name)[0] for name in ('lon', 'lat'))
+            radius_km = _parse_floats(params['radius_km'], 1, 'radius_km', minimum=0)[0]
+            _, index_rows, distances = self.index.radius([lon], [lat], radius_km, primsource=primsource)
+            order = np.argsort(distances, kind='stable')
+            index_rows = index_rows[order]
+            extra = {'distance_km': distances[order][:limit]}
+        else:
+            raise RequestError("Give either 'bbox' or 'lon', 'lat' and 'radius_km'")
+        return {'count': len(index_rows), 'truncated': len(index_rows) > limit,
+                'plants': self._records(index_rows[:limit], extra)}
+
+    def tile(self, z, x, y):
+        """A GeoJSON tile: plant clusters up to max_cluster_zoom, individual plants above it."""
+        if not (0 <= z <= 22 and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise RequestError(f"No tile {z}/{x}/{y}", status=404)
+        features = []
+        if z <= self.max_cluster_zoom:
+            keys, level = self.clusters[z]
+            key = (x << 32) | y
+            cells = level.iloc[np.searchsorted(keys, key, 'left'):np.searchsorted(keys, key, 'right')]
+            for lon, lat, count, total_mw in zip(cells['longitude'].tolist(), cells['latitude'].tolist(),
+                                                 cells['count'].tolist(), cells['total_mw'].tolist()):
+                features.append({'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                                 'properties': {'count': count, 'total_mw': total_mw}})
+        else:
+            min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+            _, index_rows = self.index.bbox([[min_lon, min_lat, max_lon, max_lat]])
+            index_rows = np.sort(index_rows)
+            rows = self.rows[index_rows]
+            for record, capacity_color in zip(self._records(index_rows), self.capacity_colors[rows].tolist()):
+                lon, lat = record.pop('longitude'), record.pop('latitude')
+                record['type_color'] = self.type_colors.get(record.get('primsource'))
+                record['capacity_color'] = capacity_color
+                features.append({'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [lon, lat]},
+                                 'properties': record})
+        return {'type': 'FeatureCollection', 'features': features}
+
+    def handle(self, path, params):
+        """Routes a request path and its query parameters to an endpoint.
+
+        Returns (content_type, body); raises RequestError for bad requests.
+        """
+        if path == '/density':
+            result, content_type = self.density(params), 'application/json'
+        elif path == '/plants':
+            result, content_type = self.plants(params), 'application/json'
+        elif path.startswith('/tiles/') and path.endswith('.geojson'):
+            try:
+                z, x, y = (int(part) for part in path[len('/tiles/'):-len('.geojson')].split('/'))
+            except ValueError:
+                raise RequestError(f"Not found: {path}", status=404)
+            result, content_type = self.tile(z, x, y), 'application/geo+json'
+        else:
+            raise RequestError(f"Not found: {path}", status=404)
+        return content_type, json.dumps(result, separators=(',', ':'), allow_nan=False).encode()
+
+class PlantServer:
+    """Serves a PlantService over HTTP/1.1 with asyncio, caching responses in a ResponseCache.
+
+    Queries run in the event loop's thread pool, so slow ones don't block other
+    connections. Connections are kept alive between requests. /health and
+    /stats are answered directly and never cached.
+    """
+
+    def __init__(self, service, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.service = service
+        self.cache = ResponseCache(cache_bytes)
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Starts listening and returns the bound (host, port)."""
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000.0
+        percentiles = (dict(zip(['p50_ms', 'p95_ms', 'p99_ms'], np.percentile(latencies, [50, 95, 99]).tolist()))
+                       if len(latencies) else {})
+        return {'requests': self.requests, 'cache': self.cache.stats(), 'latency': percentiles}
+
+    async def respond(self, target):
+        """Answers one GET request target; returns (status, content_type, body, cache_status)."""
+        url = urlsplit(target)
+        if url.path == '/health':
+            return 200, 'application/json', b'{"status":"ok"}', None
+        if url.path == '/stats':
+            return 200, 'application/json', json.dumps(self.stats()).encode(), None
+
+        # Equivalent queries share a cache entry regardless of parameter order.
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        key = (url.path, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return 200, cached[0], cached[1], 'hit'
+        try:
+            loop = asyncio.get_running_loop()
+            content_type, body = await loop.run_in_executor(None, self.service.handle, url.path, params)
+        except RequestError as e:
+            return e.status, 'application/json', json.dumps({'error': str(e)}).encode(), None
+        except Exception:
+            logger.exception("Error answering %s", target)
+            return 500, 'application/json', b'{"error":"internal error"}', None
+        self.cache.put(key, content_type, body)
+        return 200, content_type, body, 'miss'
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                start = time.perf_counter()
+                parts = request_line.decode('latin-1').split()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                if len(parts) != 3:
+                    status, content_type, body, cache_status = 400, 'application/json', b'{"error":"bad request"}', None
+                    keep_alive = False
+                elif parts[0] != 'GET':
+                    status, content_type, body, cache_status = 405, 'application/json', b'{"error":"GET only"}', None
+                else:
+                    status, content_type, body, cache_status = await self.respond(parts[1])
+
+                head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                        f"Content-Type: {content_type}",
+                        f"Content-Length: {len(body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if cache_status is not None:
+                    head.append(f"X-Cache: {cache_status}")
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+                await writer.drain()
+                self.requests += 1
+                self.latencies.append(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+def serve(plants, host='127.0.0.1', port=8000, cache_bytes=DEFAULT_CACHE_BYTES):
+    """Loads the plants into a PlantService and serves it until interrupted."""
+    started = time.perf_counter()
+    server = PlantServer(PlantService(plants), cache_bytes)
+    logger.info("Indexed %d plants in %.2fs.", len(server.service.store), time.perf_counter() - started)
+
+    async def run():
+        bound_host, bound_port = await server.start(host, port)
+        logger.info("Serving on http://%s:%d (endpoints: /density, /plants, /tiles/{z}/{x}/{y}.geojson, /stats)",
+                    bound_host, bound_port)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("Server stopped.")
@@ -0,0 +1,153 @@
+import numpy as np
+import os
+import pandas as pd
+import shapely
+from scipy.spatial import cKDTree
+
+from src.pipeline import CACHE_DIRECTORY
+
+# Mean Earth radius in kilometers, used for great-circle distances.
+EARTH_RADIUS_KM = 6371.0088
+
+# Default location of the persisted index, next to the processed data cache.
+INDEX_PATH = os.path.join(CACHE_DIRECTORY, 'plant_index.npz')
+
+def lonlat_to_unit_vectors(lon, lat):
+    """Converts lon/lat in degrees to 3D unit vectors on the sphere."""
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+def km_to_chord(distance_km):
+    """Converts a great-circle distance to the straight-line distance between unit vectors."""
+    return 2.0 * np.sin(np.asarray(distance_km, dtype=np.float64) / (2.0 * EARTH_RADIUS_KM))
+
+def chord_to_km(chord):
+    """Converts a straight-line distance between unit vectors to a great-circle distance."""
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord, dtype=np.float64) / 2.0, 0.0, 1.0))
+
+class PlantIndex:
+    """Spatial index over processed power plants for batched kNN, radius and bbox queries.
+
+    Plants are indexed as 3D unit vectors in a KD-tree, so Euclidean nearest
+    neighbors are exact great-circle nearest neighbors. Trees for a primsource
+    filter are built on first use and reused. Query results refer to plants by
+    their position in the index; use plant_code[...] to map them back.
+    """
+
+    def __init__(self, longitude, latitude, plant_code=None, primsource=None):
+        self.longitude = np.asarray(longitude, dtype=np.float64)
+        self.latitude = np.asarray(latitude, dtype=np.float64)
+        n = len(self.longitude)
+        self.plant_code = np.arange(n) if plant_code is None else np.asarray(plant_code)
+        if primsource is None:
+            primsource = np.full(n, 'Unknown')
+        source = pd.Categorical(primsource)
+        self.source_codes = source.codes.astype(np.int32)
+        self.source_names = np.asarray(source.categories, dtype=str)
+        self._trees = {}
+        self._strtree = None
+
+    @classmethod
+    def from_geodataframe(cls, gdf):
+        """Builds an index from the output of process_power_plants_data."""
+        valid = gdf['longitude'].notna().to_numpy() & gdf['latitude'].notna().to_numpy()
+        gdf = gdf[valid]
+        return cls(
+            gdf['longitude'].to_numpy(),
+            gdf['latitude'].to_numpy(),
+            gdf['plant_code'].to_numpy() if 'plant_code' in gdf.columns else None,
+            gdf['primsource'] if 'primsource' in gdf.columns else None,
+        )
+
+    def __len__(self):
+        return len(self.longitude)
+
+    def _rows_for_sources(self, primsource):
+        """Returns the index rows matching a primsource (or list of them), or None for all rows."""
+        if primsource is None:
+            return None
+        sources = [primsource] if isinstance(primsource, str) else list(primsource)
+        codes = np.flatnonzero(np.isin(self.source_names, sources))
+        return np.flatnonzero(np.isin(self.source_codes, codes))
+
+    def _tree(self, primsource=None):
+        """Returns the KD-tree and index rows for a primsource filter, building it once."""
+        key = primsource if primsource is None or isinstance(primsource, str) else tuple(sorted(primsource))
+        if key not in self._trees:
+            rows = self._rows_for_sources(primsource)
+            if rows is None:
+                points = lonlat_to_unit_vectors(self.longitude, self.latitude)
+            else:
+                points = lonlat_to_unit_vectors(self.longitude[rows], self.latitude[rows])
+            self._trees[key] = (cKDTree(points), rows)
+        return self._trees[key]
+
+    def knn(self, lon, lat, k=5, primsource=None):
+        """Finds the k nearest plants to each query point.
+
+        Returns (distances_km, indices), both shaped (n_queries, k). Missing
+        neighbors (fewer than k matching plants) have index -1 and distance NaN.
+        """
+        tree, rows = self._tree(primsource)
+        chord, idx = tree.query(lonlat_to_unit_vectors(lon, lat), k=k)
+        chord, idx = chord.reshape(-1, k), idx.reshape(-1, k)
+        missing = idx >= tree.n
+        idx = np.where(missing, 0, idx)
+        if rows is not None and len(rows):
+            idx = rows[idx]
+        distances = np.where(missing, np.nan, chord_to_km(np.where(missing, 0.0, chord)))
+        return distances, np.where(missing, -1, idx)
+
+    def radius(self, lon, lat, radius_km, primsource=None):
+        """Finds all plants within radius_km of each query point.
+
+        Returns flat (query_indices, plant_indices, distances_km) arrays with one
+        entry per match, sorted by query.
+        """
+        tree, rows = self._tree(primsource)
+        queries = lonlat_to_unit_vectors(lon, lat)
+        matches = tree.query_ball_point(queries, r=km_to_chord(radius_km))
+        lengths = np.fromiter((len(m) for m in matches), dtype=np.int64, count=len(matches))
+        query_idx = np.repeat(np.arange(len(matches)), lengths)
+        plant_idx = np.fromiter((i for m in matches for i in m), dtype=np.int64, count=int(lengths.sum()))
+        chord = np.linalg.norm(tree.data[plant_idx] - queries[query_idx], axis=1)
+        if rows is not None:
+            plant_idx = rows[plant_idx]
+        return query_idx, plant_idx, chord_to_km(chord)
+
+    def bbox(self, boxes, primsource=None):
+        """Finds all plants inside each (minx, miny, maxx, maxy) box in degrees.
+
+        Returns flat (box_indices, plant_indices) arrays with one entry per match.
+        """
+        if self._strtree is None:
+            self._strtree = shapely.STRtree(shapely.points(self.longitude, self.latitude))
+        boxes = np.atleast_2d(np.asarray(boxes, dtype=np.float64))
+        box_idx, plant_idx = self._strtree.query(shapely.box(*boxes.T), predicate='intersects')
+        rows = self._rows_for_sources(primsource)
+        if rows is not None:
+            keep = np.isin(plant_idx, rows)
+            box_idx, plant_idx = box_idx[keep], plant_idx[keep]
+        return box_idx, plant_idx
+
+    def save(self, path=INDEX_PATH):
+        """Persists the indexed arrays; the trees are rebuilt on demand after loading."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, longitude=self.longitude, latitude=self.latitude, plant_code=self.plant_code,
+                 source_codes=self.source_codes, source_names=self.source_names)
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        """Loads an index written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            index = cls.__new__(cls)
+            index.longitude = data['longitude']
+            index.latitude = data['latitude']
+            index.plant_code = data['plant_code']
+            index.source_codes = data['source_codes']
+            index.source_names = data['source_names']
+        index._trees = {}
+        index._strtree = None
+        return index
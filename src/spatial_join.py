@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import shapely
+
+from src.analysis import aggregate_power_plants
+from src.data_ingestion import load_local_geojson
+from src.data_processing import standardize_column_name
+from src.instrumentation import instrument
+from src.parallel import partition_row_ranges
+from src.pipeline import CACHE_DIRECTORY, fingerprint_source
+from src.plant_store import PlantStore
+
+logger = logging.getLogger(__name__)
+
+# Stored plant -> polygon assignments, next to the processed data cache.
+JOIN_CACHE_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'joins')
+
+# Bump when the stored assignments change so existing ones are recomputed.
+JOIN_FORMAT_VERSION = 1
+
+# Points tested against the tree per vectorized query; bounds the temporary point geometries.
+DEFAULT_BATCH_SIZE = 100_000
+
+class PolygonIndex:
+    """STRtree over a polygon layer for bulk point-in-polygon assignment.
+
+    The tree and the prepared polygons are built once; assign() then looks up
+    whole coordinate arrays in vectorized batches: bounding-box candidates
+    from the tree, then one point-in-polygon test over all candidates. Several polygons may share
+    one id (e.g. a zone stored as separate parts), so results are id codes:
+    positions in `ids`, or -1 for points outside every polygon.
+    """
+
+    def __init__(self, geometries, ids):
+        self.geometries = np.asarray(geometries, dtype=object)
+        codes, uniques = pd.factorize(pd.Index(ids), sort=True)
+        self.polygon_codes = codes.astype(np.int32)
+        self.ids = pd.Index(uniques)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def from_geodataframe(cls, polygons, id_column=None):
+        """Builds an index from a polygon GeoDataFrame, in EPSG:4326 like the processed plants.
+
+        Polygons are identified by `id_column`, or by the frame's index without one.
+        """
+        if polygons.crs is None:
+            logger.warning("Polygon layer has no CRS; assuming longitude/latitude (EPSG:4326).")
+        elif polygons.crs.to_epsg() != 4326:
+            polygons = polygons.to_crs('EPSG:4326')
+        valid = ~(polygons.geometry.isna() | polygons.geometry.is_empty).to_numpy()
+        ids = polygons.index if id_column is None else polygons[id_column]
+        return cls(polygons.geometry.array[valid], np.asarray(ids)[valid])
+
+    @classmethod
+    def from_file(cls, file_path, id_column=None, where=None):
+        """Loads a polygon layer (GeoJSON, shapefile, GeoPackage...) and indexes it.
+
+        Only `id_column` is read from the attributes; `where` is an OGR SQL filter
+        as in load_local_geojson.
+        """
+        polygons = load_local_geojson(file_path, columns=[id_column] if id_column else [], where=where)
+        if polygons is None:
+            return None
+        if id_column is not None:
+            matches = [col for col in polygons.columns
+                       if standardize_column_name(col) == standardize_column_name(id_column)]
+            if not matches:
+                raise ValueError(f"Column '{id_column}' not found in {file_path}")
+            id_column = matches[0]
+        return cls.from_geodataframe(polygons, id_column)
+
+    def __len__(self):
+        return len(self.geometries)
+
+    def __reduce__(self):
+        # Workers receive the polygons as WKB and rebuild the tree, which can't be pickled directly.
+        return (_index_from_wkb, (shapely.to_wkb(self.geometries), self.ids[self.polygon_codes]))
+
+    def assign(self, lon, lat, batch_size=DEFAULT_BATCH_SIZE):
+        """Returns the id code of the polygon containing each point, or -1 for none.
+
+        Points on a shared border or inside overlapping polygons get the first
+        polygon of the layer that contains them.
+        """
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        result = np.full(len(lon), -1, dtype=np.int32)
+        no_polygon = len(self.geometries)
+        for start in range(0, len(lon), batch_size):
+            stop = min(start + batch_size, len(lon))
+            batch_lon, batch_lat = lon[start:stop], lat[start:stop]
+            # Find bounding-box candidates in the tree, then test them all in one vectorized
+            # call on the prepared polygons, which is several times faster than a tree
+            # query with predicate='intersects'.
+            point_idx, polygon_idx = self.tree.query(shapely.points(batch_lon, batch_lat))
+            hit = shapely.intersects_xy(self.geometries[polygon_idx], batch_lon[point_idx], batch_lat[point_idx])
+            point_idx, polygon_idx = point_idx[hit], polygon_idx[hit]
+            first = np.full(stop - start, no_polygon, dtype=np.int64)
+            np.minimum.at(first, point_idx, polygon_idx)
+            found = first < no_polygon
+            result[start:stop][found] = self.polygon_codes[first[found]]
+        return result
+
+def _index_from_wkb(wkb, ids):
+    return PolygonIndex(shapely.from_wkb(wkb), ids)
+
+def _assign_chunk(index, lon, lat, batch_size):
+    return index.assign(lon, lat, batch_size)
+
+def plant_coordinates(plants):
+    """Returns the longitude and latitude arrays of a processed GeoDataFrame or PlantStore."""
+    if isinstance(plants, PlantStore):
+        return plants.arrays['longitude'], plants.arrays['latitude']
+    return plants['longitude'].to_numpy(dtype=np.float64), plants['latitude'].to_numpy(dtype=np.float64)
+
+def assign_polygons(index, lon, lat, workers=1, batch_size=DEFAULT_BATCH_SIZE):
+    """Assigns points to the polygons of an index, in contiguous chunks across `workers` processes."""
+    workers = max(1, min(workers, -(-len(lon) // batch_size)))
+    if workers == 1:
+        return index.assign(lon, lat, batch_size)
+    ranges = partition_row_ranges(len(lon), workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunks = pool.map(_assign_chunk, [index] * len(ranges),
+                          [lon[start:stop] for start, stop in ranges],
+                          [lat[start:stop] for start, stop in ranges],
+                          [batch_size] * len(ranges))
+        return np.concatenate(list(chunks))
+
+def _join_cache_path(polygon_path, id_column, where, lon, lat, cache_dir):
+    """Returns the path of the stored assignment for a polygon layer and a set of plant coordinates."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([JOIN_FORMAT_VERSION, fingerprint_source(polygon_path), id_column, where]).encode())
+    digest.update(np.ascontiguousarray(lon, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(lat, dtype=np.float64).tobytes())
+    base_name = os.path.splitext(os.path.basename(polygon_path))[0]
+    return os.path.join(cache_dir, f"{base_name}-{digest.hexdigest()[:16]}.npz")
+
+@instrument
+def spatial_join_power_plants(plants, polygon_path, id_column=None, where=None, name=None,
+                              cache_dir=JOIN_CACHE_DIRECTORY, workers=1, batch_size=DEFAULT_BATCH_SIZE,
+                              rebuild=False):
+    """Attributes every plant to the polygon of a layer file that contains it.
+
+    `plants` is a processed GeoDataFrame or a PlantStore. Returns a categorical
+    Series of polygon ids (missing for plants outside the layer) aligned with
+    the plants and named `name` (by default the layer's file name). The
+    assignment is stored in cache_dir under a key of the layer file's
+    fingerprint and the plant coordinates, so later joins only load it.
+    """
+    name = name or os.path.splitext(os.path.basename(polygon_path))[0]
+    lon, lat = plant_coordinates(plants)
+    cache_path = _join_cache_path(polygon_path, id_column, where, lon, lat, cache_dir)
+
+    if not rebuild and os.path.exists(cache_path):
+        logger.info("Loading plant assignment to '%s' from %s", name, cache_path)
+        with np.load(cache_path, allow_pickle=False) as data:
+            codes, ids = data['codes'], data['ids']
+    else:
+        logger.info("Joining %d plants to polygon layer %s...", len(lon), polygon_path)
+        index = PolygonIndex.from_file(polygon_path, id_column, where)
+        if index is None:
+            return None
+        codes = assign_polygons(index, lon, lat, workers, batch_size)
+        ids = index.ids.to_numpy()
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + '.tmp.npz'
+        np.savez(tmp_path, codes=codes, ids=ids)
+        os.replace(tmp_path, cache_path)
+        logger.info("Assigned %d of %d plants to %d polygons.", int((codes >= 0).sum()), len(codes), len(index))
+
+    values = pd.Categorical.from_codes(codes, categories=pd.Index(ids))
+    return pd.Series(values, index=None if isinstance(plants, PlantStore) else plants.index, name=name)
+
+def aggregate_by_polygon(plants, assignment, by=()):
+    """Aggregates plants per polygon of a spatial_join_power_plants assignment.
+
+    The assignment becomes one more categorical group key, so this costs the same
+    as aggregate_power_plants by state: plant_count and the capacity metrics per
+    polygon, optionally split further by the columns in `by` (e.g. 'primsource').
+    Plants outside every polygon are left out.
+    """
+    extra = [by] if isinstance(by, str) else list(by)
+    columns = [col for col in plants.columns if col in extra or col.endswith('_mw')]
+    frame = plants.to_frame(columns) if isinstance(plants, PlantStore) else pd.DataFrame(plants[columns])
+    frame[assignment.name] = assignment.array
+    return aggregate_power_plants(frame, by=[assignment.name] + extra)
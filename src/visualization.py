@@ -1,66 +1,514 @@
-import matplotlib.pyplot as plt
-import folium
+import matplotlib
+import json
+import logging
+import numpy as np
 import pandas as pd
 import os
-import matplotlib.cm as cm
 import matplotlib.colors as colors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
 
+from src.charts import density_chart_spec, render_bar_charts
+from src.density import DEFAULT_BANDWIDTH_KM, hexagon_vertices, kernel_density_surface
+from src.map_tiles import (build_cluster_levels, encode_base64, encode_cluster_chunk, encode_typed_array,
+                           mercator_fractions, write_cluster_tiles, write_json)
+from src.instrumentation import instrument
+from src.plant_store import PlantStore
+
+logger = logging.getLogger(__name__)
+
+@instrument
 def plot_power_plant_density(density_df, output_path='reports/power_plant_density.png'):
-    """Creates a bar chart showing the number of power plants per state."""
-    print("Generating power plant density bar chart...")
+    """Creates a bar chart showing the number of power plants per state.
+
+    The format follows the extension of output_path (e.g. .png or .svg). Use
+    src.charts.render_bar_charts to render many charts in one call.
+    """
+    logger.info("Generating power plant density bar chart...")
     if density_df is not None and not density_df.empty:
-        # Sort the data for a cleaner presentation.
-        density_df = density_df.sort_values(by='plant_count', ascending=False)
-        
-        plt.figure(figsize=(12, 6))
-        plt.bar(density_df['state'], density_df['plant_count'])
-        plt.xlabel('State')
-        plt.ylabel('Number of Power Plants')
-        plt.title('Number of Power Plants by State')
-        plt.xticks(rotation=90)
-        plt.tight_layout()
-        
-        # Make sure the output directory exists.
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        plt.savefig(output_path)
-        print(f"Power plant density bar chart saved to {output_path}")
+        render_bar_charts([density_chart_spec(density_df, output_path)])
+        logger.info("Power plant density bar chart saved to %s", output_path)
     else:
-        print("No data to plot for power plant density.")
+        logger.warning("No data to plot for power plant density.")
 
-def create_power_plant_map(gdf, output_path='reports/power_plants_map.html'):
-    """Creates an interactive map of power plants with different layers."""
-    print(f"Creating combined interactive map of power plant locations...")
-    if gdf is None or gdf.empty:
-        print("No data to create power plant map.")
+@instrument
+def plot_density_heatmap(grid, column=None, output_path='reports/power_plant_heatmap.png'):
+    """Renders a DensityGrid from src.density as a heatmap of plant counts or summed capacity."""
+    logger.info("Generating power plant density heatmap...")
+    if grid is None or len(grid) == 0:
+        logger.warning("No data to plot for the density heatmap.")
         return
 
-    center_lat = gdf['latitude'].mean()
-    center_lon = gdf['longitude'].mean()
-    m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
+    label = 'Number of Power Plants' if column is None else f'{column} (MW)'
+    fig = Figure(figsize=(12, 7))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    if grid.kind == 'square':
+        raster, extent = grid.to_raster(column)
+        image = ax.imshow(np.ma.masked_equal(raster, 0), extent=extent, origin='lower', cmap='YlOrRd')
+    else:
+        cells = PolyCollection(hexagon_vertices(grid), array=grid.values(column), cmap='YlOrRd')
+        image = ax.add_collection(cells)
+        ax.autoscale_view()
+    fig.colorbar(image, ax=ax, label=label)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    ax.set_title(f'Power Plant Density ({grid.kind} grid, {grid.resolution:g}\u00b0 cells)')
+    ax.set_aspect('equal')
+    fig.tight_layout()
 
-    # --- Layers ---
-    default_fg = folium.FeatureGroup(name='All Plants', show=True).add_to(m)
-    type_fg = folium.FeatureGroup(name='By Type', show=False).add_to(m)
-    capacity_fg = folium.FeatureGroup(name='By Capacity', show=False).add_to(m)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fig.savefig(output_path)
+    fig.clear()
+    logger.info("Power plant density heatmap saved to %s", output_path)
+
+# Columns read by create_power_plant_map.
+MAP_COLUMNS = ['plant_name', 'primsource', 'total_mw', 'latitude', 'longitude']
+
+# Number of colors in the capacity gradient; the last code is reserved for missing capacities.
+CAPACITY_BINS = 255
+MISSING_CODE = 255
+
+# Client-side canvas layer. Plants (and, optionally, per-zoom clusters) are embedded once
+# as typed-array chunks, or fetched on demand from static tiles, and drawn on a single
+# canvas. The empty folium layers only drive the layer control, which switches the color mode.
+CANVAS_LAYER_JS = """
+<script>
+document.addEventListener('DOMContentLoaded', function() {
+    const map = window['__MAP_ID__'];
+    const data = __PAYLOAD__;
+    const layerVars = __LAYER_VARS__;
+    if (!map) return;
+
+    function decode(b64, ArrayType) {
+        const bytes = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+        return new ArrayType(bytes.buffer);
+    }
+
+    // Web Mercator coordinates in [0, 1], computed once per chunk for all zoom levels.
+    function project(chunk) {
+        const n = chunk.lat.length;
+        chunk.n = n;
+        chunk.mx = new Float64Array(n);
+        chunk.my = new Float64Array(n);
+        for (let i = 0; i < n; i++) {
+            chunk.mx[i] = (chunk.lon[i] + 180) / 360;
+            const s = Math.sin(chunk.lat[i] * Math.PI / 180);
+            chunk.my[i] = 0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI);
+        }
+        return chunk;
+    }
+
+    // Group point indices by color code, so each color is filled in a single path.
+    function makeMode(codes, palette) {
+        const n = codes.length, numCodes = palette.length;
+        const starts = new Int32Array(numCodes + 1);
+        for (let i = 0; i < n; i++) if (codes[i] < numCodes) starts[codes[i] + 1]++;
+        for (let c = 0; c < numCodes; c++) starts[c + 1] += starts[c];
+        const order = new Uint32Array(starts[numCodes]);
+        const next = starts.slice(0, numCodes);
+        for (let i = 0; i < n; i++) if (codes[i] < numCodes) order[next[codes[i]]++] = i;
+        return {codes: codes, palette: palette, order: order, starts: starts};
+    }
+
+    function preparePoints(raw) {
+        const chunk = project({
+            lat: decode(raw.lat, Float32Array), lon: decode(raw.lon, Float32Array),
+            mw: decode(raw.mw, Float32Array), typeCodes: decode(raw.type, Uint8Array),
+            capacityCodes: decode(raw.capacity, Uint8Array), names: raw.names,
+        });
+        chunk.modes = {
+            'All Plants': makeMode(new Uint8Array(chunk.n), ['blue']),
+            'By Type': makeMode(chunk.typeCodes, data.typePalette),
+            'By Capacity': makeMode(chunk.capacityCodes, data.capacityPalette),
+        };
+        return chunk;
+    }
+
+    function prepareClusters(raw) {
+        const chunk = project({
+            lat: decode(raw.lat, Float32Array), lon: decode(raw.lon, Float32Array),
+            count: decode(raw.count, Uint32Array), mw: decode(raw.mw, Float32Array),
+        });
+        chunk.radius = new Float32Array(chunk.n);
+        for (let i = 0; i < chunk.n; i++) chunk.radius[i] = chunk.count[i] > 1 ? 6 + 4 * Math.log10(chunk.count[i]) : 3;
+        return chunk;
+    }
+
+    const inlinePoints = data.points ? preparePoints(data.points) : null;
+    const inlineClusters = {};
+    for (const z in (data.clusters || {})) inlineClusters[z] = prepareClusters(data.clusters[z]);
+
+    // Static tiles are fetched on demand, once, and cached by key.
+    const tileIndex = {};
+    for (const level in (data.tileIndex || {})) tileIndex[level] = new Set(data.tileIndex[level]);
+    const tiles = {};
+    function tiledChunks(kind, level, prepare) {
+        const scale = 256 * Math.pow(2, map.getZoom()), bounds = map.getPixelBounds(), n = Math.pow(2, level);
+        const clamp = v => Math.min(n - 1, Math.max(0, Math.floor(v / scale * n)));
+        const available = tileIndex[kind + '/' + level] || new Set();
+        const chunks = [];
+        for (let x = clamp(bounds.min.x); x <= clamp(bounds.max.x); x++) {
+            for (let y = clamp(bounds.min.y); y <= clamp(bounds.max.y); y++) {
+                if (!available.has(x + '/' + y)) continue;
+                const key = kind + '/' + level + '/' + x + '/' + y;
+                if (!(key in tiles)) {
+                    tiles[key] = null;
+                    fetch(data.tileUrl + '/' + key + '.json')
+                        .then(response => response.json())
+                        .then(raw => { tiles[key] = prepare(raw); layer.redraw(); });
+                }
+                if (tiles[key]) chunks.push(tiles[key]);
+            }
+        }
+        return chunks;
+    }
+
+    // Clusters up to maxClusterZoom, individual plants above it.
+    function currentContent() {
+        const zoom = Math.round(map.getZoom());
+        if (data.maxClusterZoom !== null && zoom <= data.maxClusterZoom) {
+            const chunks = data.tileUrl ? tiledChunks('clusters', zoom, prepareClusters)
+                                        : (inlineClusters[zoom] ? [inlineClusters[zoom]] : []);
+            return {clusters: true, chunks: chunks};
+        }
+        const chunks = data.tileUrl ? tiledChunks('points', data.pointZoom, preparePoints)
+                                    : (inlinePoints ? [inlinePoints] : []);
+        return {clusters: false, chunks: chunks};
+    }
+
+    function activeModeName() {
+        for (const name in layerVars) {
+            const layer = window[layerVars[name]];
+            if (layer && map.hasLayer(layer)) return name;
+        }
+        return null;
+    }
+
+    const radius = 3;
+    function drawPoints(ctx, chunks, modeName, scale, origin, size) {
+        for (const chunk of chunks) {
+            const mode = chunk.modes[modeName];
+            for (let c = 0; c < mode.palette.length; c++) {
+                ctx.beginPath();
+                for (let k = mode.starts[c]; k < mode.starts[c + 1]; k++) {
+                    const i = mode.order[k];
+                    const x = chunk.mx[i] * scale - origin.x, y = chunk.my[i] * scale - origin.y;
+                    if (x < -radius || y < -radius || x > size.x + radius || y > size.y + radius) continue;
+                    ctx.moveTo(x + radius, y);
+                    ctx.arc(x, y, radius, 0, 2 * Math.PI);
+                }
+                ctx.fillStyle = ctx.strokeStyle = mode.palette[c];
+                ctx.globalAlpha = 0.7;
+                ctx.fill();
+                ctx.globalAlpha = 1.0;
+                ctx.stroke();
+            }
+        }
+    }
+
+    function drawClusters(ctx, chunks, scale, origin, size) {
+        ctx.font = 'bold 10px sans-serif';
+        ctx.textAlign = 'center';
+        ctx.textBaseline = 'middle';
+        for (const chunk of chunks) {
+            for (let i = 0; i < chunk.n; i++) {
+                const x = chunk.mx[i] * scale - origin.x, y = chunk.my[i] * scale - origin.y, r = chunk.radius[i];
+                if (x < -r || y < -r || x > size.x + r || y > size.y + r) continue;
+                ctx.beginPath();
+                ctx.arc(x, y, r, 0, 2 * Math.PI);
+                ctx.fillStyle = 'rgba(255, 140, 0, 0.6)';
+                ctx.fill();
+                ctx.strokeStyle = 'rgb(204, 85, 0)';
+                ctx.stroke();
+                if (chunk.count[i] > 1) {
+                    ctx.fillStyle = 'black';
+                    ctx.fillText(String(chunk.count[i]), x, y);
+                }
+            }
+        }
+    }
+
+    const CanvasLayer = L.Layer.extend({
+        onAdd: function(map) {
+            this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+            this._canvas.style.pointerEvents = 'none';
+            map.getPanes().overlayPane.appendChild(this._canvas);
+            map.on('moveend zoomend resize overlayadd overlayremove', this.redraw, this);
+            this.redraw();
+        },
+        onRemove: function(map) {
+            L.DomUtil.remove(this._canvas);
+            map.off('moveend zoomend resize overlayadd overlayremove', this.redraw, this);
+        },
+        redraw: function() {
+            const canvas = this._canvas, size = map.getSize(), ratio = window.devicePixelRatio || 1;
+            L.DomUtil.setPosition(canvas, map.containerPointToLayerPoint([0, 0]));
+            canvas.width = size.x * ratio;
+            canvas.height = size.y * ratio;
+            canvas.style.width = size.x + 'px';
+            canvas.style.height = size.y + 'px';
+            const ctx = canvas.getContext('2d');
+            ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+            ctx.clearRect(0, 0, size.x, size.y);
+
+            const modeName = activeModeName();
+            if (!modeName) return;
+            const scale = 256 * Math.pow(2, map.getZoom());
+            const origin = map.getPixelBounds().min;
+            const content = currentContent();
+            if (content.clusters) drawClusters(ctx, content.chunks, scale, origin, size);
+            else drawPoints(ctx, content.chunks, modeName, scale, origin, size);
+        }
+    });
+    const layer = new CanvasLayer().addTo(map);
+
+    function escapeHtml(text) {
+        const div = document.createElement('div');
+        div.textContent = text;
+        return div.innerHTML;
+    }
+
+    // Popups: find the nearest drawn plant or cluster to the click, in screen pixels.
+    map.on('click', function(e) {
+        const modeName = activeModeName();
+        if (!modeName) return;
+        const scale = 256 * Math.pow(2, map.getZoom());
+        const origin = map.getPixelBounds().min;
+        const px = e.containerPoint.x + origin.x, py = e.containerPoint.y + origin.y;
+        const content = currentContent();
+        let best = null, bestIndex = -1, bestDist = Infinity;
+        for (const chunk of content.chunks) {
+            const mode = content.clusters ? null : chunk.modes[modeName];
+            for (let i = 0; i < chunk.n; i++) {
+                if (mode && mode.codes[i] >= mode.palette.length) continue;
+                const r = (content.clusters ? chunk.radius[i] : radius) + 2;
+                const dx = chunk.mx[i] * scale - px, dy = chunk.my[i] * scale - py;
+                const dist = dx * dx + dy * dy;
+                if (dist <= r * r && dist < bestDist) { best = chunk; bestIndex = i; bestDist = dist; }
+            }
+        }
+        if (!best) return;
+        let html;
+        if (content.clusters) {
+            html = '<b>' + best.count[bestIndex] + ' plants</b><br>Total capacity: ' +
+                Number(best.mw[bestIndex].toFixed(2)) + ' MW';
+        } else {
+            const code = best.typeCodes[bestIndex];
+            const type = code < data.typeNames.length ? data.typeNames[code] : 'Unknown';
+            html = '<b>' + escapeHtml(best.names[bestIndex]) + '</b><br>Type: ' + escapeHtml(type) +
+                '<br>Capacity: ' + Number(best.mw[bestIndex].toFixed(2)) + ' MW';
+        }
+        L.popup().setLatLng([best.lat[bestIndex], best.lon[bestIndex]]).setContent(html).openOn(map);
+    });
+});
+</script>
+"""
+
+def get_type_colors(gdf):
+    """Maps each primary source to a hex color, sorted alphabetically with 'other' last."""
+    if 'primsource' not in gdf.columns:
+        return {}
+    present_types = set(gdf['primsource'].dropna().unique())
+    unique_types = sorted(t for t in present_types if t != 'other')
+    if 'other' in present_types:
+        unique_types.append('other')
+    if not unique_types:
+        return {}
+    type_colormap = matplotlib.colormaps['tab20'].resampled(len(unique_types))
+    return {typ: colors.to_hex(type_colormap(i)) for i, typ in enumerate(unique_types)}
+
+def get_capacity_codes(total_mw, min_capacity, max_capacity, num_bins=CAPACITY_BINS):
+    """Bins capacities into color codes 0..num_bins-1 on a linear scale, vectorized.
+
+    Missing capacities get MISSING_CODE.
+    """
+    values = np.asarray(total_mw, dtype=np.float64)
+    span = max_capacity - min_capacity
+    scaled = (values - min_capacity) / span if span > 0 else np.zeros_like(values)
+    codes = np.clip(np.floor(scaled * num_bins), 0, num_bins - 1)
+    return np.where(np.isnan(values), MISSING_CODE, codes).astype(np.uint8)
+
+def get_capacity_palette(num_bins=CAPACITY_BINS):
+    """Returns the hex colors of the capacity codes from get_capacity_codes, low to high."""
+    capacity_colormap = matplotlib.colormaps['YlOrRd'].resampled(num_bins)
+    return [colors.to_hex(c) for c in capacity_colormap(np.arange(num_bins))]
+
+def build_point_chunk(gdf, type_names, min_capacity, max_capacity):
+    """Encodes individual plants as compact typed arrays for the canvas layer."""
+    valid = gdf['latitude'].notna().to_numpy() & gdf['longitude'].notna().to_numpy()
+    gdf = gdf[valid]
 
-    # --- Populate Layers ---
-    type_to_hex_color = {}
     if 'primsource' in gdf.columns:
-        # Sort the types alphabetically, but keep 'other' at the end.
-        unique_types = sorted([t for t in gdf['primsource'].dropna().unique() if t != 'other'])
-        if 'other' in gdf['primsource'].dropna().unique():
-            unique_types.append('other')
-        type_colormap = cm.get_cmap('tab20', len(unique_types))
-        type_to_hex_color = {typ: colors.to_hex(type_colormap(i)) for i, typ in enumerate(unique_types)}
+        type_codes = pd.Categorical(gdf['primsource'], categories=type_names).codes
+        type_codes = np.where(type_codes < 0, MISSING_CODE, type_codes)
+    else:
+        type_codes = np.full(len(gdf), MISSING_CODE)
+
+    total_mw = gdf['total_mw'].to_numpy(dtype=np.float64, na_value=np.nan)
+    return {
+        'lat': encode_typed_array(gdf['latitude'], np.float32),
+        'lon': encode_typed_array(gdf['longitude'], np.float32),
+        'mw': encode_typed_array(total_mw, np.float32),
+        'type': encode_typed_array(type_codes, np.uint8),
+        'capacity': encode_typed_array(get_capacity_codes(total_mw, min_capacity, max_capacity), np.uint8),
+        'names': gdf['plant_name'].astype(str).tolist() if 'plant_name' in gdf.columns else [''] * len(gdf),
+    }
+
+# Written next to the tiles: the settings and color scales they were encoded with, and the tile index.
+TILE_STATE_NAME = 'state.json'
+
+def _tile_keys(lon, lat, zoom):
+    """Returns the packed (x, y) key of the zoom-level tile containing each point."""
+    x, y = mercator_fractions(lon, lat)
+    n = 1 << zoom
+    return (np.floor(x * n).astype(np.int64) << 32) | np.floor(y * n).astype(np.int64)
+
+def _write_point_tiles(gdf, tiles_dir, point_zoom, type_names, min_capacity, max_capacity):
+    """Writes the plants as points/{point_zoom}/{x}/{y}.json tiles; returns the 'x/y' keys written."""
+    keys = _tile_keys(gdf['longitude'], gdf['latitude'], point_zoom)
+    written = []
+    for key, tile in gdf.groupby(keys, sort=False):
+        tx, ty = key >> 32, key & 0xFFFFFFFF
+        write_json(os.path.join(tiles_dir, 'points', str(point_zoom), str(tx), f"{ty}.json"),
+                   build_point_chunk(tile, type_names, min_capacity, max_capacity))
+        written.append(f"{tx}/{ty}")
+    return written
+
+def _tile_state(type_names, min_capacity, max_capacity, max_cluster_zoom, cell_pixels, tile_index):
+    return {
+        'typeNames': [str(typ) for typ in type_names],
+        'minCapacity': float(min_capacity),
+        'maxCapacity': float(max_capacity),
+        'maxClusterZoom': max_cluster_zoom,
+        'cellPixels': cell_pixels,
+        'tileIndex': tile_index,
+    }
 
+def write_map_tiles(gdf, tiles_dir, type_names, min_capacity, max_capacity, max_cluster_zoom=8, cell_pixels=64):
+    """Writes static cluster and plant tiles for the canvas layer under tiles_dir.
+
+    Clusters are written for zoom levels 0..max_cluster_zoom, and the individual
+    plants as points/{max_cluster_zoom + 1}/{x}/{y}.json tiles. Returns the tile index.
+    """
+    gdf = gdf[gdf['latitude'].notna() & gdf['longitude'].notna()]
+    levels = build_cluster_levels(gdf['longitude'], gdf['latitude'], gdf['total_mw'], max_cluster_zoom, cell_pixels)
+    tile_index = write_cluster_tiles(levels, tiles_dir, cell_pixels)
+
+    point_zoom = max_cluster_zoom + 1
+    tile_index[f"points/{point_zoom}"] = _write_point_tiles(gdf, tiles_dir, point_zoom, type_names,
+                                                           min_capacity, max_capacity)
+    write_json(os.path.join(tiles_dir, TILE_STATE_NAME),
+               _tile_state(type_names, min_capacity, max_capacity, max_cluster_zoom, cell_pixels, tile_index))
+    return tile_index
+
+def update_map_tiles(gdf, tiles_dir, lon, lat, max_cluster_zoom=8):
+    """Rewrites only the static tiles that contain the given coordinates.
+
+    `gdf` is the full, current set of plants and `lon`/`lat` the old and new
+    locations of the plants that changed. At every cluster zoom and at the point
+    zoom, only the tiles holding one of those locations are rebuilt from the plants
+    inside them, and tiles left empty are deleted. Returns the updated tile index,
+    or None when the tiles must be written in full: with no stored state, another
+    zoom setting, or a different type list or capacity range, which the color
+    codes of every tile depend on.
+    """
+    try:
+        with open(os.path.join(tiles_dir, TILE_STATE_NAME)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if state['maxClusterZoom'] != max_cluster_zoom:
+        return None
+    type_names = list(get_type_colors(gdf))
     min_capacity, max_capacity = gdf['total_mw'].min(), gdf['total_mw'].max()
-    capacity_colormap = cm.get_cmap('YlOrRd', 256)
+    gdf = gdf[gdf['latitude'].notna() & gdf['longitude'].notna()]
+    if _tile_state(type_names, min_capacity, max_capacity, max_cluster_zoom, state['cellPixels'],
+                   state['tileIndex']) != state:
+        return None
+
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    located = ~(np.isnan(lon) | np.isnan(lat))
+    lon, lat = lon[located], lat[located]
+    cell_pixels = state['cellPixels']
+    tile_index = {level: list(keys) for level, keys in state['tileIndex'].items()}
+    point_zoom = max_cluster_zoom + 1
+
+    for zoom in range(point_zoom + 1):
+        kind = 'points' if zoom == point_zoom else 'clusters'
+        affected = np.unique(_tile_keys(lon, lat, zoom))
+        inside = gdf[np.isin(_tile_keys(gdf['longitude'], gdf['latitude'], zoom), affected)]
+        if kind == 'points':
+            written = _write_point_tiles(inside, tiles_dir, zoom, type_names, min_capacity, max_capacity)
+        else:
+            level = build_cluster_levels(inside['longitude'], inside['latitude'], inside['total_mw'], zoom,
+                                         cell_pixels)[zoom] if len(inside) else None
+            written = write_cluster_tiles({zoom: level}, tiles_dir, cell_pixels)[f"clusters/{zoom}"] \
+                if level is not None else []
+
+        keys = tile_index.setdefault(f"{kind}/{zoom}", [])
+        for key in affected:
+            tile = f"{key >> 32}/{key & 0xFFFFFFFF}"
+            if tile not in written and tile in keys:
+                keys.remove(tile)
+                os.remove(os.path.join(tiles_dir, kind, str(zoom), f"{tile}.json"))
+        keys.extend(tile for tile in written if tile not in keys)
+
+    write_json(os.path.join(tiles_dir, TILE_STATE_NAME),
+               _tile_state(type_names, min_capacity, max_capacity, max_cluster_zoom, cell_pixels, tile_index))
+    return tile_index
+
+def build_map_payload(gdf, type_to_hex_color, min_capacity, max_capacity, cluster=False,
+                      max_cluster_zoom=8, tiles_dir=None, tiles_url=None, tile_index=None):
+    """Builds the payload rendered by the canvas layer.
+
+    By default every plant is embedded once. With cluster=True, per-zoom cluster
+    levels are embedded as well. With tiles_dir, clusters and plants are written as
+    static tiles instead (fetched from tiles_url), so the payload only holds the palettes.
+    Given the tile_index of tiles already in tiles_dir, nothing is written.
+    """
+    type_names = list(type_to_hex_color)
+    payload = {
+        'typeNames': [str(typ) for typ in type_names],
+        'typePalette': list(type_to_hex_color.values()),
+        'capacityPalette': get_capacity_palette(),
+        'points': None,
+        'clusters': None,
+        'maxClusterZoom': None,
+        'pointZoom': None,
+        'tileUrl': None,
+        'tileIndex': None,
+    }
+
+    if tiles_dir is not None:
+        if tile_index is None:
+            tile_index = write_map_tiles(gdf, tiles_dir, type_names, min_capacity, max_capacity, max_cluster_zoom)
+        payload['tileIndex'] = tile_index
+        payload['tileUrl'] = tiles_url
+        payload['maxClusterZoom'] = max_cluster_zoom
+        payload['pointZoom'] = max_cluster_zoom + 1
+        return payload
+
+    payload['points'] = build_point_chunk(gdf, type_names, min_capacity, max_capacity)
+    if cluster:
+        valid = gdf[gdf['latitude'].notna() & gdf['longitude'].notna()]
+        levels = build_cluster_levels(valid['longitude'], valid['latitude'], valid['total_mw'], max_cluster_zoom)
+        payload['clusters'] = {zoom: encode_cluster_chunk(level) for zoom, level in levels.items()}
+        payload['maxClusterZoom'] = max_cluster_zoom
+    return payload
+
+def _add_marker_layers(gdf, default_fg, type_fg, capacity_fg, type_to_hex_color, min_capacity, max_capacity):
+    """Adds one folium CircleMarker per plant and layer (the legacy 'markers' backend)."""
+    import folium
+    capacity_colormap = matplotlib.colormaps['YlOrRd'].resampled(256)
     normalize = colors.Normalize(vmin=min_capacity, vmax=max_capacity)
 
     for idx, row in gdf.iterrows():
         if pd.notnull(row['latitude']) and pd.notnull(row['longitude']):
             popup_html = f"<b>{row['plant_name']}</b><br>Type: {row['primsource']}<br>Capacity: {row['total_mw']} MW"
-            
+
             folium.CircleMarker(location=[row['latitude'], row['longitude']], radius=3, color='blue', fill=True, fill_color='blue', fill_opacity=0.7, popup=popup_html).add_to(default_fg)
 
             if 'primsource' in gdf.columns and row['primsource'] in type_to_hex_color:
@@ -71,17 +519,109 @@ def create_power_plant_map(gdf, output_path='reports/power_plants_map.html'):
                 capacity_color = colors.to_hex(capacity_colormap(normalize(row['total_mw'])))
                 folium.CircleMarker(location=[row['latitude'], row['longitude']], radius=3, color=capacity_color, fill=True, fill_color=capacity_color, fill_opacity=0.7, popup=popup_html).add_to(capacity_fg)
 
+def _add_density_overlays(m, surface, show_first=False):
+    """Adds each layer of a DensitySurface to the map as an embedded PNG image overlay."""
+    import folium
+
+    min_lon, min_lat, max_lon, max_lat = surface.bounds
+    for i, column in enumerate(surface.columns):
+        # The raster rows are already spaced in Web Mercator, so Leaflet can stretch it as is.
+        data_url = 'data:image/png;base64,' + encode_base64(surface.to_png(column))
+        name = 'Capacity Density' if column == 'total_mw' else f"Density: {column.removesuffix('_mw')}"
+        folium.raster_layers.ImageOverlay(image=data_url, bounds=[[min_lat, min_lon], [max_lat, max_lon]],
+                                          name=name, show=show_first and i == 0,
+                                          mercator_project=False).add_to(m)
+
+def _add_plant_layers(m, gdf, output_path, backend, cluster, max_cluster_zoom, tiles_dir, tile_index=None):
+    """Adds the All Plants / By Type / By Capacity layers and their legends to the map."""
+    import folium
+
+    # --- Layers ---
+    default_fg = folium.FeatureGroup(name='All Plants', show=True).add_to(m)
+    type_fg = folium.FeatureGroup(name='By Type', show=False).add_to(m)
+    capacity_fg = folium.FeatureGroup(name='By Capacity', show=False).add_to(m)
+
+    # --- Populate Layers ---
+    type_to_hex_color = get_type_colors(gdf)
+    min_capacity, max_capacity = gdf['total_mw'].min(), gdf['total_mw'].max()
+
+    if backend == 'canvas':
+        tiles_url = None
+        if tiles_dir is not None:
+            tiles_url = os.path.relpath(tiles_dir, os.path.dirname(os.path.abspath(output_path))).replace(os.sep, '/')
+        payload = build_map_payload(gdf, type_to_hex_color, min_capacity, max_capacity, cluster=cluster,
+                                    max_cluster_zoom=max_cluster_zoom, tiles_dir=tiles_dir, tiles_url=tiles_url,
+                                    tile_index=tile_index)
+        layer_vars = {fg.layer_name: fg.get_name() for fg in (default_fg, type_fg, capacity_fg)}
+        canvas_js = (
+            CANVAS_LAYER_JS
+            .replace('__MAP_ID__', m.get_name())
+            .replace('__LAYER_VARS__', json.dumps(layer_vars))
+            .replace('__PAYLOAD__', json.dumps(payload, separators=(',', ':')).replace('</', '<\\/'))
+        )
+        m.get_root().html.add_child(folium.Element(canvas_js))
+    else:
+        _add_marker_layers(gdf, default_fg, type_fg, capacity_fg, type_to_hex_color, min_capacity, max_capacity)
+
     # --- Legends ---
     type_legend_items = ''.join([f'<div><span style="background-color:{{color}}; width: 15px; height: 15px; display: inline-block; border: 1px solid grey; vertical-align: middle;"></span>&nbsp;{{typ}}</div>'.format(color=color, typ=typ) for typ, color in type_to_hex_color.items()])
     type_legend_html = f'''<div id="legend-type" style="display:none; width: 180px; font-size:14px; background-color:rgba(255,255,255,0.85); padding: 10px; border-radius: 5px; border:1px solid grey;"><b>Power Plant Types</b><br>{type_legend_items}</div>'''
 
-    gradient_colors_css = ', '.join([colors.to_hex(cm.get_cmap('YlOrRd')(i/255.0)) for i in range(256)])
+    gradient_colors_css = ', '.join([colors.to_hex(matplotlib.colormaps['YlOrRd'](i/255.0)) for i in range(256)])
     gradient_bar_html = f'<div style="background: linear-gradient(to right, {gradient_colors_css}); height: 10px; width: 100%; border-radius: 3px;"></div>'
     capacity_legend_html = f'''<div id="legend-capacity" style="display:none; width: 150px; font-size:12px; background-color:rgba(255,255,255,0.85); padding: 5px; border-radius: 5px; border:1px solid grey; margin-bottom: 10px;"><b>Capacity (MW)</b>{gradient_bar_html}<div style="display: flex; justify-content: space-between; font-size: 10px;"><span>{min_capacity:.0f}</span><span>{max_capacity:.0f}</span></div></div>'''
 
     legends_container_html = f'''<div style="position: fixed; bottom: 20px; left: 20px; z-index:9998;">{capacity_legend_html}{type_legend_html}</div>'''
     m.get_root().html.add_child(folium.Element(legends_container_html))
 
+@instrument
+def create_power_plant_map(gdf, output_path='reports/power_plants_map.html', backend='canvas',
+                           cluster=False, max_cluster_zoom=8, tiles_dir=None, density_columns=None,
+                           density_bandwidth_km=DEFAULT_BANDWIDTH_KM, tile_index=None):
+    """Creates an interactive map of power plants with different layers.
+
+    The default 'canvas' backend embeds the plants once as typed arrays and draws
+    them on a single client-side canvas, switching colors per layer in the browser.
+    The 'markers' backend builds individual folium CircleMarkers for every layer.
+
+    With cluster=True, the canvas backend shows pre-aggregated grid clusters (plant
+    count and summed total_mw) up to max_cluster_zoom and individual plants above
+    it. With tiles_dir, the clusters and plants are written there as static tiles
+    and loaded per viewport, so the HTML itself stays small. The tiles are fetched
+    over HTTP, so serve the reports directory (e.g. `python -m http.server`).
+    Passing the tile_index returned by update_map_tiles reuses the tiles already
+    in tiles_dir instead of writing them again.
+
+    With density_columns (e.g. ['total_mw'] or fuel *_mw columns), a
+    capacity-weighted kernel density surface of each column is embedded as a PNG
+    image overlay instead of the plants, which are left out of the HTML. Only
+    with tiles_dir, where plants are loaded per viewport rather than embedded,
+    are the plant layers kept as further choices next to the overlays.
+
+    `gdf` may also be a PlantStore; only the columns the map draws are read from it.
+    """
+    logger.info("Creating combined interactive map of power plant locations...")
+    if isinstance(gdf, PlantStore):
+        gdf = gdf.to_frame(MAP_COLUMNS + [col for col in density_columns or () if col not in MAP_COLUMNS])
+    if gdf is None or gdf.empty:
+        logger.warning("No data to create power plant map.")
+        return
+    if backend not in ('canvas', 'markers'):
+        raise ValueError(f"Unknown map backend: {backend}")
+    # Imported here so that chart-only runs don't pay for folium.
+    import folium
+
+    center_lat = gdf['latitude'].mean()
+    center_lon = gdf['longitude'].mean()
+    m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
+
+    show_plants = not density_columns or (backend == 'canvas' and tiles_dir is not None)
+    if show_plants:
+        _add_plant_layers(m, gdf, output_path, backend, cluster, max_cluster_zoom, tiles_dir, tile_index)
+    if density_columns:
+        surface = kernel_density_surface(gdf, density_columns, density_bandwidth_km)
+        _add_density_overlays(m, surface, show_first=not show_plants)
+
     # --- Layer Control ---
     folium.LayerControl(position='topleft', collapsed=False).add_to(m)
 
@@ -126,6 +666,4 @@ def create_power_plant_map(gdf, output_path='reports/power_plants_map.html'):
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     m.save(output_path)
-    print(f"Interactive map saved to {output_path}")
-
-
+    logger.info("Interactive map saved to %s", output_path)
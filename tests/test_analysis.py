@@ -1,7 +1,8 @@
 import pytest
 import geopandas
+import numpy as np
 import pandas as pd
-from src.analysis import analyze_power_plant_density
+from src.analysis import aggregate_power_plants, analyze_power_plant_density, analyze_power_plant_density_stream
 
 @pytest.fixture
 def sample_processed_gdf():
@@ -52,3 +53,76 @@ def test_analyze_power_plant_density_no_state_column():
 
     density_results = analyze_power_plant_density(gdf_no_state)
     assert density_results is None
+
+def test_analyze_power_plant_density_stream(sample_processed_gdf):
+    """
+    Tests if merging per-batch partial counts matches the in-memory analysis.
+    """
+    batches = [sample_processed_gdf.iloc[:2], sample_processed_gdf.iloc[2:4], sample_processed_gdf.iloc[4:]]
+    streamed = analyze_power_plant_density_stream(iter(batches))
+    expected = analyze_power_plant_density(sample_processed_gdf)
+
+    assert streamed['state'].tolist() == expected['state'].tolist()
+    assert streamed['plant_count'].tolist() == expected['plant_count'].tolist()
+
+@pytest.fixture
+def sample_capacity_gdf(sample_processed_gdf):
+    """
+    Extends the sample GeoDataFrame with sources and capacity columns for aggregation tests.
+    """
+    gdf = sample_processed_gdf.copy()
+    gdf['primsource'] = pd.Categorical(['solar', 'natural gas', 'solar', 'wind', 'natural gas'])
+    gdf['total_mw'] = [100.0, 300.0, 50.0, 20.0, 100.0]
+    gdf['solar_mw'] = [100.0, 0.0, 50.0, 0.0, 0.0]
+    gdf['ng_mw'] = [0.0, 300.0, 0.0, 0.0, 100.0]
+    gdf['wind_mw'] = [0.0, 0.0, 0.0, 20.0, 0.0]
+    return gdf
+
+def test_aggregate_power_plants(sample_capacity_gdf):
+    """
+    Tests if all metrics are computed per state in one call.
+    """
+    result = aggregate_power_plants(sample_capacity_gdf, by='state')
+    assert result['state'].tolist() == ['CA', 'NY', 'TX']
+    assert result['plant_count'].tolist() == [2, 1, 2]
+    assert result['total_mw'].tolist() == [150.0, 20.0, 400.0]
+    assert result['mean_mw'].tolist() == [75.0, 20.0, 200.0]
+    assert result['max_mw'].tolist() == [100.0, 20.0, 300.0]
+    assert result['ng_mw'].tolist() == [0.0, 0.0, 400.0]
+    assert result['solar_mw_share'].tolist() == [1.0, 0.0, 0.0]
+    assert result['wind_mw_share'].tolist() == [0.0, 1.0, 0.0]
+
+def test_aggregate_power_plants_multiple_keys(sample_capacity_gdf):
+    """
+    Tests if combined group keys match a pandas groupby.
+    """
+    result = aggregate_power_plants(sample_capacity_gdf, by=['state', 'primsource'])
+    expected = (sample_capacity_gdf.groupby(['state', 'primsource'], observed=True)['total_mw']
+                .agg(['size', 'sum']).reset_index())
+    assert result[['state', 'primsource']].values.tolist() == expected[['state', 'primsource']].astype(str).values.tolist()
+    assert result['plant_count'].tolist() == expected['size'].tolist()
+    assert result['total_mw'].tolist() == expected['sum'].tolist()
+
+def test_aggregate_power_plants_high_cardinality_keys():
+    """
+    Tests if keys whose combinations overflow int64 are compacted and still match a pandas groupby.
+    """
+    rng = np.random.default_rng(0)
+    num_rows = 70_000
+    frame = pd.DataFrame({f'key_{i}': rng.permutation(num_rows) for i in range(4)})
+    frame['key_0'] = frame['key_0'] % 1000
+    frame.loc[::2, 'key_1'] = frame.loc[::2, 'key_0']
+    frame['total_mw'] = rng.uniform(0, 100, num_rows)
+    keys = ['key_0', 'key_1', 'key_2', 'key_3']
+    result = aggregate_power_plants(frame, by=keys)
+    expected = frame.groupby(keys)['total_mw'].agg(['size', 'sum', 'max']).reset_index()
+    assert result[keys].values.tolist() == expected[keys].values.tolist()
+    assert result['plant_count'].tolist() == expected['size'].tolist()
+    np.testing.assert_allclose(result['total_mw'], expected['sum'])
+    np.testing.assert_allclose(result['max_mw'], expected['max'])
+
+def test_aggregate_power_plants_missing_key(sample_capacity_gdf):
+    """
+    Tests if aggregate_power_plants handles a missing group key column.
+    """
+    assert aggregate_power_plants(sample_capacity_gdf, by='county') is None
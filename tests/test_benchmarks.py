@@ -0,0 +1,32 @@
+from benchmarks.bench_pipeline import find_regressions, parse_size
+
+def test_parse_size():
+    """
+    Tests if plant counts are parsed with k and M suffixes.
+    """
+    assert parse_size('10k') == 10_000
+    assert parse_size('1M') == 1_000_000
+    assert parse_size('2.5k') == 2_500
+    assert parse_size(' 500 ') == 500
+
+def test_find_regressions():
+    """
+    Tests if only slowdowns and memory growth beyond the threshold and the noise floors are reported.
+    """
+    baseline = {'sizes': {'10000': {
+        'process': {'seconds': 1.0, 'peak_mb': 100.0},
+        'analyze': {'seconds': 0.01, 'peak_mb': 10.0},
+        'map': {'seconds': 2.0, 'peak_mb': 200.0},
+    }}}
+    results = {'sizes': {
+        '10000': {
+            'process': {'seconds': 1.3, 'peak_mb': 101.0},
+            'analyze': {'seconds': 0.03, 'peak_mb': 12.0},
+            'map': {'seconds': 2.2, 'peak_mb': 300.0},
+        },
+        '100000': {'process': {'seconds': 9.0, 'peak_mb': 900.0}},
+    }}
+    regressions = find_regressions(results, baseline, threshold=0.25)
+    assert regressions == ["10000 plants, process: seconds 1.000 -> 1.300",
+                           "10000 plants, map: peak_mb 200.000 -> 300.000"]
+    assert find_regressions(results, baseline, threshold=0.4) == ["10000 plants, map: peak_mb 200.000 -> 300.000"]
@@ -0,0 +1,86 @@
+import os
+import pytest
+import geopandas
+import src.cache
+from src.cache import get_cache_paths, is_cache_valid, load_processed_power_plants
+
+@pytest.fixture
+def sample_geojson(tmp_path):
+    """
+    Writes a small raw power plant GeoJSON file for testing the cache.
+    """
+    data = {
+        'Plant_Code': [1, 2, 3],
+        'Plant_Name': ['Plant A', 'Plant B', 'Plant C'],
+        'State': ['CA', 'TX', 'NY'],
+        'Total_MW': [150.0, None, 50.0],
+    }
+    geometry = geopandas.points_from_xy([-118.25, -96.80, -74.00], [34.05, 32.78, 40.71])
+    gdf = geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+    file_path = tmp_path / "power_plants.geojson"
+    gdf.to_file(file_path, driver="GeoJSON")
+    return str(file_path)
+
+def fail_to_load(*args, **kwargs):
+    raise AssertionError("The source file should not be parsed on a cache hit.")
+
+def test_cache_is_written_and_reused(sample_geojson, tmp_path, monkeypatch):
+    """
+    Tests if the first load writes the cache and later loads skip parsing.
+    """
+    cache_dir = str(tmp_path / "processed")
+    first = load_processed_power_plants(sample_geojson, cache_dir=cache_dir)
+    cache_path, metadata_path = get_cache_paths(sample_geojson, cache_dir)
+    assert os.path.exists(cache_path)
+    assert os.path.exists(metadata_path)
+
+    monkeypatch.setattr(src.cache, 'load_local_geojson', fail_to_load)
+    second = load_processed_power_plants(sample_geojson, cache_dir=cache_dir)
+    assert list(second.columns) == list(first.columns)
+    assert second['total_mw'].tolist() == first['total_mw'].tolist()
+    assert second.crs == "EPSG:4326"
+
+def test_cache_invalidation(sample_geojson, tmp_path):
+    """
+    Tests if touching the source keeps the cache but changing its contents invalidates it.
+    """
+    cache_dir = str(tmp_path / "processed")
+    load_processed_power_plants(sample_geojson, cache_dir=cache_dir)
+    assert is_cache_valid(sample_geojson, cache_dir)
+
+    stat = os.stat(sample_geojson)
+    os.utime(sample_geojson, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert is_cache_valid(sample_geojson, cache_dir)
+
+    with open(sample_geojson, 'a') as f:
+        f.write('\n')
+    assert not is_cache_valid(sample_geojson, cache_dir)
+
+def test_cache_rejects_other_source(sample_geojson, tmp_path):
+    """
+    Tests if a source with the same file name, size and mtime doesn't reuse another source's cache.
+    """
+    cache_dir = str(tmp_path / "processed")
+    load_processed_power_plants(sample_geojson, cache_dir=cache_dir)
+
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    other = other_dir / "power_plants.geojson"
+    with open(sample_geojson) as f:
+        other.write_text(f.read().replace('Plant A', 'Plant Z'))
+    stat = os.stat(sample_geojson)
+    os.utime(other, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert get_cache_paths(str(other), cache_dir) == get_cache_paths(sample_geojson, cache_dir)
+    assert not is_cache_valid(str(other), cache_dir)
+    assert load_processed_power_plants(str(other), cache_dir=cache_dir)['plant_name'].tolist()[0] == 'Plant Z'
+    assert not is_cache_valid(sample_geojson, cache_dir)
+
+def test_cache_rebuild(sample_geojson, tmp_path, monkeypatch):
+    """
+    Tests if rebuild=True re-parses the source even when the cache is valid.
+    """
+    cache_dir = str(tmp_path / "processed")
+    load_processed_power_plants(sample_geojson, cache_dir=cache_dir)
+
+    monkeypatch.setattr(src.cache, 'load_local_geojson', lambda *args, **kwargs: None)
+    assert load_processed_power_plants(sample_geojson, cache_dir=cache_dir, rebuild=True) is None
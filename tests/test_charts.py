@@ -0,0 +1,74 @@
+import sys
+import pytest
+import pandas as pd
+from src.charts import BarChartRenderer, build_chart_specs, density_chart_spec, render_bar_charts
+
+@pytest.fixture
+def sample_aggregated_df():
+    """
+    Provides per-fuel, per-state aggregates like those of aggregate_power_plants.
+    """
+    data = {
+        'primsource': ['Solar', 'Solar', 'Natural Gas', 'Natural Gas', 'Natural Gas'],
+        'state': ['CA', 'TX', 'CA', 'TX', 'NY'],
+        'plant_count': [40, 10, 25, 60, 15],
+        'total_mw': [800.0, 150.0, 2500.0, 9000.0, 1200.0],
+    }
+    return pd.DataFrame(data)
+
+def test_build_chart_specs(sample_aggregated_df, tmp_path):
+    """
+    Tests if one sorted spec is planned per group and format.
+    """
+    specs = build_chart_specs(sample_aggregated_df, value='total_mw', split_by='primsource',
+                              output_dir=str(tmp_path), formats=('png', 'svg'), top=2)
+    paths = sorted(spec.output_path for spec in specs)
+    assert [path.rsplit('/', 1)[-1] for path in paths] == [
+        'total_mw_by_state_natural_gas.png', 'total_mw_by_state_natural_gas.svg',
+        'total_mw_by_state_solar.png', 'total_mw_by_state_solar.svg']
+    gas = next(spec for spec in specs if 'natural_gas' in spec.output_path)
+    assert gas.labels == ['TX', 'CA']
+    assert gas.title == 'Total Capacity (MW) by State (Natural Gas)'
+
+def test_render_bar_charts_png_and_svg(sample_aggregated_df, tmp_path):
+    """
+    Tests if PNG and SVG charts are written without registering pyplot figures.
+    """
+    specs = build_chart_specs(sample_aggregated_df, split_by='primsource', output_dir=str(tmp_path),
+                              formats=('png', 'svg'))
+    paths = render_bar_charts(specs)
+    assert paths == [spec.output_path for spec in specs]
+    for path in paths:
+        with open(path, 'rb') as f:
+            header = f.read(100)
+        assert header.startswith(b'\x89PNG') if path.endswith('.png') else b'<svg' in header or b'<?xml' in header
+    if 'matplotlib.pyplot' in sys.modules:
+        assert sys.modules['matplotlib.pyplot'].get_fignums() == []
+
+def test_renderer_reuses_one_figure(tmp_path):
+    """
+    Tests if consecutive charts replace the previous bars on the same axes.
+    """
+    renderer = BarChartRenderer()
+    first = density_chart_spec(pd.DataFrame({'state': ['CA', 'TX'], 'plant_count': [5, 9]}),
+                               str(tmp_path / "first.png"))
+    second = density_chart_spec(pd.DataFrame({'state': ['NY'], 'plant_count': [3]}),
+                                str(tmp_path / "second.png"))
+    renderer.render(first)
+    renderer.render(second)
+    assert len(renderer.fig.axes) == 1
+    assert len(renderer.ax.patches) == 1
+    assert [label.get_text() for label in renderer.ax.get_xticklabels()] == ['NY']
+    renderer.close()
+    assert renderer.fig.axes == []
+    assert (tmp_path / "first.png").exists() and (tmp_path / "second.png").exists()
+
+def test_render_bar_charts_process_pool(sample_aggregated_df, tmp_path):
+    """
+    Tests if charts rendered in a process pool are all written, in spec order.
+    """
+    specs = build_chart_specs(sample_aggregated_df, category='primsource', split_by='state',
+                              output_dir=str(tmp_path))
+    paths = render_bar_charts(specs, workers=2)
+    assert paths == [spec.output_path for spec in specs]
+    assert all((tmp_path / path.rsplit('/', 1)[-1]).exists() for path in paths)
@@ -0,0 +1,71 @@
+import os
+import pytest
+import subprocess
+import sys
+import geopandas
+from src.cli import build_parser, load_settings, resolve_paths
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def settings_file(tmp_path):
+    """
+    Writes a settings file pointing at a small raw power plant GeoJSON under tmp_path.
+    """
+    data = {
+        'Plant_Code': [1, 2, 3],
+        'Plant_Name': ['Plant A', 'Plant B', 'Plant C'],
+        'State': ['CA', 'TX', 'CA'],
+        'PrimSource': ['solar', 'wind', 'natural gas'],
+        'Total_MW': [150.0, 20.0, 50.0],
+    }
+    geometry = geopandas.points_from_xy([-118.25, -96.80, -122.42], [34.05, 32.78, 37.77])
+    os.makedirs(tmp_path / "data" / "raw")
+    geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326").to_file(
+        tmp_path / "data" / "raw" / "plants.geojson", driver="GeoJSON")
+    config_path = tmp_path / "settings.ini"
+    config_path.write_text(
+        "[settings]\n"
+        f"data_path = {tmp_path / 'data'}\n"
+        "raw_file = raw/plants.geojson\n"
+        f"reports_path = {tmp_path / 'reports'}\n"
+    )
+    return str(config_path)
+
+def run_cli(args):
+    """
+    Runs the CLI in a fresh interpreter and returns the heavy modules it imported.
+    """
+    script = (
+        "import sys\n"
+        "from src.cli import main\n"
+        f"main({args!r})\n"
+        "heavy = ['folium', 'pyproj', 'geopandas', 'pyogrio']\n"
+        "print('IMPORTED', [name for name in heavy if name in sys.modules])\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=REPO_ROOT, capture_output=True,
+                            text=True, check=True)
+    return result.stdout.splitlines()[-1]
+
+def test_settings_and_overrides(settings_file, tmp_path):
+    """
+    Tests if paths come from the settings file and command-line options override them.
+    """
+    settings = load_settings(settings_file)
+    assert settings['workers'] == 1
+
+    args = build_parser().parse_args(['--reports-path', 'out', 'chart', '--cluster'])
+    assert args.command == 'chart' and args.cluster
+    paths = resolve_paths(settings, args)
+    assert paths['raw_file'] == os.path.join(str(tmp_path / "data"), 'raw/plants.geojson')
+    assert paths['reports'] == 'out'
+    assert paths['stages'] == os.path.join(str(tmp_path / "data"), 'processed', 'stages')
+
+def test_chart_run_skips_heavy_imports(settings_file, tmp_path):
+    """
+    Tests if a chart run on stored analysis results does not import folium or pyproj.
+    """
+    assert 'geopandas' in run_cli(['--config', settings_file, 'analyze'])
+    imported = run_cli(['--config', settings_file, 'chart'])
+    assert imported == 'IMPORTED []'
+    assert os.path.exists(tmp_path / "reports" / "power_plant_density.png")
@@ -1,6 +1,7 @@
 import os
 import pytest
-from src.data_ingestion import load_local_geojson
+import geopandas
+from src.data_ingestion import load_local_geojson, iter_geojson_batches
 
 # Define the path to the test GeoJSON file
 TEST_DATA_DIR = "data/raw"
@@ -36,3 +37,48 @@ def test_load_local_geojson_file_not_found():
     non_existent_path = "non_existent_file.geojson"
     gdf = load_local_geojson(non_existent_path)
     assert gdf is None
+
+@pytest.fixture
+def sample_geojson(tmp_path):
+    """
+    Writes a small GeoJSON file with EIA-style field names for testing pushdown reads.
+    """
+    data = {
+        'Plant_Code': [1, 2, 3],
+        'Plant_Name': ['Plant A', 'Plant B', 'Plant C'],
+        'State': ['CA', 'TX', 'NY'],
+        'Total_MW': [150.0, 250.0, 50.0],
+        'Unused_Field': ['x', 'y', 'z'],
+    }
+    geometry = geopandas.points_from_xy([-118.25, -96.80, -74.00], [34.05, 32.78, 40.71])
+    gdf = geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+    file_path = tmp_path / "sample.geojson"
+    gdf.to_file(file_path, driver="GeoJSON")
+    return str(file_path)
+
+def test_load_local_geojson_column_pushdown(sample_geojson):
+    """
+    Tests if only the requested columns are read, matched on standardized names.
+    """
+    gdf = load_local_geojson(sample_geojson, columns=['plant_code', 'total_mw', 'geometry'])
+    assert list(gdf.columns) == ['Plant_Code', 'Total_MW', 'geometry']
+    assert len(gdf) == 3
+
+def test_load_local_geojson_bbox_and_where(sample_geojson):
+    """
+    Tests if features outside the bounding box or failing the row filter are skipped.
+    """
+    gdf = load_local_geojson(sample_geojson, bbox=(-125, 30, -90, 36))
+    assert sorted(gdf['State']) == ['CA', 'TX']
+
+    gdf = load_local_geojson(sample_geojson, bbox=(-125, 30, -90, 36), where="Total_MW > 200")
+    assert list(gdf['State']) == ['TX']
+
+def test_iter_geojson_batches(sample_geojson):
+    """
+    Tests if a file is streamed in batches of at most batch_size features.
+    """
+    batches = list(iter_geojson_batches(sample_geojson, batch_size=2, columns=['state', 'total_mw']))
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert all(batch.geometry.name == 'geometry' for batch in batches)
+    assert list(batches[0].columns) == ['State', 'Total_MW', 'geometry']
@@ -1,7 +1,7 @@
 import pytest
 import geopandas
 import pandas as pd
-from src.data_processing import process_power_plants_data
+from src.data_processing import process_power_plants_data, process_power_plants_batches
 
 @pytest.fixture
 def sample_gdf():
@@ -74,4 +74,56 @@ def test_feature_selection(sample_gdf):
     # Adjust expected_num_columns if the selection logic changes
     expected_num_columns = 8 # Based on the selected_columns in data_processing.py for the sample_gdf
     assert len(processed_gdf.columns) == expected_num_columns
-    assert 'FID' not in processed_gdf.columns # Example of a column that should be dropped
\ No newline at end of file
+    assert 'FID' not in processed_gdf.columns # Example of a column that should be dropped
+
+def test_compact_dtypes(sample_gdf):
+    """
+    Tests if capacities, categorical text and integer codes are downcast.
+    """
+    processed_gdf = process_power_plants_data(sample_gdf.copy())
+    assert processed_gdf['install_mw'].dtype == 'float32'
+    assert processed_gdf['total_mw'].dtype == 'float32'
+    assert isinstance(processed_gdf['state'].dtype, pd.CategoricalDtype)
+    assert processed_gdf['plant_code'].dtype == 'int32'
+
+def test_input_not_modified(sample_gdf):
+    """
+    Tests if the input GeoDataFrame is left untouched when inplace is False.
+    """
+    original_columns = list(sample_gdf.columns)
+    process_power_plants_data(sample_gdf)
+    assert list(sample_gdf.columns) == original_columns
+    assert sample_gdf['Install_MW'].isnull().sum() == 1
+
+def test_inplace_processing(sample_gdf):
+    """
+    Tests if inplace=True cleans and returns the input GeoDataFrame itself.
+    """
+    sample_gdf['Unused Column'] = ['a', 'b', 'c']
+    processed_gdf = process_power_plants_data(sample_gdf, inplace=True)
+    assert processed_gdf is sample_gdf
+    assert 'unused_column' not in sample_gdf.columns
+    assert sample_gdf['total_mw'].dtype == 'float32'
+    assert sample_gdf['total_mw'].isnull().sum() == 0
+
+def test_inplace_column_order(sample_gdf):
+    """
+    Tests if the inplace and copy paths return the columns in the same order.
+    """
+    shuffled = sample_gdf[['geometry', 'State', 'Total_MW', 'Longitude', 'Plant Code', 'Latitude',
+                           'Install_MW', 'Plant.Name']]
+    copied = process_power_plants_data(shuffled)
+    modified = process_power_plants_data(shuffled.copy(), inplace=True)
+    assert list(modified.columns) == list(copied.columns)
+    assert list(copied.columns) == ['plant_code', 'plant_name', 'state', 'install_mw', 'total_mw',
+                                    'longitude', 'latitude', 'geometry']
+    pd.testing.assert_frame_equal(pd.DataFrame(modified), pd.DataFrame(copied))
+
+def test_process_power_plants_batches(sample_gdf):
+    """
+    Tests if each batch of a stream is cleaned independently.
+    """
+    batches = [sample_gdf.iloc[:2].copy(), sample_gdf.iloc[2:].copy()]
+    processed = list(process_power_plants_batches(iter(batches)))
+    assert [len(batch) for batch in processed] == [2, 1]
+    assert all(batch['total_mw'].isnull().sum() == 0 for batch in processed)
@@ -0,0 +1,108 @@
+import pytest
+import geopandas
+import numpy as np
+from src.density import DensitySurface, grid_density, hexagon_vertices, kernel_density_surface
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides a sample processed GeoDataFrame with capacity columns for density tests.
+    """
+    data = {
+        'plant_code': [1, 2, 3, 4],
+        'total_mw': [100.0, 50.0, 200.0, 10.0],
+        'solar_mw': [100.0, 0.0, 0.0, 10.0],
+        'ng_mw': [0.0, 50.0, 200.0, 0.0],
+        'latitude': [34.05, 34.40, 40.71, 40.20],
+        'longitude': [-118.25, -118.40, -74.00, -74.60],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+def test_square_grid_density(sample_processed_gdf):
+    """
+    Tests if plants are counted and capacity-weighted per square cell.
+    """
+    grid = grid_density(sample_processed_gdf, 1.0)[1.0]
+    assert grid.weight_columns == ['total_mw', 'solar_mw', 'ng_mw']
+    frame = grid.to_frame().sort_values('center_lon').reset_index(drop=True)
+    assert frame['plant_count'].tolist() == [2, 1, 1]
+    assert frame['total_mw'].tolist() == [150.0, 10.0, 200.0]
+    assert frame['ng_mw'].tolist() == [50.0, 0.0, 200.0]
+    assert frame.loc[0, 'center_lon'] == pytest.approx(-118.5)
+    assert frame.loc[0, 'center_lat'] == pytest.approx(34.5)
+
+def test_multiple_resolutions(sample_processed_gdf):
+    """
+    Tests if several resolutions are computed at once and conserve the totals.
+    """
+    grids = grid_density(sample_processed_gdf, [0.25, 1.0, 10.0])
+    assert sorted(grids) == [0.25, 1.0, 10.0]
+    assert len(grids[0.25]) == 4
+    assert len(grids[10.0]) == 2
+    for grid in grids.values():
+        assert grid.count.sum() == 4
+        assert grid.values('total_mw').sum() == pytest.approx(360.0)
+
+def test_to_raster(sample_processed_gdf):
+    """
+    Tests if a square grid converts to a dense raster with the matching extent.
+    """
+    raster, extent = grid_density(sample_processed_gdf, 1.0)[1.0].to_raster('total_mw')
+    assert raster.shape == (7, 46)
+    assert extent == pytest.approx((-119.0, -73.0, 34.0, 41.0))
+    assert raster.sum() == pytest.approx(360.0)
+
+def test_hex_grid_density(sample_processed_gdf):
+    """
+    Tests if every plant lies within its hexagon and totals are conserved.
+    """
+    grid = grid_density(sample_processed_gdf, [0.5], kind='hex')[0.5]
+    assert grid.count.sum() == 4
+    assert grid.values('solar_mw').sum() == pytest.approx(110.0)
+    vertices = hexagon_vertices(grid)
+    assert vertices.shape == (len(grid), 6, 2)
+
+    # Each plant must be closer to its own hexagon center than the circumradius.
+    radius = 0.5 / np.sqrt(3)
+    lon = sample_processed_gdf['longitude'].to_numpy()
+    lat = sample_processed_gdf['latitude'].to_numpy()
+    distances = np.hypot(lon[:, None] - grid.center_lon[None, :], lat[:, None] - grid.center_lat[None, :])
+    assert np.all(distances.min(axis=1) <= radius + 1e-9)
+
+def test_kernel_density_surface_conserves_capacity(sample_processed_gdf):
+    """
+    Tests if each density layer integrates to its column's total and peaks at the largest plant.
+    """
+    surface = kernel_density_surface(sample_processed_gdf, ['total_mw', 'solar_mw', 'ng_mw'],
+                                     bandwidth_km=30, width=512)
+    assert surface.layers.shape[0] == 3
+    assert surface.layers.dtype == np.float32
+    areas = surface.cell_areas()
+    assert (surface.layer('total_mw') * areas).sum() == pytest.approx(360.0, rel=1e-3)
+    assert (surface.layer('solar_mw') * areas).sum() == pytest.approx(110.0, rel=1e-3)
+    np.testing.assert_allclose(surface.layer('solar_mw') + surface.layer('ng_mw'), surface.layer('total_mw'),
+                               rtol=1e-4, atol=1e-9)
+
+    # The peak is in the cell of the 200 MW plant in New York.
+    row, col = np.unravel_index(surface.layer('total_mw').argmax(), surface.layers.shape[1:])
+    min_lon, min_lat, max_lon, max_lat = surface.bounds
+    peak_lon = min_lon + (col + 0.5) * (max_lon - min_lon) / surface.layers.shape[2]
+    assert peak_lon == pytest.approx(-74.0, abs=2 * surface.cell_km / 111.32 / np.cos(np.radians(40.7)))
+
+def test_density_surface_exports(sample_processed_gdf, tmp_path):
+    """
+    Tests if a density surface round-trips through .npz and renders as a transparent PNG.
+    """
+    surface = kernel_density_surface(sample_processed_gdf, bandwidth_km=20, width=256)
+    surface.save(tmp_path / 'surface.npz')
+    loaded = DensitySurface.load(tmp_path / 'surface.npz')
+    assert loaded.columns == ['total_mw']
+    assert loaded.bounds == pytest.approx(surface.bounds)
+    np.testing.assert_array_equal(loaded.layers, surface.layers)
+
+    rgba = surface.to_rgba()
+    assert rgba.shape == surface.layers.shape[1:] + (4,)
+    assert rgba[0, 0, 3] == 0 and rgba[..., 3].max() > 0
+    surface.save_png(tmp_path / 'surface.png')
+    assert (tmp_path / 'surface.png').read_bytes().startswith(b'\x89PNG')
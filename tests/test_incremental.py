@@ -0,0 +1,150 @@
+import os
+import pytest
+import geopandas
+import pandas as pd
+from src.analysis import analyze_power_plant_density
+from src.incremental import apply_density_delta, diff_snapshots, incremental_refresh, is_empty_diff
+from src.visualization import create_power_plant_map
+
+def make_snapshot(plant_codes, states, total_mw, period=202406):
+    """
+    Builds a processed snapshot GeoDataFrame with the given plants.
+    """
+    n = len(plant_codes)
+    data = {
+        'plant_code': plant_codes,
+        'plant_name': [f'Plant {code}' for code in plant_codes],
+        'state': pd.Categorical(states),
+        'primsource': ['solar'] * n,
+        'total_mw': total_mw,
+        'period': [period] * n,
+        'latitude': [34.0 + i for i in range(n)],
+        'longitude': [-118.0 + i for i in range(n)],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+@pytest.fixture
+def old_snapshot():
+    return make_snapshot([1, 2, 3, 4], ['CA', 'TX', 'CA', 'NY'], [100.0, 200.0, 50.0, 10.0])
+
+@pytest.fixture
+def new_snapshot():
+    # Plant 4 is retired, plant 5 is added, plant 2 changes capacity and plant 3 moves to TX.
+    return make_snapshot([1, 2, 3, 5], ['CA', 'TX', 'TX', 'WA'], [100.0, 250.0, 50.0, 30.0])
+
+def test_diff_snapshots(old_snapshot, new_snapshot):
+    """
+    Tests if added, removed and changed rows are found by plant_code.
+    """
+    diff = diff_snapshots(old_snapshot, new_snapshot)
+    assert diff['added']['plant_code'].tolist() == [5]
+    assert diff['removed']['plant_code'].tolist() == [4]
+    assert sorted(diff['changed_old']['plant_code']) == [2, 3]
+    assert sorted(diff['changed_new']['plant_code']) == [2, 3]
+    assert is_empty_diff(diff_snapshots(old_snapshot, old_snapshot.copy()))
+
+def test_diff_snapshots_ignores_period():
+    """
+    Tests if a new release whose only change is the period stamp reports no changes.
+    """
+    old = make_snapshot([1, 2, 3], ['CA', 'TX', 'NY'], [100.0, 200.0, 50.0], period=202406)
+    new = make_snapshot([1, 2, 3], ['CA', 'TX', 'NY'], [100.0, 200.0, 50.0], period=202407)
+    diff = diff_snapshots(old, new)
+    assert len(diff['added']) == 0 and len(diff['removed']) == 0
+    assert is_empty_diff(diff)
+
+def test_apply_density_delta(old_snapshot, new_snapshot):
+    """
+    Tests if patching the stored counts with a diff matches a full recount.
+    """
+    old_density = analyze_power_plant_density(old_snapshot)
+    updated = apply_density_delta(old_density, diff_snapshots(old_snapshot, new_snapshot))
+    expected = analyze_power_plant_density(new_snapshot)
+    assert updated['state'].tolist() == expected['state'].astype(str).tolist()
+    assert updated['plant_count'].tolist() == expected['plant_count'].tolist()
+
+def test_incremental_refresh(old_snapshot, new_snapshot, tmp_path):
+    """
+    Tests if outputs are skipped when nothing changed and refreshed when plants change.
+    """
+    paths = {
+        'chart_path': str(tmp_path / 'density.png'),
+        'map_path': str(tmp_path / 'map.html'),
+        'snapshot_path': str(tmp_path / 'snapshot.parquet'),
+        'density_path': str(tmp_path / 'density.csv'),
+    }
+    incremental_refresh(old_snapshot, **paths)
+    assert (tmp_path / 'map.html').exists()
+
+    # An unchanged snapshot leaves the outputs untouched.
+    (tmp_path / 'map.html').unlink()
+    incremental_refresh(old_snapshot, **paths)
+    assert not (tmp_path / 'map.html').exists()
+
+    density = incremental_refresh(new_snapshot, **paths)
+    assert dict(zip(density['state'], density['plant_count'])) == {'CA': 1, 'TX': 2, 'WA': 1}
+    assert (tmp_path / 'map.html').exists()
+
+def test_incremental_refresh_skips_unmapped_changes(old_snapshot, tmp_path):
+    """
+    Tests if a change outside the map columns refreshes the chart but not the map.
+    """
+    paths = {
+        'chart_path': str(tmp_path / 'density.png'),
+        'map_path': str(tmp_path / 'map.html'),
+        'snapshot_path': str(tmp_path / 'snapshot.parquet'),
+        'density_path': str(tmp_path / 'density.csv'),
+    }
+    incremental_refresh(old_snapshot, **paths)
+    (tmp_path / 'map.html').unlink()
+
+    # Plant 3 moves to TX on paper; its location, name, type and capacity are unchanged.
+    moved = old_snapshot.copy()
+    moved['state'] = pd.Categorical(['CA', 'TX', 'TX', 'NY'])
+    density = incremental_refresh(moved, **paths)
+    assert dict(zip(density['state'], density['plant_count'])) == {'CA': 1, 'NY': 1, 'TX': 2}
+    assert not (tmp_path / 'map.html').exists()
+
+def read_tiles(tiles_dir):
+    """
+    Reads every tile file under tiles_dir, keyed by its relative path.
+    """
+    return {str(path.relative_to(tiles_dir)): path.read_text()
+            for path in sorted(tiles_dir.rglob('*.json')) if path.name != 'state.json'}
+
+def test_incremental_refresh_rewrites_affected_tiles(tmp_path):
+    """
+    Tests if only the tiles around changed plants are rewritten, matching a full rebuild.
+    """
+    old = make_snapshot([1, 2, 3, 4], ['CA', 'TX', 'CA', 'NY'], [100.0, 200.0, 50.0, 10.0])
+    # Plant 1 changes capacity within the old range and plant 4 moves next to plant 3.
+    new = old.copy()
+    new.loc[0, 'total_mw'] = 150.0
+    new.loc[3, ['latitude', 'longitude']] = [36.1, -115.9]
+    tiles_dir = tmp_path / 'tiles'
+    paths = {
+        'chart_path': str(tmp_path / 'density.png'),
+        'map_path': str(tmp_path / 'map.html'),
+        'snapshot_path': str(tmp_path / 'snapshot.parquet'),
+        'density_path': str(tmp_path / 'density.csv'),
+        'map_kwargs': {'tiles_dir': str(tiles_dir)},
+    }
+    incremental_refresh(old, **paths)
+    before = read_tiles(tiles_dir)
+    for path in before:
+        os.utime(tiles_dir / path, ns=(0, 0))
+
+    incremental_refresh(new, **paths)
+    after = read_tiles(tiles_dir)
+    rewritten = {path for path in after if os.stat(tiles_dir / path).st_mtime_ns != 0}
+    # At the point zoom, plant 4's old tile is deleted, its new one and plant 1's are
+    # rewritten, and the tiles of plants 2 and 3 are left alone.
+    assert 'points/9/92/199.json' in before and 'points/9/92/199.json' not in after
+    assert sorted(path for path in rewritten if path.startswith('points/')) == [
+        'points/9/88/204.json', 'points/9/91/200.json']
+    assert len(rewritten) < len(after)
+
+    full_dir = tmp_path / 'full'
+    create_power_plant_map(new, output_path=str(tmp_path / 'full.html'), tiles_dir=str(full_dir))
+    assert after == read_tiles(full_dir)
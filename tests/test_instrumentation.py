@@ -0,0 +1,100 @@
+import io
+import json
+import logging
+import os
+import pytest
+import pandas as pd
+from src.instrumentation import (configure_instrumentation, configure_logging, get_metrics, instrument,
+                                 reset_metrics, summarize_metrics, write_metrics_json, write_prometheus_textfile)
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """
+    Starts every test with no recorded metrics and the default settings.
+    """
+    reset_metrics()
+    configure_instrumentation()
+    yield
+    reset_metrics()
+    configure_instrumentation()
+
+@instrument
+def keep_large_plants(df):
+    return df[df['total_mw'] > 10]
+
+def test_decorator_records_rows_and_times():
+    """
+    Tests if a decorated stage records its rows in and out, times and memory.
+    """
+    result = keep_large_plants(pd.DataFrame({'total_mw': [5.0, 50.0, 500.0]}))
+    assert len(result) == 2
+    [metrics] = get_metrics()
+    assert metrics.stage == 'keep_large_plants'
+    assert (metrics.rows_in, metrics.rows_out) == (3, 2)
+    assert metrics.wall_seconds >= 0 and metrics.cpu_seconds >= 0
+    assert metrics.peak_memory_bytes is not None
+
+def test_context_manager_and_summary():
+    """
+    Tests if context-managed stages record the values set in the block and are totaled per stage.
+    """
+    for rows in (10, 20):
+        with instrument('batch') as stage:
+            stage.rows_in = rows
+    with pytest.raises(ValueError):
+        with instrument('failing'):
+            raise ValueError("boom")
+
+    summary = summarize_metrics()
+    assert summary['batch']['calls'] == 2
+    assert summary['batch']['rows_in'] == 30
+    assert summary['failing']['calls'] == 1
+
+def test_reports(tmp_path):
+    """
+    Tests if the JSON report and the Prometheus textfile contain every stage.
+    """
+    keep_large_plants(pd.DataFrame({'total_mw': [50.0]}))
+    json_path = str(tmp_path / "metrics.json")
+    prom_path = str(tmp_path / "metrics.prom")
+    write_metrics_json(json_path)
+    write_prometheus_textfile(prom_path)
+
+    with open(json_path) as f:
+        report = json.load(f)
+    assert report['stages']['keep_large_plants']['rows_out'] == 1
+    assert report['calls'][0]['stage'] == 'keep_large_plants'
+    with open(prom_path) as f:
+        text = f.read()
+    assert '# TYPE power_plants_stage_wall_seconds gauge' in text
+    assert 'power_plants_stage_rows_in{stage="keep_large_plants"} 1' in text
+
+def test_profile_dumps_outermost_stage(tmp_path):
+    """
+    Tests if a cProfile dump is written for the outermost stage only.
+    """
+    configure_instrumentation(profile_dir=str(tmp_path))
+    with instrument('outer'):
+        keep_large_plants(pd.DataFrame({'total_mw': [50.0]}))
+    assert os.listdir(tmp_path) == ['outer.prof']
+    assert len(get_metrics()) == 2
+
+def test_json_logging():
+    """
+    Tests if JSON logs carry the stage metrics and quiet mode hides them.
+    """
+    stream = io.StringIO()
+    configure_logging(0, 'json', stream=stream)
+    with instrument('logged'):
+        pass
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry['metrics']['stage'] == 'logged'
+
+    configure_logging(-1, 'json', stream=stream)
+    with instrument('hidden'):
+        pass
+    assert 'hidden' not in stream.getvalue()
+    root = logging.getLogger('src')
+    root.handlers.clear()
+    root.setLevel(logging.NOTSET)
+    root.propagate = True
@@ -0,0 +1,52 @@
+import json
+import os
+import pytest
+import numpy as np
+from src.map_tiles import build_cluster_levels, mercator_fractions, write_cluster_tiles
+
+@pytest.fixture
+def sample_points():
+    """
+    Provides plant coordinates and capacities: two nearby plants in CA and one in NY.
+    """
+    lon = np.array([-118.25, -118.26, -74.00])
+    lat = np.array([34.05, 34.06, 40.71])
+    total_mw = np.array([100.0, 50.0, 200.0])
+    return lon, lat, total_mw
+
+def test_mercator_fractions():
+    """
+    Tests if the origin and the antimeridian map to the expected Web Mercator fractions.
+    """
+    x, y = mercator_fractions([0.0, -180.0], [0.0, 0.0])
+    assert np.allclose(x, [0.5, 0.0])
+    assert np.allclose(y, [0.5, 0.5])
+
+def test_build_cluster_levels(sample_points):
+    """
+    Tests if every level preserves the plant count and capacity, merging nearby plants at low zoom.
+    """
+    levels = build_cluster_levels(*sample_points, max_zoom=14)
+    assert sorted(levels) == list(range(15))
+    for level in levels.values():
+        assert level['count'].sum() == 3
+        assert np.isclose(level['total_mw'].sum(), 350.0)
+
+    # The two CA plants share a cell at national zoom, and are separate at zoom 14.
+    assert len(levels[4]) == 2
+    assert len(levels[14]) == 3
+    ca_cluster = levels[4].sort_values('longitude').iloc[0]
+    assert ca_cluster['count'] == 2
+    assert np.isclose(ca_cluster['longitude'], -118.255)
+
+def test_write_cluster_tiles(sample_points, tmp_path):
+    """
+    Tests if cluster tiles are written for every level and listed in the index.
+    """
+    levels = build_cluster_levels(*sample_points, max_zoom=3)
+    tile_index = write_cluster_tiles(levels, str(tmp_path))
+    assert sorted(tile_index) == ['clusters/0', 'clusters/1', 'clusters/2', 'clusters/3']
+    assert tile_index['clusters/0'] == ['0/0']
+    with open(os.path.join(tmp_path, 'clusters', '0', '0', '0.json')) as f:
+        tile = json.load(f)
+    assert set(tile) == {'lat', 'lon', 'count', 'mw'}
@@ -0,0 +1,53 @@
+import pytest
+import geopandas
+import numpy as np
+import pandas as pd
+from src.data_processing import process_power_plants_data
+from src.parallel import parallel_process_power_plants, partition_by_key, partition_row_ranges
+
+@pytest.fixture
+def sample_raw_gdf():
+    """
+    Provides a sample raw GeoDataFrame in Web Mercator for testing parallel processing.
+    """
+    data = {
+        'Plant_Code': [1, 2, 3, 4, 5, 6],
+        'State': ['CA', 'TX', 'CA', 'NY', 'TX', None],
+        'Total_MW': [100.0, None, 200.0, 50.0, 75.0, 10.0],
+        'PrimSource': ['solar', 'wind', 'solar', None, 'natural gas', 'wind'],
+    }
+    geometry = geopandas.points_from_xy([0, 1, 2, 3, 4, 5], [0, 1, 2, 3, 4, 5], crs="EPSG:4326")
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326").to_crs(epsg=3857)
+
+def test_partition_row_ranges():
+    """
+    Tests if row ranges cover every row exactly once.
+    """
+    assert partition_row_ranges(10, 3) == [(0, 3), (3, 6), (6, 10)]
+    assert partition_row_ranges(2, 4) == [(0, 1), (1, 2)]
+
+def test_partition_by_key():
+    """
+    Tests if rows with the same key are always placed in the same partition.
+    """
+    keys = np.array(['CA', 'TX', 'CA', 'NY', 'TX', 'CA'])
+    partitions = partition_by_key(keys, 2)
+    assert sorted(i for part in partitions for i in part) == list(range(6))
+    for part in partitions:
+        part_keys = {keys[i] for i in part}
+        assert all(keys[i] not in part_keys for other in partitions if other is not part for i in other)
+
+@pytest.mark.parametrize('partition_by', ['rows', 'state'])
+def test_parallel_matches_serial(sample_raw_gdf, partition_by):
+    """
+    Tests if parallel processing gives the same plants and counts as the serial pipeline.
+    """
+    processed_gdf, density_results = parallel_process_power_plants(sample_raw_gdf, workers=2, partition_by=partition_by)
+    expected = process_power_plants_data(sample_raw_gdf)
+
+    assert processed_gdf.crs == "EPSG:4326"
+    result = processed_gdf.sort_values('plant_code').reset_index(drop=True)
+    assert result['plant_code'].tolist() == expected['plant_code'].tolist()
+    assert result['total_mw'].tolist() == expected['total_mw'].tolist()
+    assert isinstance(result['state'].dtype, pd.CategoricalDtype)
+    assert dict(zip(density_results['state'], density_results['plant_count'])) == {'CA': 2, 'NY': 1, 'TX': 2, 'Unknown': 1}
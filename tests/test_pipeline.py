@@ -0,0 +1,144 @@
+import pytest
+import os
+import geopandas
+import pandas as pd
+import src.pipeline
+from src.pipeline import Pipeline, Stage, build_power_plant_pipeline
+
+@pytest.fixture
+def counting_pipeline(tmp_path):
+    """
+    Provides a small pipeline over a text file whose stages count their calls.
+    """
+    source = tmp_path / "source.txt"
+    source.write_text("1 2 3")
+    calls = {'load': 0, 'total': 0, 'report': 0}
+
+    def load(file_path):
+        calls['load'] += 1
+        with open(file_path) as f:
+            return [int(value) for value in f.read().split()]
+
+    def total(values, scale=1):
+        calls['total'] += 1
+        return pd.DataFrame({'total': [sum(values) * scale]})
+
+    def report(totals, output_path):
+        calls['report'] += 1
+        with open(output_path, 'w') as f:
+            f.write(str(totals['total'].iloc[0]))
+
+    def make_pipeline(scale=1, version=1):
+        return Pipeline([
+            Stage('load', load, config={'file_path': str(source)}, source=str(source)),
+            Stage('total', total, inputs=('load',), config={'scale': scale}, version=version),
+            Stage('report', report, inputs=('total',), output_path=str(tmp_path / "report.txt")),
+        ], cache_dir=str(tmp_path / "stages"))
+
+    return make_pipeline, calls, source
+
+def test_runs_only_required_stages(counting_pipeline):
+    """
+    Tests if requesting an intermediate stage does not run the stages after it.
+    """
+    make_pipeline, calls, _ = counting_pipeline
+    outputs = make_pipeline().run('total')
+    assert outputs['total']['total'].tolist() == [6]
+    assert calls == {'load': 1, 'total': 1, 'report': 0}
+
+def test_memoized_stages_skip_upstream(counting_pipeline):
+    """
+    Tests if an up-to-date stage is reused without running or loading anything upstream.
+    """
+    make_pipeline, calls, _ = counting_pipeline
+    make_pipeline().run('report')
+    outputs = make_pipeline().run('report', 'total')
+    assert calls == {'load': 1, 'total': 1, 'report': 1}
+    assert open(outputs['report']).read() == '6'
+    assert outputs['total']['total'].tolist() == [6]
+
+def test_config_and_source_changes_invalidate(counting_pipeline):
+    """
+    Tests if a config change reruns only the affected stages and a source change reruns everything.
+    """
+    make_pipeline, calls, source = counting_pipeline
+    make_pipeline().run('report')
+
+    outputs = make_pipeline(scale=2).run('report')
+    assert open(outputs['report']).read() == '12'
+    assert calls == {'load': 1, 'total': 2, 'report': 2}
+
+    source.write_text("1 2 3 4")
+    os.utime(source, ns=(0, 0))
+    make_pipeline(scale=2).run('report')
+    assert calls == {'load': 2, 'total': 3, 'report': 3}
+
+def test_force_and_missing_outputs(counting_pipeline, tmp_path):
+    """
+    Tests if force reruns every stage and a deleted output file is regenerated.
+    """
+    make_pipeline, calls, _ = counting_pipeline
+    make_pipeline().run('report')
+    make_pipeline().run('report', force=True)
+    assert calls == {'load': 2, 'total': 2, 'report': 2}
+
+    os.remove(tmp_path / "report.txt")
+    make_pipeline().run('report')
+    assert calls == {'load': 2, 'total': 2, 'report': 3}
+
+def test_code_versions_invalidate(counting_pipeline, monkeypatch):
+    """
+    Tests if a stage version bump reruns that stage and its dependents, and a format bump reruns everything.
+    """
+    make_pipeline, calls, _ = counting_pipeline
+    make_pipeline().run('report')
+    make_pipeline(version=2).run('report')
+    assert calls == {'load': 1, 'total': 2, 'report': 2}
+
+    monkeypatch.setattr(src.pipeline, 'PIPELINE_FORMAT_VERSION', src.pipeline.PIPELINE_FORMAT_VERSION + 1)
+    make_pipeline(version=2).run('report')
+    assert calls == {'load': 2, 'total': 3, 'report': 3}
+
+def test_module_sources_in_stage_key(tmp_path, monkeypatch):
+    """
+    Tests if editing a module listed by a stage changes the stage's key.
+    """
+    module_dir = tmp_path / "modules"
+    module_dir.mkdir()
+    (module_dir / "stage_impl.py").write_text("SCALE = 1\n")
+    monkeypatch.syspath_prepend(str(module_dir))
+
+    def make_key():
+        pipeline = Pipeline([Stage('total', sum, modules=('stage_impl',))], cache_dir=str(tmp_path / "stages"))
+        return pipeline.stage_key('total')
+
+    key = make_key()
+    assert make_key() == key
+    (module_dir / "stage_impl.py").write_text("SCALE = 2\n")
+    assert make_key() != key
+
+def test_power_plant_pipeline_uses_processed_cache(tmp_path):
+    """
+    Tests if the process stage reads and writes the validated GeoParquet cache next to the stage outputs.
+    """
+    source = tmp_path / "plants.geojson"
+    geometry = geopandas.points_from_xy([-118.25, -96.80], [34.05, 32.78])
+    geopandas.GeoDataFrame({'Plant_Code': [1, 2], 'State': ['CA', 'TX'], 'Total_MW': [10.0, 20.0]},
+                           geometry=geometry, crs="EPSG:4326").to_file(source, driver="GeoJSON")
+    processed_dir = tmp_path / "processed"
+    pipeline = build_power_plant_pipeline(str(source), reports_dir=str(tmp_path),
+                                          cache_dir=str(processed_dir / "stages"))
+    processed = pipeline.run('process')['process']
+    assert processed['state'].tolist() == ['CA', 'TX']
+    assert (processed_dir / "plants.parquet").exists()
+    assert (processed_dir / "plants.cache.json").exists()
+    assert not (processed_dir / "stages" / "process.json").exists()
+
+def test_power_plant_pipeline_missing_file(tmp_path):
+    """
+    Tests if a missing source file skips the downstream stages instead of failing.
+    """
+    pipeline = build_power_plant_pipeline(str(tmp_path / "missing.geojson"), reports_dir=str(tmp_path),
+                                          cache_dir=str(tmp_path / "stages"))
+    assert pipeline.run('chart') == {'chart': None}
+    assert not os.path.exists(tmp_path / "power_plant_density.png")
@@ -0,0 +1,88 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+import geopandas
+import numpy as np
+import pandas as pd
+from src.analysis import analyze_power_plant_density
+from src.plant_store import PlantStore
+from src.visualization import create_power_plant_map
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides a sample GeoDataFrame shaped like the output of process_power_plants_data.
+    """
+    data = {
+        'plant_code': np.array([1, 2, 3, 4], dtype=np.int32),
+        'plant_name': ['Plant A', 'Plant B', 'Plant C', 'Plant D'],
+        'state': pd.Categorical(['CA', 'TX', 'CA', 'NY']),
+        'primsource': pd.Categorical(['solar', 'wind', 'natural gas', 'solar']),
+        'total_mw': np.array([100.0, 150.0, 200.0, 50.0], dtype=np.float32),
+        'latitude': [34.05, 32.78, 37.77, 40.71],
+        'longitude': [-118.25, -96.80, -122.42, -74.00],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+def _total_mw_sum(store):
+    return float(store.arrays['total_mw'].sum())
+
+def test_from_geodataframe_encodes_columns(sample_processed_gdf):
+    """
+    Tests if numeric columns stay contiguous arrays and text columns are dictionary-encoded.
+    """
+    store = PlantStore.from_geodataframe(sample_processed_gdf)
+    assert len(store) == 4
+    assert 'geometry' not in store.columns
+    assert store.arrays['total_mw'].dtype == np.float32
+    assert store.arrays['total_mw'].flags['C_CONTIGUOUS']
+    assert store.codes('plant_name').dtype == np.int8
+    assert list(store.categories('state')) == ['CA', 'NY', 'TX']
+    assert store['plant_name'].astype(str).tolist() == ['Plant A', 'Plant B', 'Plant C', 'Plant D']
+
+def test_save_and_load_memory_mapped(sample_processed_gdf, tmp_path):
+    """
+    Tests if a saved store is mapped back read-only with the same contents.
+    """
+    PlantStore.from_geodataframe(sample_processed_gdf).save(str(tmp_path))
+    store = PlantStore.load(str(tmp_path))
+    assert isinstance(store.arrays['latitude'], np.memmap)
+    assert not store.arrays['latitude'].flags['WRITEABLE']
+    gdf = store.to_geodataframe()
+    assert gdf.crs.to_epsg() == 4326
+    assert gdf['state'].astype(str).tolist() == ['CA', 'TX', 'CA', 'NY']
+    assert gdf.geometry.x.tolist() == sample_processed_gdf['longitude'].tolist()
+
+def test_to_frame_is_zero_copy(sample_processed_gdf, tmp_path):
+    """
+    Tests if frames built from a mapped store share its arrays.
+    """
+    PlantStore.from_geodataframe(sample_processed_gdf).save(str(tmp_path))
+    store = PlantStore.load(str(tmp_path))
+    frame = store.to_geodataframe(['total_mw', 'state'])
+    assert np.shares_memory(frame['total_mw'].to_numpy(), store.arrays['total_mw'])
+    assert np.shares_memory(frame['state'].array.codes, store.codes('state'))
+
+def test_pickled_mapped_store_is_shared(sample_processed_gdf, tmp_path):
+    """
+    Tests if a mapped store is sent to worker processes by path and mapped there.
+    """
+    PlantStore.from_geodataframe(sample_processed_gdf).save(str(tmp_path))
+    store = PlantStore.load(str(tmp_path))
+    assert len(pickle.dumps(store)) < 500
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        assert list(pool.map(_total_mw_sum, [store, store])) == [500.0, 500.0]
+
+def test_analysis_and_map_accept_store(sample_processed_gdf, tmp_path):
+    """
+    Tests if density analysis matches the GeoDataFrame path and the map is built from a store.
+    """
+    store = PlantStore.from_geodataframe(sample_processed_gdf)
+    expected = analyze_power_plant_density(sample_processed_gdf)
+    result = analyze_power_plant_density(store)
+    pd.testing.assert_frame_equal(result, expected)
+
+    output_path = tmp_path / "map.html"
+    create_power_plant_map(store, output_path=str(output_path))
+    assert 'Plant C' in output_path.read_text()
@@ -0,0 +1,83 @@
+import pytest
+import geopandas
+import numpy as np
+from src.data_processing import process_power_plants_data
+from src.projection import add_projected_columns, get_transformer, reproject_points, transform_coordinates, utm_epsg
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides a sample processed GeoDataFrame with plants in Los Angeles, Dallas and New York.
+    """
+    data = {
+        'plant_code': [1, 2, 3],
+        'longitude': [-118.25, -96.80, -74.00],
+        'latitude': [34.05, 32.78, 40.71],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+def test_transformers_are_cached():
+    """
+    Tests if equivalent CRS descriptions share one transformer.
+    """
+    assert get_transformer(4326, 'epsg:5070') is get_transformer('EPSG:4326', 'EPSG:5070')
+
+def test_transform_coordinates_round_trip():
+    """
+    Tests if bulk transforms round-trip and keep missing coordinates missing.
+    """
+    lon, lat = np.array([-118.25, np.nan]), np.array([34.05, np.nan])
+    x, y = transform_coordinates(lon, lat, 'EPSG:4326', 'EPSG:5070')
+    back_lon, back_lat = transform_coordinates(x, y, 'EPSG:5070', 'EPSG:4326')
+    assert back_lon[0] == pytest.approx(-118.25) and back_lat[0] == pytest.approx(34.05)
+    assert np.isnan(back_lon[1]) and np.isnan(back_lat[1])
+
+def test_add_projected_columns(sample_processed_gdf):
+    """
+    Tests if several projections are added side by side without changing the geometry.
+    """
+    projected = add_projected_columns(sample_processed_gdf, {'equal_area': 'EPSG:5070', 'utm': 'utm'})
+    assert {'equal_area_x', 'equal_area_y', 'utm_x', 'utm_y', 'utm_zone'} <= set(projected.columns)
+    assert 'equal_area_x' not in sample_processed_gdf.columns
+    assert projected.geometry.equals(sample_processed_gdf.geometry)
+    assert np.allclose(projected['equal_area_x'], sample_processed_gdf.to_crs(5070).geometry.x)
+
+def test_utm_zone_per_plant(sample_processed_gdf):
+    """
+    Tests if every plant is projected into the UTM zone containing it.
+    """
+    gdf = sample_processed_gdf.copy()
+    gdf.loc[3] = [4, np.nan, np.nan, None]
+    projected = add_projected_columns(gdf, {'utm': 'utm'})
+    # Los Angeles is in zone 11N, Dallas in 14N and New York in 18N.
+    assert projected['utm_zone'].tolist()[:3] == [32611, 32614, 32618]
+    assert utm_epsg(gdf['longitude'], gdf['latitude']).tolist() == [32611, 32614, 32618, 0]
+    assert projected['utm_zone'].isna().tolist() == [False, False, False, True]
+    for i, zone in enumerate([32611, 32614, 32618]):
+        expected = sample_processed_gdf.iloc[[i]].to_crs(zone).geometry
+        assert projected['utm_x'][i] == pytest.approx(expected.x.iloc[0])
+        assert projected['utm_y'][i] == pytest.approx(expected.y.iloc[0])
+    assert np.isnan(projected['utm_x'][3])
+
+def test_reproject_points_matches_to_crs(sample_processed_gdf):
+    """
+    Tests if reprojecting points matches GeoDataFrame.to_crs, including missing geometries.
+    """
+    mercator = sample_processed_gdf.to_crs(3857)
+    mercator.loc[2, 'geometry'] = None
+    reprojected = reproject_points(mercator, 'EPSG:4326')
+    assert reprojected.crs.to_epsg() == 4326
+    assert np.allclose(reprojected.geometry.x[:2], sample_processed_gdf['longitude'][:2])
+    assert reprojected.geometry.isna().tolist() == [False, False, True]
+    assert mercator.crs.to_epsg() == 3857
+    assert reproject_points(reprojected, 4326) is reprojected
+
+def test_process_adds_projections(sample_processed_gdf):
+    """
+    Tests if process_power_plants_data reprojects to WGS 84 and adds the requested projections.
+    """
+    processed = process_power_plants_data(sample_processed_gdf.to_crs(3857), projections={'equal_area': 5070})
+    assert processed.crs.to_epsg() == 4326
+    assert np.allclose(processed.geometry.y, sample_processed_gdf['latitude'])
+    assert processed['equal_area_x'].notna().all()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import pytest
+import geopandas
+import numpy as np
+import pandas as pd
+from src.map_tiles import mercator_fractions
+from src.server import PlantServer, PlantService, RequestError, ResponseCache, tile_bounds
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides processed plants in Los Angeles, Houston and New York.
+    """
+    data = {
+        'plant_code': np.array([1, 2, 3, 4, 5], dtype=np.int32),
+        'plant_name': ['Plant A', 'Plant B', 'Plant C', 'Plant D', 'Plant E'],
+        'state': pd.Categorical(['CA', 'CA', 'TX', 'NY', 'NY']),
+        'primsource': pd.Categorical(['solar', 'natural gas', 'natural gas', 'wind', 'natural gas']),
+        'total_mw': np.array([100.0, 150.0, 200.0, 50.0, 300.0], dtype=np.float32),
+        'latitude': [34.05, 34.10, 29.76, 40.71, 40.75],
+        'longitude': [-118.25, -118.30, -95.37, -74.00, -73.95],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+@pytest.fixture
+def service(sample_processed_gdf):
+    return PlantService(sample_processed_gdf)
+
+def _get(service, path, **params):
+    content_type, body = service.handle(path, {name: str(value) for name, value in params.items()})
+    return json.loads(body)
+
+def test_response_cache_evicts_least_recently_used():
+    """
+    Tests if the cache stays within its byte budget by evicting the least recently used bodies.
+    """
+    cache = ResponseCache(max_bytes=10)
+    cache.put('a', 'text/plain', b'aaaa')
+    cache.put('b', 'text/plain', b'bbbb')
+    assert cache.get('a') == ('text/plain', b'aaaa')
+    cache.put('c', 'text/plain', b'cccc')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    cache.put('huge', 'text/plain', b'x' * 11)
+    assert cache.get('huge') is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.size_bytes == 8
+
+def test_density_endpoint(service):
+    """
+    Tests if density groups match the per-state counts and can be split by fuel.
+    """
+    result = _get(service, '/density')
+    assert [(group['state'], group['plant_count']) for group in result['groups']] == [('CA', 2), ('NY', 2), ('TX', 1)]
+    by_fuel = _get(service, '/density', by='state,primsource')
+    assert len(by_fuel['groups']) == 5
+    with pytest.raises(RequestError):
+        _get(service, '/density', by='county')
+
+def test_density_metrics_are_rounded(sample_processed_gdf):
+    """
+    Tests if float32 capacity sums are returned rounded to kW.
+    """
+    gdf = sample_processed_gdf.copy()
+    gdf['total_mw'] = np.array([4601.3, 4601.3, 0.1, 0.2, 0.3], dtype=np.float32)
+    groups = _get(PlantService(gdf), '/density')['groups']
+    totals = {group['state']: group['total_mw'] for group in groups}
+    assert totals == {'CA': 9202.6, 'NY': 0.5, 'TX': 0.1}
+
+def test_plants_endpoint(service):
+    """
+    Tests if bbox and radius queries list the matching plants, nearest first for radius.
+    """
+    result = _get(service, '/plants', bbox='-119,33,-118,35')
+    assert [plant['plant_name'] for plant in result['plants']] == ['Plant A', 'Plant B']
+    assert result['plants'][0]['state'] == 'CA'
+
+    result = _get(service, '/plants', lon=-73.95, lat=40.75, radius_km=20, primsource='natural gas', limit=5)
+    assert [plant['plant_code'] for plant in result['plants']] == [5]
+    assert result['plants'][0]['distance_km'] == pytest.approx(0.0, abs=1e-6)
+
+    result = _get(service, '/plants', bbox='-180,-90,180,90', limit=2)
+    assert result['count'] == 5 and result['truncated'] and len(result['plants']) == 2
+    with pytest.raises(RequestError):
+        _get(service, '/plants', bbox='1,2,3')
+    with pytest.raises(RequestError):
+        _get(service, '/plants', lon='nan', lat=0, radius_km=10)
+    with pytest.raises(RequestError):
+        _get(service, '/plants', bbox='-inf,33,-118,35')
+    with pytest.raises(RequestError):
+        _get(service, '/plants', lon=-73.95, lat=40.75, radius_km=-1)
+
+def test_tile_endpoint(service):
+    """
+    Tests if low zooms return clusters and high zooms return colored plants inside the tile.
+    """
+    world = _get(service, '/tiles/0/0/0.geojson')
+    assert sum(feature['properties']['count'] for feature in world['features']) == 5
+
+    # The zoom 12 tile holding Plant D in New York.
+    z = 12
+    fx, fy = mercator_fractions([-74.00], [40.71])
+    x, y = int(fx[0] * (1 << z)), int(fy[0] * (1 << z))
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    assert min_lon <= -74.0 <= max_lon and min_lat <= 40.71 <= max_lat
+    tile = _get(service, f'/tiles/{z}/{x}/{y}.geojson')
+    names = {feature['properties']['plant_name'] for feature in tile['features']}
+    assert 'Plant D' in names
+    properties = tile['features'][0]['properties']
+    assert properties['type_color'].startswith('#') and properties['capacity_color'].startswith('#')
+    with pytest.raises(RequestError):
+        _get(service, '/tiles/1/5/0.geojson')
+
+def test_server_caches_responses(service):
+    """
+    Tests if the HTTP server answers keep-alive requests and serves repeats from the cache.
+    """
+    async def exchange():
+        server = PlantServer(service, cache_bytes=2**20)
+        host, port = await server.start('127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection(host, port)
+        responses = []
+        for target in ('/density?by=state', '/density?by=state', '/missing'):
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            await writer.drain()
+            head = (await reader.readuntil(b'\r\n\r\n')).decode()
+            length = int(head.split('Content-Length: ')[1].split('\r\n')[0])
+            responses.append((head, json.loads(await reader.readexactly(length))))
+        writer.close()
+        server.close()
+        return responses, server.stats()
+
+    responses, stats = asyncio.run(exchange())
+    assert 'X-Cache: miss' in responses[0][0] and 'X-Cache: hit' in responses[1][0]
+    assert responses[0][1] == responses[1][1]
+    assert responses[2][0].startswith('HTTP/1.1 404')
+    assert stats['requests'] == 3 and stats['cache']['hits'] == 1
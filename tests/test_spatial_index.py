@@ -0,0 +1,79 @@
+import pytest
+import geopandas
+import numpy as np
+from src.spatial_index import PlantIndex, chord_to_km, km_to_chord
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides a sample processed GeoDataFrame with plants in Los Angeles, Houston and New York.
+    """
+    data = {
+        'plant_code': [1, 2, 3, 4, 5],
+        'primsource': ['solar', 'natural gas', 'natural gas', 'wind', 'natural gas'],
+        'latitude': [34.05, 34.10, 29.76, 40.71, 40.75],
+        'longitude': [-118.25, -118.30, -95.37, -74.00, -73.95],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+@pytest.fixture
+def plant_index(sample_processed_gdf):
+    return PlantIndex.from_geodataframe(sample_processed_gdf)
+
+def test_chord_round_trip():
+    """
+    Tests if great-circle distances survive the conversion to chord length and back.
+    """
+    distances = np.array([0.0, 1.0, 50.0, 5000.0])
+    assert np.allclose(chord_to_km(km_to_chord(distances)), distances)
+
+def test_knn(plant_index):
+    """
+    Tests if the nearest plants are returned in order with great-circle distances.
+    """
+    distances, indices = plant_index.knn([-118.25, -74.0], [34.05, 40.71], k=2)
+    assert plant_index.plant_code[indices].tolist() == [[1, 2], [4, 5]]
+    assert distances[0, 0] == pytest.approx(0.0, abs=1e-6)
+    # Los Angeles plants are ~7 km apart.
+    assert 5 < distances[0, 1] < 9
+
+def test_knn_with_primsource_filter(plant_index):
+    """
+    Tests if the primsource filter restricts the candidates and pads missing neighbors.
+    """
+    distances, indices = plant_index.knn([-118.25], [34.05], k=4, primsource='natural gas')
+    assert plant_index.plant_code[indices[0, :3]].tolist() == [2, 3, 5]
+    assert indices[0, 3] == -1
+    assert np.isnan(distances[0, 3])
+
+def test_radius(plant_index):
+    """
+    Tests if all plants within the radius are returned as flat query/plant pairs.
+    """
+    query_idx, plant_idx, distances = plant_index.radius([-118.25, -95.37], [34.05, 29.76], radius_km=50)
+    pairs = sorted(zip(query_idx.tolist(), plant_index.plant_code[plant_idx].tolist()))
+    assert pairs == [(0, 1), (0, 2), (1, 3)]
+    assert np.all(distances <= 50)
+
+def test_bbox(plant_index):
+    """
+    Tests if plants inside each box are returned, optionally filtered by primsource.
+    """
+    boxes = [(-119, 33, -118, 35), (-75, 40, -73, 41)]
+    box_idx, plant_idx = plant_index.bbox(boxes)
+    assert sorted(zip(box_idx.tolist(), plant_index.plant_code[plant_idx].tolist())) == [(0, 1), (0, 2), (1, 4), (1, 5)]
+
+    box_idx, plant_idx = plant_index.bbox(boxes, primsource='natural gas')
+    assert sorted(plant_index.plant_code[plant_idx].tolist()) == [2, 5]
+
+def test_save_and_load(plant_index, tmp_path):
+    """
+    Tests if a persisted index answers queries like the original.
+    """
+    path = str(tmp_path / "plant_index.npz")
+    plant_index.save(path)
+    loaded = PlantIndex.load(path)
+    assert len(loaded) == len(plant_index)
+    _, indices = loaded.knn([-95.37], [29.76], k=1, primsource=['natural gas'])
+    assert loaded.plant_code[indices].tolist() == [[3]]
@@ -0,0 +1,99 @@
+import os
+import pytest
+import geopandas
+import numpy as np
+import pandas as pd
+from shapely.geometry import box
+from src.pipeline import build_power_plant_pipeline
+from src.plant_store import PlantStore
+from src.spatial_join import PolygonIndex, aggregate_by_polygon, assign_polygons, spatial_join_power_plants
+
+@pytest.fixture
+def zones_file(tmp_path):
+    """
+    Provides a GeoJSON layer of two zones, the east one split into two parts.
+    """
+    zones = geopandas.GeoDataFrame(
+        {'Zone_Name': ['WEST', 'EAST', 'EAST']},
+        geometry=[box(-125, 30, -100, 50), box(-100, 30, -85, 50), box(-85, 30, -65, 50)],
+        crs="EPSG:4326",
+    )
+    path = tmp_path / "zones.geojson"
+    zones.to_file(path, driver='GeoJSON')
+    return str(path)
+
+@pytest.fixture
+def sample_processed_gdf():
+    """
+    Provides processed plants in both zones and one outside the layer (Hawaii).
+    """
+    data = {
+        'primsource': pd.Categorical(['solar', 'wind', 'solar', 'coal', 'solar']),
+        'total_mw': np.array([100.0, 150.0, 200.0, 300.0, 5.0], dtype=np.float32),
+        'latitude': [34.05, 32.78, 40.71, 39.10, 21.30],
+        'longitude': [-118.25, -96.80, -74.00, -90.20, -157.85],
+    }
+    geometry = geopandas.points_from_xy(data['longitude'], data['latitude'])
+    return geopandas.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326")
+
+def test_polygon_index_assigns_points(zones_file):
+    """
+    Tests if points get the id of their polygon, parts of one zone share it, and outside points get -1.
+    """
+    index = PolygonIndex.from_file(zones_file, id_column='zone_name')
+    assert list(index.ids) == ['EAST', 'WEST']
+    codes = index.assign([-118.25, -96.80, -74.00, -157.85], [34.05, 32.78, 40.71, 21.30], batch_size=2)
+    assert codes.tolist() == [1, 0, 0, -1]
+
+def test_assign_polygons_in_parallel(zones_file):
+    """
+    Tests if chunked assignment across processes matches the serial result.
+    """
+    index = PolygonIndex.from_file(zones_file, id_column='Zone_Name')
+    rng = np.random.default_rng(0)
+    lon, lat = rng.uniform(-130, -60, 1000), rng.uniform(25, 55, 1000)
+    expected = index.assign(lon, lat)
+    assert np.array_equal(assign_polygons(index, lon, lat, workers=2, batch_size=100), expected)
+
+def test_spatial_join_is_cached(sample_processed_gdf, zones_file, tmp_path):
+    """
+    Tests if the assignment is stored once and reloaded for the same plants, also from a PlantStore.
+    """
+    cache_dir = str(tmp_path / "joins")
+    first = spatial_join_power_plants(sample_processed_gdf, zones_file, id_column='Zone_Name', cache_dir=cache_dir)
+    assert first.name == 'zones'
+    assert first.astype(object).tolist()[:4] == ['WEST', 'EAST', 'EAST', 'EAST']
+    assert pd.isna(first.iloc[4])
+    assert len(os.listdir(cache_dir)) == 1
+
+    store = PlantStore.from_geodataframe(sample_processed_gdf)
+    second = spatial_join_power_plants(store, zones_file, id_column='Zone_Name', cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    assert second.astype(object).tolist()[:4] == first.astype(object).tolist()[:4]
+
+def test_aggregate_by_polygon(sample_processed_gdf, zones_file, tmp_path):
+    """
+    Tests if plants are counted and their capacity summed per polygon, leaving out unassigned plants.
+    """
+    assignment = spatial_join_power_plants(sample_processed_gdf, zones_file, id_column='Zone_Name',
+                                           cache_dir=str(tmp_path))
+    result = aggregate_by_polygon(sample_processed_gdf, assignment)
+    assert result['zones'].astype(str).tolist() == ['EAST', 'WEST']
+    assert result['plant_count'].tolist() == [3, 1]
+    assert result['total_mw'].tolist() == [650.0, 100.0]
+
+    by_fuel = aggregate_by_polygon(PlantStore.from_geodataframe(sample_processed_gdf), assignment, by='primsource')
+    assert len(by_fuel) == 4
+
+def test_pipeline_join_stage(sample_processed_gdf, zones_file, tmp_path):
+    """
+    Tests if a polygon layer adds a join stage that aggregates the processed plants.
+    """
+    plants_file = tmp_path / "plants.geojson"
+    sample_processed_gdf.astype({'primsource': str}).to_file(plants_file, driver='GeoJSON')
+    pipeline = build_power_plant_pipeline(str(plants_file), cache_dir=str(tmp_path / "stages"),
+                                          polygon_layers={'zones': {'polygon_path': zones_file,
+                                                                    'id_column': 'Zone_Name'}})
+    result = pipeline.run('join_zones')['join_zones']
+    assert result['plant_count'].tolist() == [3, 1]
+    assert len(os.listdir(tmp_path / "joins")) == 1
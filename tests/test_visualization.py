@@ -2,7 +2,9 @@ import pytest
 import geopandas
 import pandas as pd
 import os
-from src.visualization import plot_power_plant_density, create_power_plant_map
+import numpy as np
+from src.density import grid_density
+from src.visualization import plot_power_plant_density, plot_density_heatmap, create_power_plant_map, get_capacity_codes, MISSING_CODE
 
 @pytest.fixture
 def sample_density_df():
@@ -46,3 +48,82 @@ def test_create_power_plant_map(sample_processed_gdf, tmp_path):
     create_power_plant_map(sample_processed_gdf, output_path)
     assert output_path.exists()
     assert output_path.stat().st_size > 0 # Check if file is not empty
+
+def test_create_power_plant_map_canvas_payload(sample_processed_gdf, tmp_path):
+    """
+    Tests if the canvas backend embeds the plants once instead of building markers.
+    """
+    output_path = tmp_path / "power_plants_map.html"
+    create_power_plant_map(sample_processed_gdf, output_path)
+    html = output_path.read_text()
+    assert 'CanvasLayer' in html
+    assert 'circle_marker' not in html
+    assert html.count('Plant A') == 1
+
+def test_create_power_plant_map_markers_backend(sample_processed_gdf, tmp_path):
+    """
+    Tests if the legacy markers backend still builds one marker per plant and layer.
+    """
+    output_path = tmp_path / "power_plants_map.html"
+    create_power_plant_map(sample_processed_gdf, output_path, backend='markers')
+    html = output_path.read_text()
+    assert html.count('L.circleMarker(') == 9
+
+def test_create_power_plant_map_density_overlay(sample_processed_gdf, tmp_path):
+    """
+    Tests if a capacity density surface replaces the embedded plants, which are only kept when served as tiles.
+    """
+    output_path = tmp_path / "power_plants_map.html"
+    create_power_plant_map(sample_processed_gdf, output_path, density_columns=['total_mw'])
+    html = output_path.read_text()
+    assert 'L.imageOverlay(' in html
+    assert 'data:image/png;base64,' in html
+    assert 'Capacity Density' in html
+    assert 'CanvasLayer' not in html and 'Plant A' not in html
+
+    create_power_plant_map(sample_processed_gdf, output_path, density_columns=['total_mw'],
+                           tiles_dir=str(tmp_path / "tiles"))
+    html = output_path.read_text()
+    assert 'L.imageOverlay(' in html and 'CanvasLayer' in html
+    assert 'Plant A' not in html
+
+def test_get_capacity_codes():
+    """
+    Tests if capacities are binned linearly and missing values get the reserved code.
+    """
+    codes = get_capacity_codes(np.array([0.0, 50.0, 100.0, np.nan]), 0.0, 100.0)
+    assert codes.tolist() == [0, 127, 254, MISSING_CODE]
+
+def test_create_power_plant_map_clusters(sample_processed_gdf, tmp_path):
+    """
+    Tests if cluster levels are embedded when clustering is enabled.
+    """
+    output_path = tmp_path / "power_plants_map.html"
+    create_power_plant_map(sample_processed_gdf, output_path, cluster=True, max_cluster_zoom=6)
+    html = output_path.read_text()
+    assert '"maxClusterZoom":6' in html
+    assert '"clusters":{"0":' in html
+
+def test_create_power_plant_map_tiles(sample_processed_gdf, tmp_path):
+    """
+    Tests if static tiles are written and the plants are left out of the HTML.
+    """
+    output_path = tmp_path / "power_plants_map.html"
+    tiles_dir = tmp_path / "tiles"
+    create_power_plant_map(sample_processed_gdf, output_path, tiles_dir=str(tiles_dir), max_cluster_zoom=4)
+    html = output_path.read_text()
+    assert '"tileUrl":"tiles"' in html
+    assert 'Plant A' not in html
+    assert (tiles_dir / 'clusters' / '0' / '0' / '0.json').exists()
+    assert any((tiles_dir / 'points' / '5').rglob('*.json'))
+
+@pytest.mark.parametrize('kind', ['square', 'hex'])
+def test_plot_density_heatmap(sample_processed_gdf, tmp_path, kind):
+    """
+    Tests if square and hexagonal density grids are rendered and saved.
+    """
+    grid = grid_density(sample_processed_gdf, 1.0, kind=kind)[1.0]
+    output_path = tmp_path / "power_plant_heatmap.png"
+    plot_density_heatmap(grid, 'total_mw', str(output_path))
+    assert output_path.exists()
+    assert output_path.stat().st_size > 0